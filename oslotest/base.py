@@ -15,32 +15,47 @@
 
 """Common utilities used in testing"""
 
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Iterator, Sequence
+import contextlib
 import logging
-from typing import Any
+import shutil
+import tempfile
+import time
+from typing import Any, TypeVar
 from unittest import mock
 
 import fixtures
+from oslotest import baseline
+from oslotest import complexity
 from oslotest import createfile
+from oslotest import history
 from oslotest import log
+from oslotest import memory
+from oslotest import modules
 from oslotest import output
+from oslotest import profiling
+from oslotest import settings
+from oslotest import tempdir
 from oslotest import timeout
 
 import testtools
+from testtools import content
 
 LOG = logging.getLogger(__name__)
 
-_TRUE_VALUES = ('True', 'true', '1', 'yes')
 _LOG_FORMAT = '%(levelname)8s [%(name)s] %(message)s'
 
+_F = TypeVar('_F', bound=fixtures.Fixture)
+
 
 class BaseTestCase(testtools.TestCase):
     """Base class for unit test classes.
 
-    If the environment variable ``OS_TEST_TIMEOUT`` is set to an
-    integer value (**seconds**), a timer is configured to control how long
-    individual test cases can run. This lets tests fail for taking too
-    long, and prevents deadlocks from completely hanging test runs.
+    If the environment variable ``OS_TEST_TIMEOUT`` is set to a number
+    of **seconds**, which may be fractional such as ``0.2``, a timer is
+    configured to control how long individual test cases can run. This lets
+    tests fail for taking too long, and prevents deadlocks from completely
+    hanging test runs.
 
     The class variable ``DEFAULT_TIMEOUT`` can be set to configure
     a test suite default test value for cases in which ``OS_TEST_TIMEOUT``
@@ -51,6 +66,36 @@ class BaseTestCase(testtools.TestCase):
     the rest of the test suite so that the overall timeout can be
     kept small. It defaults to ``1``.
 
+    If the environment variable ``OS_TEST_TIMEOUT_CALIBRATE`` is set to a
+    true value, the timeouts are also scaled by the speed of the host,
+    measured once and cached, see :mod:`oslotest.calibration`.
+
+    If the environment variable ``OS_TEST_CPU_TIMEOUT`` is set to a number
+    of seconds, the test also fails if the process uses more CPU time than
+    that while it runs, reporting the user and system time used. This
+    catches tests getting slower on busy machines, where the wall-clock
+    timeout has to be generous. The class variable ``DEFAULT_CPU_TIMEOUT``
+    sets the default and ``TIMEOUT_SCALING_FACTOR`` applies to it too.
+
+    If the environment variable ``OS_TEST_PROFILE_SLOW`` is set to a number
+    of seconds, or to a percentage of the test timeout such as ``50%``, the
+    stack of a test still running after that long is sampled until it ends.
+    A true value means ``50%``. Percentages have no effect on tests without
+    a timeout.
+    The samples are attached to the test details as ``slow-test-profile``,
+    as collapsed stacks which flame graph tools can render. See
+    :class:`oslotest.profiling.SlowTestProfiler`.
+
+    If the environment variable ``OS_TEST_MEMORY_LIMIT`` is set to a size
+    in bytes, optionally followed by ``K``, ``M`` or ``G``, the peak memory
+    allocated by the test is tracked and the test fails if it exceeds this
+    budget, see :class:`oslotest.memory.MemoryBudget`. The class variables
+    ``DEFAULT_MEMORY_LIMIT`` and ``MEMORY_SCALING_FACTOR`` work like
+    ``DEFAULT_TIMEOUT`` and ``TIMEOUT_SCALING_FACTOR``. They default to
+    ``0``, which means no budget, and ``1``. Setting the class variable
+    ``MEMORY_GUARD`` to ``True`` also limits the address space of the process
+    while a budget is set, so that a runaway test fails early.
+
     If the environment variable ``OS_STDOUT_CAPTURE`` is set, a fake
     stream replaces ``sys.stdout`` so the test can look at the output
     it produces.
@@ -59,12 +104,30 @@ class BaseTestCase(testtools.TestCase):
     stream replaces ``sys.stderr`` so the test can look at the output
     it produces.
 
+    If the environment variable ``OS_OUTPUT_CAPTURE_MAX_BYTES`` is set, the
+    captured output is only kept in memory up to that size and spooled to a
+    temporary file beyond. The test details then only hold the head and
+    tail of the output, which ``OS_OUTPUT_CAPTURE_KEEP_BYTES`` sizes, see
+    :class:`oslotest.output.CaptureOutput`.
+
     If the environment variable ``OS_DEBUG`` is set to a true value,
     debug logging is enabled. Alternatively, the ``OS_DEBUG``
     environment variable can be set to a valid log level.
+    If ``OS_LOG_SKIP_BELOW_LEVEL`` is also set to a true value, logging
+    below that level is disabled during the test, so that such log calls
+    return before creating a record, see
+    :class:`oslotest.log.ConfigureLogging`.
 
     If the environment variable ``OS_LOG_CAPTURE`` is set to a true
-    value, a logging fixture is installed to capture the log output.
+    value, a logging fixture is installed to capture the log output. If
+    ``OS_LOG_CAPTURE_LAZY`` is also set to a true value, the log records are
+    only formatted when the output is read, such as when the test fails,
+    see :class:`oslotest.log.LazyLogger`. If ``OS_LOG_CAPTURE_MAX_BYTES``
+    is set, only the newest output is kept in memory, up to that size, see
+    :class:`oslotest.log.BoundedLogger`; the older output spilled to a file
+    is only kept if the test fails. If ``OS_LOG_CAPTURE_THREADED`` is
+    set, the records are formatted in a background thread, see
+    :class:`oslotest.log.ThreadedLogger`.
 
     Uses the fixtures_ module to configure a :class:`NestedTempFile`
     to ensure that all temporary files are created in an isolated
@@ -74,6 +137,58 @@ class BaseTestCase(testtools.TestCase):
     change the ``HOME`` environment variable to point to a temporary
     location.
 
+    The class variable ``SHARE_TEMPDIRS`` can be set to ``True`` to create
+    the temporary and home directories once per test class, in
+    ``setUpClass``, instead of once per test. They are emptied after every
+    test, which is much cheaper than creating and removing them for test
+    classes made of many small tests.
+
+    The class variable ``LAZY_TEMPDIRS`` can be set to ``True`` to only
+    create the temporary and home directories of a test when it first uses
+    them, see :class:`oslotest.tempdir.LazyTempDir`, so that tests which
+    never touch them do not pay for creating and removing them. If both are
+    set, ``SHARE_TEMPDIRS`` wins and the shared directories are created in
+    ``setUpClass`` as usual.
+
+    If the environment variable ``OS_TEST_PROFILE_FIXTURES`` is set to a
+    true value, the time spent in the ``setUp`` and ``cleanUp`` of every
+    fixture used by the test is attached to the test details as
+    ``fixture-timings``. A run-wide aggregate is written to
+    ``oslotest-fixture-profile-<pid>.json`` when the process exits, in the
+    directory named by ``OS_TEST_PROFILE_DIR`` or the current directory.
+
+    If the environment variable ``OS_TEST_PROFILE_IMPORTS`` is set to a true
+    value, the modules imported by the test are timed and attached to the
+    test details as ``imports``, see
+    :class:`oslotest.modules.ImportProfileFixture`. The number of modules
+    and the time spent importing them by every test are written to
+    ``oslotest-import-profile-<pid>.json`` when the process exits.
+
+    If the environment variable ``OS_TEST_LEAKCHECK`` is set, the memory
+    retained by the test is measured with :mod:`tracemalloc` and the
+    allocation sites that grew the most are attached to the test details as
+    ``memory-growth``. The test fails if it retains more memory than allowed,
+    see :class:`oslotest.memory.MemoryLeakFixture` and
+    :attr:`oslotest.settings.Settings.leakcheck_limit`. The logs and output
+    captured by a passing test are discarded before the check, once they
+    are attached to the details.
+
+    If the environment variable ``OS_TEST_HISTORY`` is set, the wall time,
+    setUp time and outcome of the test are recorded in a SQLite database,
+    see :mod:`oslotest.history`.
+
+    :meth:`assertNoRegression` compares measurements with the baselines
+    stored in the file named by ``OS_TEST_BASELINE``, see
+    :mod:`oslotest.baseline`.
+
+    :meth:`assertComplexity` and its shortcuts, such as
+    :meth:`assertScalesLinearly`, fit the cost of a function over growing
+    inputs against the usual complexity classes, see
+    :mod:`oslotest.complexity`.
+
+    The environment variables are parsed once per process, see
+    :mod:`oslotest.settings`.
+
     PLEASE NOTE:
     Usage of this class may change the log level globally by setting the
     environment variable ``OS_DEBUG``. A mock of ``time.time`` will be called
@@ -87,8 +202,16 @@ class BaseTestCase(testtools.TestCase):
 
     """
 
-    DEFAULT_TIMEOUT = 0
+    DEFAULT_TIMEOUT: int | float = 0
     TIMEOUT_SCALING_FACTOR: int | float = 1
+    DEFAULT_CPU_TIMEOUT: int | float = 0
+    DEFAULT_MEMORY_LIMIT = 0
+    MEMORY_SCALING_FACTOR: int | float = 1
+    MEMORY_GUARD = False
+    SHARE_TEMPDIRS = False
+    LAZY_TEMPDIRS = False
+
+    _shared_tempdirs: tuple[str, str] | None = None
 
     def __init__(
         self,
@@ -102,6 +225,10 @@ class BaseTestCase(testtools.TestCase):
         # assertSequenceEqual. The default is 640 which is too
         # low for comparing most dicts
         self.maxDiff = 10000
+        self._fixture_timings: profiling.FixtureTimings | None = None
+        self._history_start: float | None = None
+        self._history_setup = 0.0
+        self._history_outcome = 'success'
 
     def addCleanup(
         self,
@@ -128,19 +255,165 @@ class BaseTestCase(testtools.TestCase):
             )
         super().addCleanup(cleanup, *args, **kwargs)
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        if cls.SHARE_TEMPDIRS:
+            paths = (tempfile.mkdtemp(), tempfile.mkdtemp())
+            for path in paths:
+                cls.addClassCleanup(shutil.rmtree, path, ignore_errors=True)
+            cls._shared_tempdirs = paths
+            cls.addClassCleanup(setattr, cls, '_shared_tempdirs', None)
+
+    def useFixture(self, fixture: _F) -> _F:
+        if self._fixture_timings is None:
+            return super().useFixture(fixture)
+        timed = profiling.TimedFixture(fixture, self._fixture_timings)
+        super().useFixture(timed)
+        return fixture
+
+    def _run_setup(self, result: testtools.TestResult) -> object:
+        # NOTE: this wraps the whole setUp of the test class, including
+        # the parts of it running before and after BaseTestCase.setUp.
+        self._history_start = start = time.perf_counter()
+        try:
+            return super()._run_setup(result)
+        finally:
+            self._history_setup = time.perf_counter() - start
+
     def setUp(self) -> None:
         super().setUp()
+        self._record_history()
+        self._check_leaks()
+        self._profile_fixtures()
+        self._profile_imports()
         self._set_timeout()
+        self._profile_slow()
+        self._set_memory_budget()
         self._fake_output()
         self._fake_logs()
-        self.useFixture(fixtures.NestedTempfile())
-        self.useFixture(fixtures.TempHomeDir())
+        self._set_tempdirs()
+
+    def _record_history(self) -> None:
+        path = settings.get_settings().history_file
+        if path is None:
+            return
+        self._history_outcome = 'success'
+        self.addOnException(self._set_history_outcome)
+        self.addCleanup(self._write_history, history.get_recorder(path))
+
+    def _set_history_outcome(self, exc_info: Any) -> None:
+        if self._history_outcome != 'success':
+            return
+        exc_type = exc_info[0]
+        if exc_type is None:
+            return
+        if issubclass(exc_type, self.skipException):
+            self._history_outcome = 'skip'
+        elif issubclass(exc_type, self.failureException):
+            self._history_outcome = 'failure'
+        else:
+            self._history_outcome = 'error'
+
+    def _write_history(self, recorder: history.Recorder) -> None:
+        if self._history_start is None:
+            return
+        duration = time.perf_counter() - self._history_start
+        self._history_start = None
+        recorder.record(
+            self.id(), self._history_outcome, duration, self._history_setup
+        )
+
+    def _check_leaks(self) -> None:
+        limit = settings.get_settings().leakcheck_limit
+        if limit is not None:
+            self.useFixture(memory.MemoryLeakFixture(limit=limit))
+            # NOTE: cleanups run in reverse order, so this runs once the
+            # other fixtures are cleaned up and their details gathered,
+            # right before the leak check.
+            self._leak_passed = True
+            self.addOnException(self._set_leak_failed)
+            self.addCleanup(self._discard_captured)
+
+    def _set_leak_failed(self, exc_info: Any) -> None:
+        self._leak_passed = False
+
+    def _discard_captured(self) -> None:
+        # What a passing test captured stays alive with the test, and
+        # would count as retained memory.
+        if not self._leak_passed:
+            return
+        output_fixture = getattr(self, 'output_fixture', None)
+        if isinstance(output_fixture, output.CaptureOutput):
+            output_fixture.reset_output()
+        log_fixture = getattr(self, 'log_fixture', None)
+        if isinstance(log_fixture, log.ConfigureLogging):
+            logger = log_fixture.logger
+            if logger is not None and not isinstance(
+                logger, fixtures.FakeLogger
+            ):
+                logger.reset_output()
+
+    def _profile_fixtures(self) -> None:
+        if not settings.get_settings().profile_fixtures:
+            return
+        self._fixture_timings = profiling.FixtureTimings()
+        self.addCleanup(self._report_fixture_timings)
+
+    def _report_fixture_timings(self) -> None:
+        timings = self._fixture_timings
+        if timings is None:
+            return
+        self._fixture_timings = None
+        self.addDetail(
+            'fixture-timings',
+            profiling.compact_json_content(timings.as_dict()),
+        )
+        timings.aggregate()
+
+    def _profile_imports(self) -> None:
+        if settings.get_settings().profile_imports:
+            self.useFixture(modules.ImportProfileFixture(report_as=self.id()))
 
     def _set_timeout(self) -> None:
-        self.useFixture(
+        self._timeout = self.useFixture(
             timeout.Timeout(
                 default_timeout=self.DEFAULT_TIMEOUT,
                 scaling_factor=self.TIMEOUT_SCALING_FACTOR,
+                default_cpu_timeout=self.DEFAULT_CPU_TIMEOUT,
+            )
+        )
+
+    def _profile_slow(self) -> None:
+        test_settings = settings.get_settings()
+        threshold = test_settings.profile_slow_after
+        fraction = test_settings.profile_slow_fraction
+        # Subclasses overriding _set_timeout may not set a timeout fixture.
+        test_timeout = getattr(self, '_timeout', None)
+        if fraction is not None and test_timeout is not None:
+            if test_timeout.timeout > 0:
+                threshold = fraction * test_timeout.timeout
+        if threshold is None:
+            return
+        profiler = profiling.SlowTestProfiler(threshold)
+        self.addCleanup(self._report_slow_profile, profiler)
+        self.useFixture(profiler)
+
+    def _report_slow_profile(
+        self, profiler: profiling.SlowTestProfiler
+    ) -> None:
+        if profiler.samples:
+            self.addDetail(
+                'slow-test-profile',
+                content.text_content(profiler.collapsed()),
+            )
+
+    def _set_memory_budget(self) -> None:
+        self.useFixture(
+            memory.MemoryBudget(
+                default_limit=self.DEFAULT_MEMORY_LIMIT,
+                scaling_factor=self.MEMORY_SCALING_FACTOR,
+                guard=self.MEMORY_GUARD,
             )
         )
 
@@ -148,7 +421,39 @@ class BaseTestCase(testtools.TestCase):
         self.output_fixture = self.useFixture(output.CaptureOutput())
 
     def _fake_logs(self) -> None:
-        self.log_fixture = self.useFixture(log.ConfigureLogging())
+        # NOTE: the details of a fixture are read as soon as the test ends,
+        # which would format the records of a LazyLogger for every test, so
+        # the captured output is only attached if the test fails.
+        self.log_fixture = self.useFixture(log.ConfigureLogging(attach=False))
+        logger = self.log_fixture.logger
+        if logger is not None and not isinstance(logger, fixtures.FakeLogger):
+            self.addOnException(self._attach_logs)
+
+    def _attach_logs(self, exc_info: Any) -> None:
+        exc_type = exc_info[0]
+        if exc_type is None or issubclass(exc_type, self.skipException):
+            return
+        logger = self.log_fixture.logger
+        assert logger is not None
+        assert not isinstance(logger, fixtures.FakeLogger)
+        if logger.detail_name not in self.getDetails():
+            self.addDetail(logger.detail_name, logger.detail)
+        if isinstance(logger, log.BoundedLogger):
+            logger.keep_spill = True
+
+    def _set_tempdirs(self) -> None:
+        # NOTE: only use the shared directories if setUpClass created them
+        # for this very class, they are not inherited by subclasses.
+        shared = type(self).__dict__.get('_shared_tempdirs')
+        if shared is not None:
+            self.useFixture(tempdir.SharedNestedTempfile(shared[0]))
+            self.useFixture(tempdir.SharedTempHomeDir(shared[1]))
+        elif self.LAZY_TEMPDIRS:
+            self.useFixture(tempdir.LazyNestedTempfile())
+            self.useFixture(tempdir.LazyTempHomeDir())
+        else:
+            self.useFixture(fixtures.NestedTempfile())
+            self.useFixture(fixtures.TempHomeDir())
 
     def create_tempfiles(
         self,
@@ -160,6 +465,9 @@ class BaseTestCase(testtools.TestCase):
     ) -> list[str]:
         """Safely create temporary files.
 
+        The files are created in a single new temporary directory, see
+        :class:`oslotest.createfile.CreateFilesWithContent`.
+
         :param files: Sequence of tuples containing ``(filename,
             file_contents)`` or ``(filename, file_contents, encoding)``.
         :param ext: File name extension for the temporary file.
@@ -168,20 +476,201 @@ class BaseTestCase(testtools.TestCase):
             string into a binary string.
         :return: A list of str with the names of the files created.
         """
-        tempfiles = []
+        normalized = []
         for f in files:
             if len(f) == 3:
                 basename, contents, encoding = f
             else:
                 basename, contents = f
                 encoding = default_encoding
-            fix = self.useFixture(
-                createfile.CreateFileWithContent(
-                    filename=basename,
-                    contents=contents,
-                    ext=ext,
-                    encoding=encoding,
-                )
+            normalized.append((basename, contents, encoding))
+        fix = self.useFixture(
+            createfile.CreateFilesWithContent(normalized, ext=ext)
+        )
+        return fix.paths
+
+    @contextlib.contextmanager
+    def assertMaxAllocations(
+        self, limit: int, top: int = 10
+    ) -> Iterator[memory.AllocationStats]:
+        """Fail if the ``with`` block allocates more than ``limit`` blocks.
+
+        Only the memory blocks still allocated at the end of the ``with``
+        block are counted, see :func:`oslotest.memory.trace_allocations`.
+        The failure message lists the ``top`` allocation sites.
+
+        :return: A context manager yielding the
+            :class:`oslotest.memory.AllocationStats` of the block.
+        """
+        with memory.trace_allocations() as stats:
+            yield stats
+        if stats.blocks > limit:
+            self.fail(
+                f'{stats.blocks} memory blocks were allocated, more than '
+                f'{limit}:\n{stats.format_top(top)}'
+            )
+
+    @contextlib.contextmanager
+    def assertMaxAllocatedBytes(
+        self, limit: int, top: int = 10
+    ) -> Iterator[memory.AllocationStats]:
+        """Fail if the ``with`` block allocates more than ``limit`` bytes.
+
+        The peak of the memory allocated in the ``with`` block is counted,
+        so temporary copies freed before its end count too. The failure
+        message lists the ``top`` allocation sites still allocated at the
+        end of the block.
+
+        :return: A context manager yielding the
+            :class:`oslotest.memory.AllocationStats` of the block.
+        """
+        with memory.trace_allocations() as stats:
+            yield stats
+        if stats.peak_bytes > limit:
+            self.fail(
+                f'Up to {stats.peak_bytes} bytes were allocated, more than '
+                f'{limit}:\n{stats.format_top(top)}'
+            )
+
+    def assertNoRegression(
+        self,
+        name: str,
+        measurement: Any,
+        tolerance: float = 0.1,
+        alpha: float = 0.05,
+    ) -> None:
+        """Fail if ``measurement`` regressed compared to its baseline.
+
+        The median of the measurement is compared with the median of the
+        baseline stored for ``name`` in this test. It regressed if it grew
+        by more than ``tolerance``, and, when both have at least 3 samples,
+        if a one-sided Mann-Whitney U test finds the growth significant at
+        the ``alpha`` level, so that noise alone does not fail the test.
+
+        Nothing is checked if ``OS_TEST_BASELINE`` is unset or there is no
+        baseline for ``name`` yet. When ``OS_TEST_BASELINE_UPDATE`` is true,
+        the measurement is stored as the new baseline instead.
+
+        :param name: The name of the measurement, unique within the test.
+        :param measurement: A number, a sequence of numbers, or an
+            :class:`oslotest.benchmark.BenchmarkResult`. Greater is worse.
+        :param tolerance: The relative growth of the median allowed.
+        :param alpha: The significance level of the test.
+        """
+        test_settings = settings.get_settings()
+        if test_settings.baseline_file is None:
+            return
+        store = baseline.get_store(test_settings.baseline_file)
+        key = f'{self.id()}:{name}'
+        samples = baseline.samples_of(measurement)
+        if test_settings.update_baselines:
+            store.set(key, samples)
+            return
+        stored = store.get(key)
+        if stored is None:
+            return
+        comparison = baseline.compare(samples, stored)
+        if comparison.change <= tolerance:
+            return
+        if min(len(samples), len(stored)) >= 3 and (
+            comparison.p_value >= alpha
+        ):
+            return
+        self.fail(
+            f'{name} regressed: median {comparison.median:g}, was '
+            f'{comparison.baseline:g} ({comparison.change:+.1%}, tolerance '
+            f'{tolerance:.1%}, p={comparison.p_value:.3g})'
+        )
+
+    def assertComplexity(
+        self,
+        func: Callable[[Any], object],
+        factory: Callable[[int], Any],
+        bound: complexity.Complexity,
+        sizes: Sequence[int] = complexity.DEFAULT_SIZES,
+        use_result: bool = False,
+    ) -> complexity.Complexity:
+        """Fail if the cost of ``func`` grows faster than ``bound``.
+
+        ``func`` is called with inputs of each size returned by
+        ``factory``, and its cost is fitted against the complexity classes
+        of :mod:`oslotest.complexity`. Small sizes are usually enough to
+        tell quadratic code from linear code.
+
+        :param func: The function to measure. It may be called several
+            times with the same input.
+        :param factory: Return an input of the given size.
+        :param bound: The costliest complexity class allowed, such as
+            :data:`oslotest.complexity.LINEAR`.
+        :param sizes: The input sizes, growing geometrically.
+        :param use_result: Use the value returned by ``func``, such as a
+            count of operations, as its cost rather than its run time.
+        :return: The fitted complexity class.
+        """
+        costs = complexity.measure(func, factory, sizes, use_result)
+        fitted = complexity.fit(sizes, costs, noisy=not use_result)
+        if fitted > bound:
+            measurements = ', '.join(
+                f'{n}: {cost:.3g}' for n, cost in zip(sizes, costs)
+            )
+            self.fail(
+                f'The cost grows as {fitted}, faster than {bound} '
+                f'({measurements})'
             )
-            tempfiles.append(fix.path)
-        return tempfiles
+        return fitted
+
+    def assertScalesConstant(
+        self,
+        func: Callable[[Any], object],
+        factory: Callable[[int], Any],
+        **kwargs: Any,
+    ) -> complexity.Complexity:
+        """Fail if the cost of ``func`` grows with its input.
+
+        See :meth:`assertComplexity`.
+        """
+        return self.assertComplexity(
+            func, factory, complexity.CONSTANT, **kwargs
+        )
+
+    def assertScalesLogarithmically(
+        self,
+        func: Callable[[Any], object],
+        factory: Callable[[int], Any],
+        **kwargs: Any,
+    ) -> complexity.Complexity:
+        """Fail if the cost of ``func`` grows faster than O(log n).
+
+        See :meth:`assertComplexity`.
+        """
+        return self.assertComplexity(
+            func, factory, complexity.LOGARITHMIC, **kwargs
+        )
+
+    def assertScalesLinearly(
+        self,
+        func: Callable[[Any], object],
+        factory: Callable[[int], Any],
+        **kwargs: Any,
+    ) -> complexity.Complexity:
+        """Fail if the cost of ``func`` grows faster than O(n).
+
+        See :meth:`assertComplexity`.
+        """
+        return self.assertComplexity(
+            func, factory, complexity.LINEAR, **kwargs
+        )
+
+    def assertScalesLinearithmically(
+        self,
+        func: Callable[[Any], object],
+        factory: Callable[[int], Any],
+        **kwargs: Any,
+    ) -> complexity.Complexity:
+        """Fail if the cost of ``func`` grows faster than O(n log n).
+
+        See :meth:`assertComplexity`.
+        """
+        return self.assertComplexity(
+            func, factory, complexity.LINEARITHMIC, **kwargs
+        )
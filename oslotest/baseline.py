@@ -0,0 +1,195 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Stored performance baselines, to gate tests on regressions.
+
+Baselines are samples of a measurement, such as the times of a benchmark,
+kept in a JSON file which can be committed to the repository or cached by
+the CI system. :meth:`oslotest.base.BaseTestCase.assertNoRegression`
+compares new samples with them.
+
+The baseline file is named by the ``OS_TEST_BASELINE`` environment
+variable, or is :data:`oslotest.settings.DEFAULT_BASELINE_PATH` if it is
+a true value. When ``OS_TEST_BASELINE_UPDATE`` is also true, the samples
+are stored as the new baselines instead of being compared.
+"""
+
+import atexit
+from collections.abc import Iterable, Sequence
+import dataclasses
+import json
+import math
+import os
+import statistics
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+_VERSION = 1
+
+
+class BaselineStore:
+    """The baselines kept in a JSON file.
+
+    :param path: The path of the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._baselines: dict[str, list[float]] | None = None
+        self._updated: dict[str, list[float]] = {}
+
+    def _read(self) -> dict[str, list[float]]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != _VERSION:
+            return {}
+        return dict(data.get('baselines', {}))
+
+    def get(self, key: str) -> list[float] | None:
+        """Return the baseline samples stored for ``key``."""
+        if key in self._updated:
+            return self._updated[key]
+        if self._baselines is None:
+            self._baselines = self._read()
+        return self._baselines.get(key)
+
+    def set(self, key: str, samples: Sequence[float]) -> None:
+        """Store ``samples`` for ``key``, on the next :meth:`save`."""
+        self._updated[key] = list(samples)
+
+    def save(self) -> None:
+        """Write the baselines set since the last save.
+
+        They are merged with the baselines in the file, which other
+        processes may have updated in the meantime.
+        """
+        if not self._updated:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            baselines = self._read()
+            baselines.update(self._updated)
+            tmp = f'{self.path}.{os.getpid()}'
+            with open(tmp, 'w') as f:
+                json.dump(
+                    {'version': _VERSION, 'baselines': baselines},
+                    f,
+                    indent=1,
+                    sort_keys=True,
+                )
+                f.write('\n')
+            os.replace(tmp, self.path)
+        self._baselines = baselines
+        self._updated = {}
+
+
+_stores: dict[str, BaselineStore] = {}
+
+
+def get_store(path: str) -> BaselineStore:
+    """Return the process-wide store for the file at ``path``.
+
+    The store is saved when the process exits.
+    """
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = BaselineStore(path)
+        atexit.register(store.save)
+    return store
+
+
+def samples_of(measurement: Any) -> list[float]:
+    """Return the samples of ``measurement``.
+
+    :param measurement: A number, an iterable of numbers, or an object with
+        a ``times`` attribute such as
+        :class:`oslotest.benchmark.BenchmarkResult`.
+    """
+    times = getattr(measurement, 'times', measurement)
+    if isinstance(times, int | float):
+        return [float(times)]
+    if isinstance(times, Iterable):
+        samples = [float(t) for t in times]
+        if samples:
+            return samples
+    raise ValueError(f'{measurement!r} has no samples')
+
+
+def mann_whitney_p(
+    samples: Sequence[float], baseline: Sequence[float]
+) -> float:
+    """Return how likely ``samples`` are to be no greater than ``baseline``.
+
+    This is the p-value of a one-sided Mann-Whitney U test, with the normal
+    approximation corrected for ties and continuity. It makes no assumption
+    on the distribution of the samples, which for timings is usually
+    skewed by outliers.
+    """
+    n1, n2 = len(samples), len(baseline)
+    n = n1 + n2
+    ordered = sorted([(v, 0) for v in samples] + [(v, 1) for v in baseline])
+    rank_sum = 0.0
+    ties = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and ordered[j + 1][0] == ordered[i][0]:
+            j += 1
+        count = j - i + 1
+        rank = (i + j) / 2 + 1
+        rank_sum += rank * sum(
+            1 for k in range(i, j + 1) if ordered[k][1] == 0
+        )
+        ties += count**3 - count
+        i = j + 1
+    u = rank_sum - n1 * (n1 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 1 - statistics.NormalDist().cdf(z)
+
+
+@dataclasses.dataclass
+class Comparison:
+    """The comparison of samples with their baseline."""
+
+    median: float
+    baseline: float
+    p_value: float
+
+    @property
+    def change(self) -> float:
+        """The relative change of the median."""
+        if self.baseline == 0:
+            return math.inf if self.median > 0 else 0.0
+        return self.median / self.baseline - 1
+
+
+def compare(samples: Sequence[float], baseline: Sequence[float]) -> Comparison:
+    """Compare the medians of ``samples`` and ``baseline``."""
+    return Comparison(
+        statistics.median(samples),
+        statistics.median(baseline),
+        mann_whitney_p(samples, baseline),
+    )
@@ -0,0 +1,183 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Benchmarks written as ordinary tests."""
+
+from collections.abc import Callable
+import dataclasses
+import gc
+import statistics
+import time
+from typing import Any
+
+from oslotest import base
+from oslotest import profiling
+from oslotest import settings
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    """The timings of a benchmark.
+
+    :param name: The name of the benchmark.
+    :param number: The number of calls timed together in each repeat.
+    :param times: The time per call measured by each repeat, in seconds.
+    """
+
+    name: str
+    number: int
+    times: list[float]
+
+    @property
+    def min(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.times)
+
+    @property
+    def p95(self) -> float:
+        if len(self.times) < 2:
+            return self.times[0]
+        return statistics.quantiles(self.times, n=20, method='inclusive')[-1]
+
+    @property
+    def stdev(self) -> float:
+        if len(self.times) < 2:
+            return 0.0
+        return statistics.stdev(self.times)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'number': self.number,
+            'repeat': len(self.times),
+            'min': self.min,
+            'median': self.median,
+            'mean': self.mean,
+            'p95': self.p95,
+            'stdev': self.stdev,
+            'times': self.times,
+        }
+
+
+class BenchmarkTestCase(base.BaseTestCase):
+    """Base class for benchmarks.
+
+    Benchmarks are skipped unless the environment variable
+    ``OS_RUN_BENCHMARKS`` is set to a true value, so that they can live
+    beside the unit tests without slowing down the usual test runs. They
+    get the same isolation as any other :class:`~oslotest.base.BaseTestCase`
+    test.
+
+    Use :meth:`benchmark` to time a function::
+
+        class TestSerializer(benchmark.BenchmarkTestCase):
+            def test_dumps(self):
+                result = self.benchmark(serializer.dumps, DOCUMENT)
+                self.assertLess(result.median, 0.001)
+
+    The class variable ``WARMUP`` is the number of untimed rounds run
+    first, to fill caches. It defaults to ``1``.
+
+    The class variable ``REPEAT`` is the number of timed rounds. It
+    defaults to ``5``.
+
+    The class variable ``MIN_TIME`` is the minimum duration of a round, in
+    seconds. The number of calls per round is chosen, like :mod:`timeit`
+    does, so that a round lasts at least that long, which keeps the
+    resolution of the clock from dominating the timings of fast functions.
+    It defaults to ``0.2``.
+
+    The class variable ``DISABLE_GC`` disables the garbage collector during
+    the timed rounds, like :mod:`timeit` does. It defaults to ``True``.
+    """
+
+    WARMUP = 1
+    REPEAT = 5
+    MIN_TIME = 0.2
+    DISABLE_GC = True
+
+    def setUp(self) -> None:
+        if not settings.get_settings().run_benchmarks:
+            self.skipTest('Set OS_RUN_BENCHMARKS to run benchmarks.')
+        super().setUp()
+
+    def _time(self, func: Callable[[], object], number: int) -> float:
+        gc_enabled = gc.isenabled()
+        if self.DISABLE_GC:
+            gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            return time.perf_counter() - start
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _autorange(self, func: Callable[[], object]) -> int:
+        i = 1
+        while True:
+            for number in (i, i * 2, i * 5):
+                if self._time(func, number) >= self.MIN_TIME:
+                    return number
+            i *= 10
+
+    def benchmark(
+        self,
+        func: Callable[..., object],
+        *args: Any,
+        name: str | None = None,
+        number: int | None = None,
+        warmup: int | None = None,
+        repeat: int | None = None,
+        **kwargs: Any,
+    ) -> BenchmarkResult:
+        """Time ``func(*args, **kwargs)``.
+
+        The statistics are attached to the test details, as JSON, under
+        ``benchmark-<name>``.
+
+        :param name: The name of the benchmark. Defaults to the name of
+            ``func``.
+        :param number: The number of calls per round. Chosen automatically
+            by default, see ``MIN_TIME``.
+        :param warmup: Overrides ``WARMUP``.
+        :param repeat: Overrides ``REPEAT``.
+        :return: A :class:`BenchmarkResult`.
+        """
+        if name is None:
+            name = getattr(func, '__name__', 'benchmark')
+
+        def call() -> object:
+            return func(*args, **kwargs)
+
+        if number is None:
+            # NOTE: auto-ranging also warms up the function.
+            number = self._autorange(call)
+        for _ in range(self.WARMUP if warmup is None else warmup):
+            self._time(call, number)
+        times = [
+            self._time(call, number) / number
+            for _ in range(self.REPEAT if repeat is None else repeat)
+        ]
+        result = BenchmarkResult(name, number, times)
+        self.addDetail(
+            f'benchmark-{name}',
+            profiling.compact_json_content(result.as_dict()),
+        )
+        return result
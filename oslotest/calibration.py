@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Measure how fast the current host runs Python code.
+
+Time budgets such as test timeouts are written for some machine; the speed
+factor returned by :func:`get_speed_factor` says how much longer the same
+work takes on this host, so that the budgets can be scaled by it.
+
+The factor is measured with a short micro-benchmark the first time it is
+needed on a host, and cached in ``~/.cache/oslotest``, or
+``$XDG_CACHE_HOME/oslotest``, for the later runs. Remove the cache file to
+measure it again, for example after a hardware change.
+"""
+
+import json
+import os
+import platform
+import socket
+import sys
+import time
+
+#: The duration of the benchmark on the reference machine, in seconds.
+REFERENCE_SECONDS = 0.01
+
+# The speed factor is kept within these bounds, so that a benchmark upset
+# by a very busy host cannot make budgets absurdly tight or loose.
+_MIN_FACTOR = 0.2
+_MAX_FACTOR = 20.0
+_REPEAT = 7
+_CACHE_VERSION = 1
+
+# NOTE: BaseTestCase points HOME to a temporary directory during tests, so
+# resolve the cache directory up front.
+_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'oslotest',
+)
+
+_speed_factor: float | None = None
+
+
+def _workload() -> int:
+    counts: dict[int, int] = {}
+    for i in range(50000):
+        key = i % 101
+        counts[key] = counts.get(key, 0) + i * i
+    words = sorted(str(i) for i in range(5000))
+    return len(counts) + len(''.join(words))
+
+
+def measure() -> float:
+    """Run the benchmark and return its best duration, in seconds."""
+    best = float('inf')
+    for _ in range(_REPEAT):
+        start = time.perf_counter()
+        _workload()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def cache_path() -> str:
+    """Return the file caching the speed factor of this host."""
+    implementation = sys.implementation.name
+    version = '.'.join(map(str, sys.version_info[:2]))
+    name = f'speed-{socket.gethostname()}-{implementation}-{version}.json'
+    return os.path.join(_CACHE_DIR, name)
+
+
+def _load(path: str) -> float | None:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != _CACHE_VERSION:
+        return None
+    if data.get('machine') != platform.machine():
+        return None
+    factor = data.get('factor')
+    return float(factor) if isinstance(factor, int | float) else None
+
+
+def _save(path: str, seconds: float, factor: float) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump(
+                {
+                    'version': _CACHE_VERSION,
+                    'machine': platform.machine(),
+                    'seconds': seconds,
+                    'factor': factor,
+                },
+                f,
+            )
+        os.replace(tmp, path)
+    except OSError:
+        # Not being able to cache the factor only costs measuring it again.
+        pass
+
+
+def get_speed_factor() -> float:
+    """Return how much slower this host is than the reference machine.
+
+    The factor is read from the cache, or measured and cached, the first
+    time it is needed in the process.
+    """
+    global _speed_factor
+    if _speed_factor is None:
+        path = cache_path()
+        factor = _load(path)
+        if factor is None:
+            seconds = measure()
+            factor = min(
+                _MAX_FACTOR, max(_MIN_FACTOR, seconds / REFERENCE_SECONDS)
+            )
+            _save(path, seconds, factor)
+        _speed_factor = factor
+    return _speed_factor
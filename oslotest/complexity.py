@@ -0,0 +1,186 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Estimate the complexity of code from its cost over growing inputs.
+
+The cost of a function is measured over a geometric series of input sizes
+and fitted against the usual complexity classes, so that, for example,
+accidentally quadratic code can be caught with small inputs. See
+:meth:`oslotest.base.BaseTestCase.assertComplexity`.
+"""
+
+from collections.abc import Callable, Sequence
+import dataclasses
+import math
+import statistics
+import time
+from typing import Any
+
+#: The input sizes used by default.
+DEFAULT_SIZES = tuple(64 * 2**i for i in range(7))
+
+# How long each measurement must last, so that the resolution of the clock
+# does not dominate the cost at small sizes.
+_MIN_TIME = 0.002
+_REPEAT = 3
+
+# A simpler class is preferred to the best fitting one when its residual is
+# at most this much worse. Noise makes a linear function fit O(n log n)
+# slightly better about as often as not, and failing a test because of
+# noise is worse than missing a logarithmic factor.
+_PREFER_SIMPLER = 2
+
+# Caches, allocations and the like make the run time of a constant time
+# function jump between some sizes, which would fit a logarithmic or even a
+# linear growth better than a constant. Noisy costs are only considered to
+# grow when the median of the slopes of log(cost) over log(n), over the
+# last steps, is above this. The slope is about 1 for a linear cost and 2
+# for a quadratic one at large sizes, and 1/3 is a growth of a quarter per
+# doubling.
+_MIN_SLOPE = 1 / 3
+_SLOPE_STEPS = 3
+
+
+@dataclasses.dataclass(frozen=True, order=True)
+class Complexity:
+    """A complexity class, ordered from the cheapest to the costliest."""
+
+    order: int
+    name: str = dataclasses.field(compare=False)
+    func: Callable[[float], float] = dataclasses.field(
+        compare=False, repr=False
+    )
+
+    def __str__(self) -> str:
+        return self.name
+
+
+CONSTANT = Complexity(0, 'O(1)', lambda n: 1.0)
+LOGARITHMIC = Complexity(1, 'O(log n)', math.log)
+LINEAR = Complexity(2, 'O(n)', lambda n: n)
+LINEARITHMIC = Complexity(3, 'O(n log n)', lambda n: n * math.log(n))
+QUADRATIC = Complexity(4, 'O(n^2)', lambda n: n * n)
+
+#: The complexity classes :func:`fit` chooses from, cheapest first.
+COMPLEXITIES = (CONSTANT, LOGARITHMIC, LINEAR, LINEARITHMIC, QUADRATIC)
+
+
+def _time(func: Callable[[Any], object], arg: Any) -> float:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func(arg)
+        elapsed = time.perf_counter() - start
+        if elapsed >= _MIN_TIME:
+            return elapsed / number
+        number *= 2
+
+
+def measure(
+    func: Callable[[Any], object],
+    factory: Callable[[int], Any],
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    use_result: bool = False,
+) -> list[float]:
+    """Return the cost of ``func(factory(n))`` for each size ``n``.
+
+    :param func: The function to measure. It may be called several times
+        with the same input, which must not be modified.
+    :param factory: Return an input of the given size. It is not timed.
+    :param sizes: The input sizes, growing geometrically.
+    :param use_result: Use the value returned by ``func``, such as a count
+        of operations, as its cost rather than its run time. Counts are
+        deterministic, unlike run times.
+    """
+    costs = []
+    for n in sizes:
+        arg = factory(n)
+        if use_result:
+            cost = func(arg)
+            if not isinstance(cost, int | float):
+                raise TypeError(f'{cost!r} returned for size {n} is no cost')
+            costs.append(float(cost))
+        else:
+            costs.append(min(_time(func, arg) for _ in range(_REPEAT)))
+    return costs
+
+
+def _residual(xs: Sequence[float], ys: Sequence[float]) -> float:
+    """Return the residual of the least squares fit of ``y = a + b x``.
+
+    Timing noise is proportional to the cost, so the errors are weighted by
+    the inverse of the squared cost, to make them relative. Otherwise the
+    largest sizes would drown the others.
+    """
+    weights = [1 / (y * y) if y else 1.0 for y in ys]
+    total = sum(weights)
+    mean_x = sum(w * x for w, x in zip(weights, xs)) / total
+    mean_y = sum(w * y for w, y in zip(weights, ys)) / total
+    sxx = sum(w * (x - mean_x) ** 2 for w, x in zip(weights, xs))
+    syy = sum(w * (y - mean_y) ** 2 for w, y in zip(weights, ys))
+    if sxx == 0:
+        return syy
+    sxy = sum(
+        w * (x - mean_x) * (y - mean_y) for w, x, y in zip(weights, xs, ys)
+    )
+    if sxy < 0:
+        # The cost decreases, which none of the classes models better than
+        # a constant.
+        return math.inf
+    return max(0.0, syy - sxy * sxy / sxx)
+
+
+def _slope(sizes: Sequence[int], costs: Sequence[float]) -> float:
+    """Return the median slope of log(cost) over log(n) at the last steps."""
+    slopes = []
+    for i in range(max(1, len(sizes) - _SLOPE_STEPS), len(sizes)):
+        if costs[i - 1] <= 0 or costs[i] <= 0:
+            # Growing from nothing, or to nothing.
+            slopes.append(math.inf if costs[i] > costs[i - 1] else 0.0)
+            continue
+        slopes.append(
+            math.log(costs[i] / costs[i - 1])
+            / math.log(sizes[i] / sizes[i - 1])
+        )
+    return statistics.median(slopes)
+
+
+def fit(
+    sizes: Sequence[int], costs: Sequence[float], noisy: bool = False
+) -> Complexity:
+    """Return the complexity class fitting ``costs`` best.
+
+    Each class is fitted as ``cost = a + b * f(n)``, with least squares.
+    The simplest class whose residual is close to the best one is chosen.
+
+    :param sizes: The input sizes, growing geometrically.
+    :param costs: The cost for each size.
+    :param noisy: Whether the costs are noisy, such as run times. Noisy
+        costs fit :data:`CONSTANT` unless they still grow noticeably at the
+        largest sizes, so that a logarithmic growth is usually lost in the
+        noise.
+    """
+    if len(sizes) < 3 or len(sizes) != len(costs):
+        raise ValueError('At least 3 sizes and as many costs are needed.')
+    if noisy and _slope(sizes, costs) <= _MIN_SLOPE:
+        return CONSTANT
+    residuals = [
+        _residual([c.func(n) for n in sizes], costs) for c in COMPLEXITIES
+    ]
+    best = min(residuals)
+    # Allow for rounding errors when the fit is exact.
+    scale = len(costs) * 1e-12
+    for complexity, residual in zip(COMPLEXITIES, residuals):
+        if residual <= best * _PREFER_SIMPLER + scale:
+            return complexity
+    raise AssertionError('unreachable')  # pragma: no cover
@@ -10,11 +10,67 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+from collections.abc import Iterable
+from concurrent import futures
 import os
+import shutil
 import tempfile
 
 import fixtures
 
+from oslotest import settings
+
+# Memory backed filesystem used for in-memory files, when available. Files
+# are only created in it through mkstemp and mkdtemp.
+_SHM_DIR = '/dev/shm'  # noqa: S108
+
+# Number of files from which CreateFilesWithContent writes them in parallel.
+_PARALLEL_THRESHOLD = 16
+_MAX_WORKERS = 8
+
+
+def _use_in_memory(in_memory: bool | None) -> bool:
+    if in_memory is None:
+        return settings.get_settings().tempfile_in_memory
+    return in_memory
+
+
+def _shm_dir() -> str | None:
+    """Return the memory backed directory to use, if there is one."""
+    if os.path.isdir(_SHM_DIR) and os.access(_SHM_DIR, os.W_OK | os.X_OK):
+        return _SHM_DIR
+    return None
+
+
+def _has_memfd() -> bool:
+    """Return whether anonymous memory files are available."""
+    return hasattr(os, 'memfd_create')
+
+
+def _unlink(path: str) -> None:
+    """Remove a file, unless it is already gone."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _memfd(name: str, contents: bytes) -> tuple[int, str]:
+    """Write contents to an anonymous memory file.
+
+    :return: The open file descriptor, which must be kept open for as long
+        as the file is used, and a path to the file which is only valid in
+        this process.
+    """
+    fd = os.memfd_create(name)
+    try:
+        os.write(fd, contents)
+        os.lseek(fd, 0, os.SEEK_SET)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd, f'/proc/self/fd/{fd}'
+
 
 class CreateFileWithContent(fixtures.Fixture):
     """Create a temporary file with the given content.
@@ -32,6 +88,16 @@ class CreateFileWithContent(fixtures.Fixture):
     :class:`fixtures.NestedTempfile` to set the temporary directory
     somewhere safe and to ensure the files are cleaned up.
 
+    Files with a relative name can be kept in memory instead of being
+    written to the temporary directory, by passing ``in_memory=True`` or
+    by setting the ``OS_TEST_TEMPFILE_IN_MEMORY`` environment variable to a
+    true value. They are then created in ``/dev/shm``, or if it is not
+    available, with :func:`os.memfd_create`, in which case :attr:`path` is
+    a ``/proc/self/fd/N`` path that only this process can open and the file
+    name does not include ``filename`` or ``ext``. If neither is available,
+    as on macOS, a regular temporary file is created instead. In-memory
+    files are removed on cleanup.
+
     :param filename: Base file name or full literal path to the file
         to be created.
     :param contents: The data to write to the file. Unicode data will
@@ -39,6 +105,8 @@ class CreateFileWithContent(fixtures.Fixture):
     :param ext: An extension to add to filename.
     :param encoding: An encoding to use for unicode data (ignored for
         byte strings).
+    :param in_memory: Whether to keep the file in memory. Defaults to the
+        value of ``OS_TEST_TEMPFILE_IN_MEMORY``.
     """
 
     #: The canonical name of the file created.
@@ -50,11 +118,13 @@ class CreateFileWithContent(fixtures.Fixture):
         contents: str | bytes,
         ext: str = '.conf',
         encoding: str = 'utf-8',
+        in_memory: bool | None = None,
     ) -> None:
         self._filename = filename
         self._contents = contents
         self._ext = ext
         self._encoding = encoding
+        self._in_memory = in_memory
 
     def setUp(self) -> None:
         super().setUp()
@@ -62,6 +132,9 @@ class CreateFileWithContent(fixtures.Fixture):
         if isinstance(contents, str):
             contents = contents.encode(self._encoding)
         if not os.path.isabs(self._filename):
+            if _use_in_memory(self._in_memory):
+                self._create_in_memory(contents)
+                return
             fd, self.path = tempfile.mkstemp(
                 prefix=self._filename, suffix=self._ext
             )
@@ -72,3 +145,117 @@ class CreateFileWithContent(fixtures.Fixture):
             os.write(fd, contents)
         finally:
             os.close(fd)
+
+    def _create_in_memory(self, contents: bytes) -> None:
+        shm_dir = _shm_dir()
+        if shm_dir is None and _has_memfd():
+            fd, self.path = _memfd(self._filename, contents)
+            self.addCleanup(os.close, fd)
+            return
+        # Without shm_dir this is a regular temporary file.
+        fd, self.path = tempfile.mkstemp(
+            prefix=self._filename, suffix=self._ext, dir=shm_dir
+        )
+        self.addCleanup(_unlink, self.path)
+        try:
+            os.write(fd, contents)
+        finally:
+            os.close(fd)
+
+
+class CreateFilesWithContent(fixtures.Fixture):
+    """Create several temporary files with the given contents.
+
+    This is the bulk version of :class:`CreateFileWithContent`. Files
+    given with a relative name are all created inside a single new
+    temporary directory, named after the base name and extension, which is
+    removed on cleanup. When many files are requested they are written
+    from a thread pool.
+
+    Files given with an absolute name are written at that path, as
+    :class:`CreateFileWithContent` does, and are not removed on cleanup.
+
+    Files with a relative name can be kept in memory, as described for
+    :class:`CreateFileWithContent`. The directory is then created in
+    ``/dev/shm``, or if it is not available each file is created with
+    :func:`os.memfd_create` and :attr:`directory` is ``None``. If neither is
+    available, the directory is a regular temporary directory.
+
+    :param files: Sequence of tuples containing ``(filename, contents,
+        encoding)``. Unicode contents are encoded with ``encoding`` before
+        being written.
+    :param ext: An extension to add to each filename.
+    :param in_memory: Whether to keep the files in memory. Defaults to the
+        value of ``OS_TEST_TEMPFILE_IN_MEMORY``.
+    """
+
+    #: The canonical names of the files created, in the order given.
+    paths: list[str]
+
+    #: The directory holding the files with a relative name.
+    directory: str | None
+
+    def __init__(
+        self,
+        files: Iterable[tuple[str, str | bytes, str]],
+        ext: str = '.conf',
+        in_memory: bool | None = None,
+    ) -> None:
+        super().__init__()
+        self._files = list(files)
+        self._ext = ext
+        self._in_memory = in_memory
+
+    def setUp(self) -> None:
+        super().setUp()
+        # Encode everything first, so that encoding errors are raised
+        # before anything is written.
+        files = []
+        for filename, contents, encoding in self._files:
+            if isinstance(contents, str):
+                contents = contents.encode(encoding)
+            files.append((filename, contents))
+
+        self.directory = None
+        self._use_memfd = False
+        if not all(os.path.isabs(filename) for filename, _ in files):
+            rootdir = None
+            if _use_in_memory(self._in_memory):
+                rootdir = _shm_dir()
+                self._use_memfd = rootdir is None and _has_memfd()
+            if not self._use_memfd:
+                self.directory = tempfile.mkdtemp(dir=rootdir)
+                self.addCleanup(
+                    shutil.rmtree, self.directory, ignore_errors=True
+                )
+
+        if len(files) < _PARALLEL_THRESHOLD:
+            self.paths = [self._write(*f) for f in files]
+        else:
+            workers = min(_MAX_WORKERS, len(files))
+            with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                self.paths = list(pool.map(lambda f: self._write(*f), files))
+
+    def _write(self, filename: str, contents: bytes) -> str:
+        if os.path.isabs(filename):
+            path = filename + self._ext
+            fd = os.open(path, os.O_CREAT | os.O_WRONLY)
+        elif self._use_memfd:
+            fd, path = _memfd(filename, contents)
+            self.addCleanup(os.close, fd)
+            return path
+        else:
+            assert self.directory is not None
+            path = os.path.join(self.directory, filename + self._ext)
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+            except FileExistsError:
+                # The same name was given more than once.
+                fd, path = tempfile.mkstemp(
+                    prefix=filename, suffix=self._ext, dir=self.directory
+                )
+        try:
+            os.write(fd, contents)
+        finally:
+            os.close(fd)
+        return path
@@ -0,0 +1,266 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Persistent history of test durations.
+
+When the ``OS_TEST_HISTORY`` environment variable is set,
+:class:`oslotest.base.BaseTestCase` records the wall time, setUp time and
+outcome of every test in a SQLite database, together with the git revision
+being tested. ``OS_TEST_HISTORY`` may be a path to the database, or a true
+value to use :data:`oslotest.settings.DEFAULT_HISTORY_PATH` in the current
+directory.
+
+The ``oslotest-history`` command reports the tests whose duration at the
+latest recorded revision regressed compared to the earlier revisions.
+"""
+
+import argparse
+import atexit
+from collections.abc import Sequence
+import dataclasses
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+from oslotest import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS durations (
+    test_id TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    recorded REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    setup REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS durations_test_revision
+    ON durations (test_id, revision);
+"""
+
+# Rows are written in batches to keep the cost per test low.
+_BATCH_SIZE = 100
+
+
+def get_revision() -> str:
+    """Return the git revision of the current directory, or ``unknown``."""
+    try:
+        out = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],  # noqa: S607
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return out.strip() or 'unknown'
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open the history database at ``path``, creating it if needed."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class Recorder:
+    """Buffer test durations and write them to the history database.
+
+    :param path: The path to the history database.
+    :param revision: The revision the tests are run against. Defaults to
+        the git revision of the current directory.
+    """
+
+    def __init__(self, path: str, revision: str | None = None) -> None:
+        self.path = path
+        self.revision = revision or get_revision()
+        self._rows: list[tuple[str, str, float, str, float, float]] = []
+
+    def record(
+        self, test_id: str, outcome: str, duration: float, setup: float
+    ) -> None:
+        self._rows.append(
+            (test_id, self.revision, time.time(), outcome, duration, setup)
+        )
+        if len(self._rows) >= _BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        conn = connect(self.path)
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT INTO durations VALUES (?, ?, ?, ?, ?, ?)', rows
+                )
+        finally:
+            conn.close()
+
+
+_recorders: dict[str, Recorder] = {}
+
+
+def get_recorder(path: str) -> Recorder:
+    """Return the process-wide recorder for the database at ``path``.
+
+    The recorder is flushed when the process exits.
+    """
+    recorder = _recorders.get(path)
+    if recorder is None:
+        recorder = _recorders[path] = Recorder(path)
+        atexit.register(recorder.flush)
+    return recorder
+
+
+@dataclasses.dataclass
+class Regression:
+    """A test which got slower at ``revision``."""
+
+    test_id: str
+    revision: str
+    duration: float
+    mean: float
+    stdev: float
+    samples: int
+
+    @property
+    def score(self) -> float:
+        """The number of standard deviations above the historical mean."""
+        if self.stdev == 0:
+            return float('inf')
+        return (self.duration - self.mean) / self.stdev
+
+
+def find_regressions(
+    conn: sqlite3.Connection,
+    revision: str | None = None,
+    threshold: float = 3.0,
+    min_samples: int = 5,
+    min_increase: float = 0.01,
+) -> list[Regression]:
+    """Find the tests that got slower at ``revision``.
+
+    Only successful runs are considered. The median duration of each test
+    at ``revision`` is compared with the durations recorded for the other
+    revisions, and reported when it is more than ``threshold`` standard
+    deviations and ``min_increase`` seconds above their mean.
+
+    :param conn: The history database.
+    :param revision: The revision to check. Defaults to the revision
+        recorded most recently.
+    :param threshold: The number of standard deviations a duration must
+        be above the historical mean to be reported.
+    :param min_samples: The number of historical durations needed before
+        a test is checked.
+    :param min_increase: The minimum increase, in seconds, to report.
+    :return: The regressions, worst first.
+    """
+    if revision is None:
+        row = conn.execute(
+            'SELECT revision FROM durations ORDER BY recorded DESC LIMIT 1'
+        ).fetchone()
+        if row is None:
+            return []
+        revision = row[0]
+
+    current: dict[str, list[float]] = {}
+    history: dict[str, list[float]] = {}
+    for test_id, rev, duration in conn.execute(
+        "SELECT test_id, revision, duration FROM durations "
+        "WHERE outcome = 'success'"
+    ):
+        target = current if rev == revision else history
+        target.setdefault(test_id, []).append(duration)
+
+    regressions = []
+    for test_id, durations in current.items():
+        past = history.get(test_id, [])
+        if len(past) < min_samples:
+            continue
+        duration = statistics.median(durations)
+        mean = statistics.fmean(past)
+        stdev = statistics.stdev(past)
+        if duration - mean < min_increase:
+            continue
+        if duration > mean + threshold * stdev:
+            regressions.append(
+                Regression(test_id, revision, duration, mean, stdev, len(past))
+            )
+    regressions.sort(key=lambda r: r.score, reverse=True)
+    return regressions
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Report tests whose duration regressed.'
+    )
+    parser.add_argument(
+        '--db',
+        default=settings.get_settings().history_file
+        or settings.DEFAULT_HISTORY_PATH,
+        help='The history database. Defaults to $OS_TEST_HISTORY or '
+        f'{settings.DEFAULT_HISTORY_PATH}.',
+    )
+    parser.add_argument(
+        '--revision',
+        help='The revision to check. Defaults to the latest recorded one.',
+    )
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=3.0,
+        help='Number of standard deviations above the historical mean '
+        'needed to report a test. Defaults to %(default)s.',
+    )
+    parser.add_argument(
+        '--min-samples',
+        type=int,
+        default=5,
+        help='Number of historical runs needed to check a test. '
+        'Defaults to %(default)s.',
+    )
+    parser.add_argument(
+        '--min-increase',
+        type=float,
+        default=0.01,
+        help='Minimum increase in seconds to report. Defaults to %(default)s.',
+    )
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f'{args.db} does not exist')
+    conn = connect(args.db)
+    try:
+        regressions = find_regressions(
+            conn,
+            revision=args.revision,
+            threshold=args.threshold,
+            min_samples=args.min_samples,
+            min_increase=args.min_increase,
+        )
+    finally:
+        conn.close()
+
+    for r in regressions:
+        print(
+            f'{r.test_id}: {r.duration:.3f}s, was {r.mean:.3f}s '
+            f'+/- {r.stdev:.3f}s over {r.samples} runs'
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
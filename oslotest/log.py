@@ -10,29 +10,404 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import abc
+import collections
 import logging
+import logging.handlers
 import os
-from typing import Any
+import queue
+import tempfile
+from typing import IO
 
 import fixtures
+from testtools import content
+from testtools import content_type
 
-_TRUE_VALUES = ('True', 'true', '1', 'yes')
-_FALSE_VALUES = ('False', 'false', '0', 'no')
-_BASE_LOG_LEVELS = ('DEBUG', 'INFO', 'WARN', 'WARNING', 'ERROR', 'CRITICAL')
-_LOG_LEVELS = {n: getattr(logging, n) for n in _BASE_LOG_LEVELS}
-_LOG_LEVELS.update(
-    {
-        'TRACE': 5,
-    }
-)
+from oslotest import settings
 
 
-def _try_int(value: Any) -> int | None:
-    """Try to make some value into an int."""
-    try:
-        return int(value)
-    except (ValueError, TypeError):
-        return None
+class _CaptureHandler(logging.Handler, abc.ABC):
+    @abc.abstractmethod
+    def render(self) -> str:
+        """Return the captured output."""
+
+    @abc.abstractmethod
+    def reset(self) -> None:
+        """Discard the output captured so far."""
+
+
+class _RecordHandler(_CaptureHandler):
+    """Keep the records, to format them when they are read."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.exc_info:
+            # Format the traceback now rather than keep its frames, and
+            # their local variables, alive until the end of the test.
+            if not record.exc_text:
+                formatter = self.formatter or logging.Formatter()
+                record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+    def render(self) -> str:
+        lines = []
+        for record in self.records:
+            try:
+                lines.append(self.format(record) + '\n')
+            except Exception as e:
+                lines.append(f'Unable to format {record.msg!r}: {e!r}\n')
+        return ''.join(lines)
+
+    def reset(self) -> None:
+        self.records.clear()
+
+
+class _RingBufferHandler(_CaptureHandler):
+    """Keep the newest formatted records, up to a number of bytes."""
+
+    def __init__(self, max_bytes: int, spill_dir: str | None) -> None:
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_path: str | None = None
+        self._spill: IO[bytes] | None = None
+        self._entries: collections.deque[bytes] = collections.deque()
+        self._size = 0
+        self.dropped = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            entry = (self.format(record) + '\n').encode()
+        except Exception:
+            self.handleError(record)
+            return
+        if len(entry) > self.max_bytes:
+            # Keep the tail of a record too large for the buffer, which
+            # usually holds the end of a traceback, rather than nothing.
+            self._discard(entry[: len(entry) - self.max_bytes])
+            entry = entry[len(entry) - self.max_bytes :]
+        self._entries.append(entry)
+        self._size += len(entry)
+        while self._size > self.max_bytes:
+            old = self._entries.popleft()
+            self._size -= len(old)
+            self._discard(old)
+
+    def _discard(self, data: bytes) -> None:
+        self.dropped += len(data)
+        if self.spill_dir is not None:
+            if self._spill is None:
+                fd, self.spill_path = tempfile.mkstemp(
+                    prefix='oslotest-log-',
+                    suffix='.log',
+                    dir=self.spill_dir,
+                )
+                self._spill = os.fdopen(fd, 'wb')
+            self._spill.write(data)
+
+    def render(self) -> str:
+        self.acquire()
+        try:
+            entries = list(self._entries)
+            if self._spill is not None:
+                self._spill.flush()
+        finally:
+            self.release()
+        header = ''
+        if self.spill_path is not None:
+            header = (
+                f'[{self.dropped} bytes of older log output spilled to '
+                f'{self.spill_path}]\n'
+            )
+        elif self.dropped:
+            header = f'[{self.dropped} bytes of older log output dropped]\n'
+        return header + b''.join(entries).decode(errors='replace')
+
+    def reset(self) -> None:
+        self.acquire()
+        try:
+            self._entries.clear()
+            self._size = 0
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+        finally:
+            self.release()
+        super().close()
+
+
+class _TextHandler(_CaptureHandler):
+    """Keep the formatted records."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lines: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._lines.append(self.format(record) + '\n')
+        except Exception as e:
+            self._lines.append(f'Unable to format {record.msg!r}: {e!r}\n')
+
+    def render(self) -> str:
+        return ''.join(self._lines)
+
+    def reset(self) -> None:
+        self._lines.clear()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the records as they are, to be formatted by the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _CaptureLogger(fixtures.Fixture, abc.ABC):
+    def __init__(
+        self,
+        name: str = '',
+        level: int | None = logging.INFO,
+        format: str | None = None,
+        nuke_handlers: bool = True,
+        threaded: bool = False,
+        attach: bool = True,
+    ) -> None:
+        super().__init__()
+        self._name = name
+        self._level = level
+        self._format = format
+        self._nuke_handlers = nuke_handlers
+        self._threaded = threaded
+        self._attach = attach
+        self._queue: queue.Queue[logging.LogRecord] | None = None
+
+    @abc.abstractmethod
+    def _create_handler(self) -> _CaptureHandler:
+        """Return the handler capturing the records."""
+
+    def _setUp(self) -> None:
+        self._handler = self._create_handler()
+        self.addCleanup(self._handler.close)
+        if self._format:
+            self._handler.setFormatter(logging.Formatter(self._format))
+        handler: logging.Handler = self._handler
+        if self._threaded:
+            self._queue = queue.Queue()
+            listener = logging.handlers.QueueListener(
+                self._queue, self._handler
+            )
+            listener.start()
+            # Stopped once the handler is removed, processing the records
+            # still queued.
+            self.addCleanup(listener.stop)
+            handler = _QueueHandler(self._queue)
+        self.useFixture(
+            fixtures.LogHandler(
+                handler,
+                name=self._name,
+                level=self._level,
+                nuke_handlers=self._nuke_handlers,
+            )
+        )
+        if self._attach:
+            self.addDetail(self.detail_name, self.detail)
+
+    @property
+    def detail_name(self) -> str:
+        """The name of the detail holding the output."""
+        return f"pythonlogging:'{self._name}'"
+
+    @property
+    def detail(self) -> content.Content:
+        """The output, as a detail read on demand."""
+        return content.Content(
+            content_type.UTF8_TEXT, lambda: [self.output.encode()]
+        )
+
+    def _flush(self) -> None:
+        if self._queue is not None:
+            self._queue.join()
+
+    @property
+    def output(self) -> str:
+        """The formatted records."""
+        self._flush()
+        return self._handler.render()
+
+    def reset_output(self) -> None:
+        """Discard the records captured so far."""
+        self._flush()
+        self._handler.reset()
+
+
+class ThreadedLogger(_CaptureLogger):
+    """Replace a logger and capture its output, formatted in a thread.
+
+    Like :class:`fixtures.FakeLogger`, but the records are handed to a
+    :class:`logging.handlers.QueueListener` which formats them in a
+    background thread, so that threads logging concurrently do not wait
+    for each other to format their records. The queue is drained before
+    :attr:`output` is read and when the fixture is cleaned up.
+
+    Since the message arguments are formatted by the background thread, an
+    argument mutated right after the log call may show its new value.
+    Errors in formatting a record are reported in the output rather than
+    raised.
+
+    :param name: The name of the logger to replace. Defaults to the root
+        logger.
+    :param level: The log level to set.
+    :param format: The logging format string to use. Defaults to the
+        message alone.
+    :param nuke_handlers: Whether to remove the existing handlers of the
+        logger.
+    :param attach: Whether to add the output to the details of the fixture.
+        The details of the fixtures used by a test are read as soon as the
+        test ends, so a test may rather attach :attr:`detail` itself when it
+        fails.
+    """
+
+    def __init__(
+        self,
+        name: str = '',
+        level: int | None = logging.INFO,
+        format: str | None = None,
+        nuke_handlers: bool = True,
+        attach: bool = True,
+    ) -> None:
+        super().__init__(
+            name, level, format, nuke_handlers, threaded=True, attach=attach
+        )
+
+    def _create_handler(self) -> _CaptureHandler:
+        return _TextHandler()
+
+
+class LazyLogger(_CaptureLogger):
+    """Replace a logger and capture its records, formatted on demand.
+
+    A drop-in replacement for :class:`fixtures.FakeLogger` which keeps the
+    log records instead of formatting them as they are emitted, so that the
+    logs of passing tests, which nobody reads, cost no formatting. They are
+    formatted when :attr:`output` or :attr:`detail` is read, usually because
+    the test failed. Since a test reads the details of its fixtures when it
+    ends, whatever its outcome, use ``attach=False`` and attach
+    :attr:`detail` on failure, as :class:`oslotest.base.BaseTestCase` does.
+
+    Since the message arguments are only formatted when they are read, an
+    argument mutated after the log call shows its latest value. Errors in
+    formatting a record are reported in the output rather than raised.
+
+    :param name: The name of the logger to replace. Defaults to the root
+        logger.
+    :param level: The log level to set.
+    :param format: The logging format string to use. Defaults to the
+        message alone.
+    :param nuke_handlers: Whether to remove the existing handlers of the
+        logger.
+    :param threaded: Whether to hand the records to a background thread,
+        like :class:`ThreadedLogger`.
+    :param attach: Whether to add the output to the details of the fixture.
+        The details of the fixtures used by a test are read as soon as the
+        test ends, so a test may rather attach :attr:`detail` itself when it
+        fails.
+    """
+
+    def _create_handler(self) -> _CaptureHandler:
+        return _RecordHandler()
+
+
+class BoundedLogger(_CaptureLogger):
+    """Replace a logger and capture the tail of its output.
+
+    Like :class:`fixtures.FakeLogger`, but only the newest ``max_bytes`` of
+    formatted output are kept in memory, in a ring buffer, so that tests
+    logging a lot do not make the memory of the test runner balloon. The
+    older output is dropped, or, if ``spill_dir`` is given, appended to a
+    file created in that directory. The output starts with a line telling
+    how much was dropped and where it was spilled. A single record larger
+    than ``max_bytes`` is cut, keeping its end.
+
+    The spill file is removed when the fixture is cleaned up, unless
+    :attr:`keep_spill` is true. :class:`oslotest.base.BaseTestCase` sets it
+    when the test fails, so that the file can be read afterwards.
+
+    :param name: The name of the logger to replace. Defaults to the root
+        logger.
+    :param level: The log level to set.
+    :param format: The logging format string to use. Defaults to the
+        message alone.
+    :param nuke_handlers: Whether to remove the existing handlers of the
+        logger.
+    :param max_bytes: The size of the output kept in memory, in bytes.
+    :param spill_dir: The directory to spill the older output to, if any.
+    :param threaded: Whether to format the records in a background thread,
+        like :class:`ThreadedLogger`.
+    :param keep_spill: Whether to keep the spill file once the fixture is
+        cleaned up.
+    :param attach: Whether to add the output to the details of the fixture.
+        The details of the fixtures used by a test are read as soon as the
+        test ends, so a test may rather attach :attr:`detail` itself when it
+        fails.
+
+    .. py:attribute:: keep_spill
+
+       Whether to keep the spill file once the fixture is cleaned up.
+
+    .. py:attribute:: spill_path
+
+       The path of the file the older output was spilled to, or ``None``.
+    """
+
+    def __init__(
+        self,
+        name: str = '',
+        level: int | None = logging.INFO,
+        format: str | None = None,
+        nuke_handlers: bool = True,
+        max_bytes: int = 1024 * 1024,
+        spill_dir: str | None = None,
+        threaded: bool = False,
+        keep_spill: bool = False,
+        attach: bool = True,
+    ) -> None:
+        super().__init__(name, level, format, nuke_handlers, threaded, attach)
+        self._max_bytes = max_bytes
+        self._spill_dir = spill_dir
+        self.keep_spill = keep_spill
+
+    def _setUp(self) -> None:
+        # Registered first to run last, once the handler is closed.
+        self.addCleanup(self._remove_spill)
+        super()._setUp()
+
+    def _remove_spill(self) -> None:
+        path = self.spill_path
+        if path is not None and not self.keep_spill:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _create_handler(self) -> _CaptureHandler:
+        return _RingBufferHandler(self._max_bytes, self._spill_dir)
+
+    @property
+    def spill_path(self) -> str | None:
+        handler = self._handler
+        assert isinstance(handler, _RingBufferHandler)
+        return handler.spill_path
 
 
 class ConfigureLogging(fixtures.Fixture):
@@ -43,6 +418,28 @@ class ConfigureLogging(fixtures.Fixture):
     ``OS_LOG_CAPTURE`` is true a FakeLogger is configured. Alternatively,
     ``OS_DEBUG`` can be set to an explicit log level, such as ``INFO``.
 
+    If ``OS_LOG_CAPTURE_LAZY`` is also true, a :class:`LazyLogger` is
+    configured instead, which only formats the captured records when they
+    are read, such as when the test fails.
+
+    If ``OS_LOG_CAPTURE_MAX_BYTES`` is set to a size, optionally followed by
+    ``K``, ``M`` or ``G``, a :class:`BoundedLogger` is configured instead,
+    which only keeps the newest output in memory, up to that size. The older
+    output is spilled to a file in the directory named by
+    ``OS_LOG_CAPTURE_SPILL``, or the temporary directory if it is a true
+    value, or otherwise dropped.
+
+    If ``OS_LOG_CAPTURE_THREADED`` is true, the captured records are
+    formatted in a background thread, see :class:`ThreadedLogger`.
+
+    If ``OS_LOG_SKIP_BELOW_LEVEL`` is true and ``OS_DEBUG`` gives a level,
+    logging below that level is disabled with :func:`logging.disable` while
+    the fixture is active, so that a call such as ``LOG.debug(...)`` returns
+    before creating a record, even on loggers whose own level is lower.
+    Handlers installed by the test, such as a ``FakeLogger`` with a lower
+    level, do not get those records either. If ``OS_DEBUG`` is unset,
+    nothing is disabled.
+
     "True" values include ``True``, ``true``, ``1`` and ``yes``.
     Valid log levels include ``DEBUG``, ``INFO``, ``WARNING``, ``ERROR``,
     ``TRACE`` and ``CRITICAL`` (or any other valid integer logging level).
@@ -57,32 +454,89 @@ class ConfigureLogging(fixtures.Fixture):
        the log level specified by ``OS_DEBUG``, otherwise ``None``.
 
     :param format: The logging format string to use.
+    :param lazy: Whether to capture logs with a :class:`LazyLogger`.
+        Defaults to ``OS_LOG_CAPTURE_LAZY``.
+    :param max_bytes: The size of the captured output kept in memory. If
+        set, the logs are captured with a :class:`BoundedLogger`, formatted
+        as they are emitted, whatever ``lazy`` is. Defaults to
+        ``OS_LOG_CAPTURE_MAX_BYTES``.
+    :param skip_below_level: Whether to disable logging below ``level``.
+        Defaults to ``OS_LOG_SKIP_BELOW_LEVEL``.
+    :param threaded: Whether to format the captured records in a background
+        thread. Defaults to ``OS_LOG_CAPTURE_THREADED``.
+    :param attach: Whether a :class:`LazyLogger`, :class:`BoundedLogger`
+        or :class:`ThreadedLogger` adds the captured output to the details.
+        A :class:`fixtures.FakeLogger` always does.
 
     """
 
     DEFAULT_FORMAT = "%(levelname)8s [%(name)s] %(message)s"
     """Default log format"""
 
-    def __init__(self, format: str = DEFAULT_FORMAT) -> None:
+    def __init__(
+        self,
+        format: str = DEFAULT_FORMAT,
+        lazy: bool | None = None,
+        max_bytes: int | None = None,
+        skip_below_level: bool | None = None,
+        threaded: bool | None = None,
+        attach: bool = True,
+    ) -> None:
         super().__init__()
         self._format = format
-        self.level = 0
-        _os_debug = os.environ.get('OS_DEBUG')
-        _os_level = _try_int(_os_debug)
-        if _os_debug in _TRUE_VALUES:
-            self.level = logging.DEBUG
-        elif _os_level is not None:
-            self.level = _os_level
-        elif _os_debug in _LOG_LEVELS:
-            self.level = _LOG_LEVELS[_os_debug]
-        elif _os_debug and _os_debug not in _FALSE_VALUES:
-            raise ValueError(f'OS_DEBUG={_os_debug} is invalid.')
-        self.capture_logs = os.environ.get('OS_LOG_CAPTURE') in _TRUE_VALUES
-        self.logger: fixtures.FakeLogger | None = None
+        self._attach = attach
+        test_settings = settings.get_settings()
+        self.level = test_settings.debug_level
+        self.capture_logs = test_settings.log_capture
+        if lazy is None:
+            lazy = test_settings.lazy_log_capture
+        self.lazy = lazy
+        if max_bytes is None:
+            max_bytes = test_settings.log_capture_max_bytes
+        self.max_bytes = max_bytes
+        self._spill_dir = test_settings.log_spill_dir
+        if skip_below_level is None:
+            skip_below_level = test_settings.log_skip_below_level
+        self.skip_below_level = skip_below_level
+        if threaded is None:
+            threaded = test_settings.threaded_log_capture
+        self.threaded = threaded
+        self.logger: fixtures.FakeLogger | _CaptureLogger | None = None
 
     def setUp(self) -> None:
         super().setUp()
-        if self.capture_logs:
+        if self.capture_logs and self.max_bytes is not None:
+            self.logger = self.useFixture(
+                BoundedLogger(
+                    format=self._format,
+                    level=self.level,
+                    nuke_handlers=True,
+                    max_bytes=self.max_bytes,
+                    spill_dir=self._spill_dir,
+                    threaded=self.threaded,
+                    attach=self._attach,
+                )
+            )
+        elif self.capture_logs and self.lazy:
+            self.logger = self.useFixture(
+                LazyLogger(
+                    format=self._format,
+                    level=self.level,
+                    nuke_handlers=True,
+                    threaded=self.threaded,
+                    attach=self._attach,
+                )
+            )
+        elif self.capture_logs and self.threaded:
+            self.logger = self.useFixture(
+                ThreadedLogger(
+                    format=self._format,
+                    level=self.level,
+                    nuke_handlers=True,
+                    attach=self._attach,
+                )
+            )
+        elif self.capture_logs:
             self.logger = self.useFixture(
                 fixtures.FakeLogger(
                     format=self._format,
@@ -92,3 +546,6 @@ class ConfigureLogging(fixtures.Fixture):
             )
         else:
             logging.basicConfig(format=self._format, level=self.level)
+        if self.skip_below_level and self.level > logging.NOTSET:
+            self.addCleanup(logging.disable, logging.root.manager.disable)
+            logging.disable(self.level - 1)
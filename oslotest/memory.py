@@ -0,0 +1,340 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Fixtures keeping an eye on the memory used by tests."""
+
+from collections.abc import Iterator
+import contextlib
+import gc
+import logging
+import os
+import tracemalloc
+
+import fixtures
+from testtools import content
+from testtools import content_type
+
+from oslotest import log
+from oslotest import output
+from oslotest import settings
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+# Allocations made by the import machinery and tracemalloc itself are not
+# interesting.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+    tracemalloc.Filter(False, __file__),
+)
+
+# The log records and output captured by a test, and the copies testtools
+# makes of the details when the test ends, stay alive as long as the test
+# itself, which is not a leak.
+_CAPTURE_FILTERS = (
+    tracemalloc.Filter(
+        False, os.path.join(os.path.dirname(logging.__file__), '*')
+    ),
+    tracemalloc.Filter(False, content.__file__),
+    tracemalloc.Filter(False, log.__file__),
+    tracemalloc.Filter(False, output.__file__),
+)
+
+#: The minimum address space :class:`MemoryBudget` leaves to a test when it
+#: limits it, enough for many threads and their malloc arenas.
+GUARD_MIN_HEADROOM = 1024**3
+
+
+class _PeakWatch:
+    """Track the peak of the traced memory from a point on.
+
+    :func:`tracemalloc.reset_peak` is global, so the watches share it: before
+    resetting the peak for a new watch, the active ones record it.
+    """
+
+    _active: list['_PeakWatch'] = []
+
+    def __init__(self) -> None:
+        self._high = 0
+        for watch in self._active:
+            watch._high = max(watch._high, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._active.append(self)
+
+    @property
+    def peak(self) -> int:
+        return max(self._high, tracemalloc.get_traced_memory()[1])
+
+    def stop(self) -> None:
+        self._active.remove(self)
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+class MemoryLeakFixture(fixtures.Fixture):
+    """Detect the memory retained once the fixture is cleaned up.
+
+    Snapshots of the memory allocated by Python are taken with
+    :mod:`tracemalloc` on setUp and on cleanUp, after a garbage collection.
+    The allocation sites whose memory grew the most between the two are
+    attached to the details as ``memory-growth``. The memory allocated by
+    :mod:`logging` and the capture of logs and output is not counted, since
+    the test keeps what it captured.
+
+    Fixtures set up after this one are cleaned up before the second
+    snapshot, so memory they release does not count. Caches filled on
+    first use, such as compiled regular expressions, do count, so the
+    first test using some code may retain memory without leaking any.
+
+    :param limit: If given, cleanUp fails with an :exc:`AssertionError`
+        when more than ``limit`` bytes are retained.
+    :param top: The number of allocation sites to report.
+    :param frames: The number of frames to record for each allocation, if
+        tracemalloc is not already tracing.
+
+    .. py:attribute:: growth
+
+       The number of bytes retained, set on cleanUp.
+    """
+
+    def __init__(
+        self, limit: int | None = None, top: int = 10, frames: int = 1
+    ) -> None:
+        super().__init__()
+        self.limit = limit
+        self.top = top
+        self.frames = frames
+        self.growth = 0
+
+    def _setUp(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.addCleanup(tracemalloc.stop)
+        self.growth = 0
+        self._before: tracemalloc.Snapshot | None = _snapshot().filter_traces(
+            _CAPTURE_FILTERS
+        )
+        self._stats: list[tracemalloc.StatisticDiff] | None = None
+        # NOTE: the details of a fixture used by a test are read before the
+        # fixture is cleaned up, so whichever comes first compares the
+        # snapshots.
+        self.addDetail(
+            'memory-growth',
+            content.Content(content_type.UTF8_TEXT, self._render),
+        )
+        self.addCleanup(self._check)
+
+    def _compare(self) -> list[tracemalloc.StatisticDiff]:
+        if self._stats is None:
+            assert self._before is not None
+            after = _snapshot().filter_traces(_CAPTURE_FILTERS)
+            self._stats = after.compare_to(self._before, 'lineno')
+            self._before = None
+            self.growth = sum(stat.size_diff for stat in self._stats)
+        return self._stats
+
+    def _render(self) -> list[bytes]:
+        stats = self._compare()
+        lines = [f'Total: {self.growth:+d} B\n']
+        growing = [stat for stat in stats if stat.size_diff > 0]
+        lines.extend(f'{stat}\n' for stat in growing[: self.top])
+        return [line.encode() for line in lines]
+
+    def _check(self) -> None:
+        self._compare()
+        if self.limit is not None and self.growth > self.limit:
+            raise AssertionError(
+                f'{self.growth} bytes were retained, more than the limit '
+                f'of {self.limit} bytes. See the memory-growth detail.'
+            )
+
+
+def _address_space() -> int | None:
+    """Return the virtual memory size of the process, if it is known."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class MemoryBudget(fixtures.Fixture):
+    """Set the maximum amount of memory the test may allocate.
+
+    Uses OS_TEST_MEMORY_LIMIT to get the budget, in bytes.
+
+    The peak of the memory allocated by Python while the fixture is active
+    is tracked with :mod:`tracemalloc`, and cleanUp fails with an
+    :exc:`AssertionError` if it exceeds the budget.
+
+    Since the peak is only checked once the test is over, the address space
+    of the process can also be limited with ``guard``, where ``RLIMIT_AS``
+    is supported, so that a runaway test gets a :exc:`MemoryError` instead
+    of driving the machine out of memory. The limit is the size of the
+    address space on setUp plus twice the budget, and at least
+    :data:`GUARD_MIN_HEADROOM`. The address space includes memory which is
+    not allocated by Python, such as thread stacks and malloc arenas, each
+    reserving megabytes of virtual memory, which is why the headroom is so
+    large.
+
+    :param default_limit: The budget used if ``OS_TEST_MEMORY_LIMIT`` is
+        unset. ``0`` means no budget.
+    :raises ValueError: On setUp, if ``OS_TEST_MEMORY_LIMIT`` is invalid.
+    :param scaling_factor: The budget is multiplied by this factor.
+    :param guard: Whether to limit the address space.
+
+    .. py:attribute:: peak
+
+       The peak memory allocated while the fixture was active, in bytes,
+       set on cleanUp.
+    """
+
+    def __init__(
+        self,
+        default_limit: int = 0,
+        scaling_factor: int | float = 1,
+        guard: bool = False,
+    ) -> None:
+        super().__init__()
+        self._default_limit = default_limit
+        self._scaling_factor = scaling_factor
+        self._guard = guard
+        self.peak = 0
+
+    def setUp(self) -> None:
+        super().setUp()
+        limit = settings.get_settings().memory_limit
+        if limit is None:
+            # If the limit is unset use the default limit.
+            limit = self._default_limit
+        try:
+            scaled_limit = int(limit * self._scaling_factor)
+        except (TypeError, ValueError):
+            # If scaling factor is invalid, use the basic limit.
+            scaled_limit = limit
+        if scaled_limit <= 0:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.addCleanup(tracemalloc.stop)
+        watch = _PeakWatch()
+        self.addCleanup(watch.stop)
+        baseline = tracemalloc.get_traced_memory()[0]
+        self.addCleanup(self._check, watch, baseline, scaled_limit)
+        if self._guard:
+            self._limit_address_space(
+                max(2 * scaled_limit, GUARD_MIN_HEADROOM)
+            )
+
+    def _limit_address_space(self, headroom: int) -> None:
+        size = _address_space()
+        if resource is None or size is None:
+            return
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = size + headroom
+        if hard != resource.RLIM_INFINITY and limit > hard:
+            return
+        if soft != resource.RLIM_INFINITY and soft <= limit:
+            # Already tighter.
+            return
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        self.addCleanup(resource.setrlimit, resource.RLIMIT_AS, (soft, hard))
+
+    def _check(self, watch: _PeakWatch, baseline: int, limit: int) -> None:
+        self.peak = max(0, watch.peak - baseline)
+        if self.peak > limit:
+            raise AssertionError(
+                f'The test allocated up to {self.peak} bytes, more than '
+                f'its budget of {limit} bytes.'
+            )
+
+
+class AllocationStats:
+    """The memory allocated in a :func:`trace_allocations` block.
+
+    The attributes are set when the block exits.
+
+    .. py:attribute:: blocks
+
+       The number of memory blocks allocated in the block and still
+       allocated at its end.
+
+    .. py:attribute:: peak_bytes
+
+       The peak number of bytes allocated in the block, including memory
+       freed before its end, such as temporary copies.
+
+    .. py:attribute:: top
+
+       The :class:`tracemalloc.StatisticDiff` of the allocation sites, the
+       biggest first.
+    """
+
+    def __init__(self) -> None:
+        self.blocks = 0
+        self.peak_bytes = 0
+        self.top: list[tracemalloc.StatisticDiff] = []
+
+    def format_top(self, limit: int = 10) -> str:
+        """Return the ``limit`` biggest allocation sites, one per line."""
+        return '\n'.join(str(stat) for stat in self.top[:limit])
+
+
+@contextlib.contextmanager
+def trace_allocations() -> Iterator[AllocationStats]:
+    """Measure the memory allocated by the code in the ``with`` block.
+
+    Python only keeps track of live memory blocks, so a block allocated and
+    freed within the ``with`` block counts towards
+    :attr:`AllocationStats.peak_bytes` but not
+    :attr:`AllocationStats.blocks`.
+
+    :return: A context manager yielding an :class:`AllocationStats`.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    stats = AllocationStats()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        watch = _PeakWatch()
+        try:
+            baseline = tracemalloc.get_traced_memory()[0]
+            yield stats
+            peak = watch.peak
+        finally:
+            watch.stop()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    # NOTE: filtering allocates memory too, so only filter once both
+    # snapshots are taken.
+    before = before.filter_traces(_SNAPSHOT_FILTERS)
+    after = after.filter_traces(_SNAPSHOT_FILTERS)
+    stats.peak_bytes = max(0, peak - baseline)
+    stats.top = [
+        stat
+        for stat in after.compare_to(before, 'lineno')
+        if stat.size_diff > 0 or stat.count_diff > 0
+    ]
+    stats.blocks = max(0, len(after.traces) - len(before.traces))
@@ -13,10 +13,14 @@
 from collections.abc import Sequence
 from importlib.machinery import ModuleSpec
 import sys
+import time
 from types import ModuleType
+from typing import Any
 
 import fixtures
 
+from oslotest import profiling
+
 
 class DisableModuleFixture(fixtures.Fixture):
     """A fixture to provide support for unloading/disabling modules."""
@@ -58,3 +62,130 @@ class _NoModuleFinder:
         if fullname == self.module or fullname.startswith(self.module + '.'):
             raise ImportError
         return None
+
+
+class ImportProfileFixture(fixtures.Fixture):
+    """Record the modules imported while the fixture is active.
+
+    Every module imported for the first time is timed, and a ranking of the
+    imports by the time spent executing the module itself, excluding the
+    modules it imports in turn, is attached to the details as ``imports``::
+
+        [{"module": "heavy.driver", "seconds": 0.52, "self": 0.31}, ...]
+
+    where ``seconds`` includes the nested imports. Modules that were already
+    imported cost nothing and are not listed.
+
+    :param report_as: If given, the number of modules imported and the
+        total time spent importing them are also added to the run-wide
+        ``import-profile`` report under this key, see
+        :func:`oslotest.profiling.aggregate`.
+
+    .. py:attribute:: imports
+
+       The recorded imports, as ``(module, seconds, self seconds)`` tuples
+       in the order the imports completed.
+    """
+
+    def __init__(self, report_as: str | None = None) -> None:
+        super().__init__()
+        self.report_as = report_as
+        self.imports: list[tuple[str, float, float]] = []
+
+    def _setUp(self) -> None:
+        self.imports = []
+        # NOTE: the details of a fixture used by a test are read before the
+        # fixture is cleaned up, so the ranking is built when it is read.
+        self.addDetail('imports', profiling.compact_json_content(self._rank))
+        finder = _TimingFinder(self.imports)
+        sys.meta_path.insert(0, finder)
+        self.addCleanup(self._report)
+        self.addCleanup(sys.meta_path.remove, finder)
+
+    def _rank(self) -> list[dict[str, Any]]:
+        return [
+            {
+                'module': name,
+                'seconds': round(seconds, 6),
+                'self': round(own, 6),
+            }
+            for name, seconds, own in sorted(
+                self.imports, key=lambda i: i[2], reverse=True
+            )
+        ]
+
+    def _report(self) -> None:
+        if self.report_as is not None:
+            total = sum(own for _, _, own in self.imports)
+            profiling.aggregate(
+                'import-profile', self.report_as, [len(self.imports), total]
+            )
+
+
+class _TimingFinder:
+    """Wrap the loaders found by the other finders to time the imports."""
+
+    def __init__(self, imports: list[tuple[str, float, float]]) -> None:
+        self.imports = imports
+        # The time spent in nested imports, for each import in progress.
+        self.stack: list[float] = []
+        self._finding: set[str] = set()
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None,
+        target: ModuleType | None = None,
+        /,
+    ) -> ModuleSpec | None:
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(fullname)
+        if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+            spec.loader = _TimingLoader(spec.loader, self)  # type: ignore
+        return spec
+
+
+class _TimingLoader:
+    """Time ``exec_module`` of the loader it wraps."""
+
+    def __init__(self, loader: Any, finder: _TimingFinder) -> None:
+        self._loader = loader
+        self._finder = finder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+    def create_module(self, spec: ModuleSpec) -> ModuleType | None:
+        return self._loader.create_module(spec)  # type: ignore[no-any-return]
+
+    def exec_module(self, module: ModuleType) -> None:
+        # Code looking at the loader of the module after it is imported
+        # should find the real one.
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        stack = self._finder.stack
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self._finder.imports.append(
+                (module.__name__, elapsed, elapsed - nested)
+            )
@@ -10,12 +10,89 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import os
+from collections.abc import Iterator
+import io
+import tempfile
 from typing import IO
 
 import fixtures
+from testtools import content
+from testtools import content_type
 
-_TRUE_VALUES = ('True', 'true', '1', 'yes')
+from oslotest import settings
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class SpooledStream(fixtures.Fixture):
+    """Provide a text stream spooled to disk and expose it as a detail.
+
+    Like :func:`fixtures.StringStream`, but the text is only kept in memory
+    up to ``max_size`` bytes, after which it is moved to an anonymous
+    temporary file. The file is closed on cleanup.
+
+    :param detail_name: The name of the detail.
+    :param max_size: The size of the text kept in memory, in bytes.
+    :param keep: The detail only holds the first and the last ``keep``
+        bytes of the text, with a line telling how much was left out in
+        between. Defaults to half of ``max_size``, so that a detail copied
+        into the test results is not larger than the text kept in memory.
+
+    .. py:attribute:: stream
+
+       The text stream.
+    """
+
+    def __init__(
+        self, detail_name: str, max_size: int, keep: int | None = None
+    ) -> None:
+        super().__init__()
+        self._detail_name = detail_name
+        self._max_size = max_size
+        self._keep = max_size // 2 if keep is None else keep
+
+    def _setUp(self) -> None:
+        self._file = tempfile.SpooledTemporaryFile(
+            max_size=self._max_size, dir=tempfile.gettempdir()
+        )
+        self.stream: IO[str] = io.TextIOWrapper(
+            self._file,
+            encoding='utf8',
+            write_through=True,
+        )
+        self.addCleanup(self.stream.close)
+        self.addDetail(
+            self._detail_name,
+            content.Content(content_type.UTF8_TEXT, self._iter_bytes),
+        )
+
+    def _read(self, offset: int, size: int) -> Iterator[bytes]:
+        self._file.seek(offset)
+        while size > 0:
+            chunk = self._file.read(min(size, _CHUNK_SIZE))
+            if not chunk:
+                return
+            size -= len(chunk)
+            yield chunk
+
+    def _iter_bytes(self) -> Iterator[bytes]:
+        self.stream.flush()
+        position = self._file.tell()
+        try:
+            size = self._file.seek(0, io.SEEK_END)
+            if size <= 2 * self._keep:
+                yield from self._read(0, size)
+                return
+            # The cuts may split characters.
+            head = b''.join(self._read(0, self._keep))
+            yield head.decode('utf8', 'replace').encode()
+            omitted = size - 2 * self._keep
+            yield f'\n[... {omitted} bytes left out ...]\n'.encode()
+            tail = b''.join(self._read(size - self._keep, self._keep))
+            yield tail.decode('utf8', 'replace').encode()
+        finally:
+            # Keep on writing where the stream was.
+            self._file.seek(position)
 
 
 class CaptureOutput(fixtures.Fixture):
@@ -28,49 +105,81 @@ class CaptureOutput(fixtures.Fixture):
 
     "True" values include ``True``, ``true``, ``1``, and ``yes``.
 
+    If ``OS_OUTPUT_CAPTURE_MAX_BYTES`` is set to a size, optionally followed
+    by ``K``, ``M`` or ``G``, the captured output is kept in memory up to
+    that size and spooled to a temporary file beyond, see
+    :class:`SpooledStream`. Only the first and last bytes of the output,
+    half of that size each, are then attached to the test details, unless
+    ``OS_OUTPUT_CAPTURE_KEEP_BYTES`` is also set to another size.
+
     :param do_stdout: Whether to capture stdout.
     :type do_stdout: bool
     :param do_stderr: Whether to capture stderr.
     :type do_stderr: bool
+    :param max_size: The size of the output of each stream kept in memory.
+        Defaults to ``OS_OUTPUT_CAPTURE_MAX_BYTES`` if the streams to
+        capture are also taken from the environment, otherwise no limit.
+    :type max_size: int
+    :param keep: The size of the head and tail of the output attached to the
+        details when it is spooled. Defaults to
+        ``OS_OUTPUT_CAPTURE_KEEP_BYTES`` along with ``max_size``, or to half
+        of ``max_size``.
+    :type keep: int
 
     .. py:attribute:: stdout
 
-       The ``stream`` attribute from a :class:`StringStream` instance
-       replacing stdout.
+       The ``stream`` attribute from a :class:`StringStream` or
+       :class:`SpooledStream` instance replacing stdout.
 
     .. py:attribute:: stderr
 
-       The ``stream`` attribute from a :class:`StringStream` instance
-       replacing stderr.
+       The ``stream`` attribute from a :class:`StringStream` or
+       :class:`SpooledStream` instance replacing stderr.
 
     """
 
     def __init__(
-        self, do_stdout: bool | None = None, do_stderr: bool | None = None
+        self,
+        do_stdout: bool | None = None,
+        do_stderr: bool | None = None,
+        max_size: int | None = None,
+        keep: int | None = None,
     ):
         super().__init__()
+        from_env = do_stdout is None or do_stderr is None
         if do_stdout is None:
-            self.do_stdout = (
-                os.environ.get('OS_STDOUT_CAPTURE') in _TRUE_VALUES
-            )
-        else:
-            self.do_stdout = do_stdout
+            do_stdout = settings.get_settings().stdout_capture
         if do_stderr is None:
-            self.do_stderr = (
-                os.environ.get('OS_STDERR_CAPTURE') in _TRUE_VALUES
-            )
-        else:
-            self.do_stderr = do_stderr
+            do_stderr = settings.get_settings().stderr_capture
+        self.do_stdout = do_stdout
+        self.do_stderr = do_stderr
+        if from_env and max_size is None:
+            max_size = settings.get_settings().output_capture_max_bytes
+            if keep is None:
+                keep = settings.get_settings().output_capture_keep_bytes
+        self.max_size = max_size
+        self.keep = keep
         self.stdout: IO[str] | None = None
         self.stderr: IO[str] | None = None
 
     def setUp(self) -> None:
         super().setUp()
         if self.do_stdout:
-            self._stdout_fixture = fixtures.StringStream('stdout')
-            self.stdout = self.useFixture(self._stdout_fixture).stream
+            self.stdout = self._capture('stdout')
             self.useFixture(fixtures.MonkeyPatch('sys.stdout', self.stdout))
         if self.do_stderr:
-            self._stderr_fixture = fixtures.StringStream('stderr')
-            self.stderr = self.useFixture(self._stderr_fixture).stream
+            self.stderr = self._capture('stderr')
             self.useFixture(fixtures.MonkeyPatch('sys.stderr', self.stderr))
+
+    def reset_output(self) -> None:
+        """Discard the output captured so far."""
+        for stream in (self.stdout, self.stderr):
+            if stream is not None and not stream.closed:
+                stream.seek(0)
+                stream.truncate()
+
+    def _capture(self, name: str) -> IO[str]:
+        if self.max_size is None:
+            return self.useFixture(fixtures.StringStream(name)).stream
+        fixture = SpooledStream(name, self.max_size, self.keep)
+        return self.useFixture(fixture).stream
@@ -0,0 +1,280 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Helpers for measuring where test run time goes."""
+
+import atexit
+import collections
+import json
+import os
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Any
+
+import fixtures
+from testtools import content
+from testtools import content_type
+
+_REPORTS: dict[str, dict[str, list[float]]] = {}
+
+
+def _dump_json(data: Any) -> bytes:
+    return json.dumps(data, separators=(',', ':'), sort_keys=True).encode()
+
+
+def compact_json_content(data: Any) -> content.Content:
+    """Create a JSON detail using the most compact separators.
+
+    If ``data`` is callable, it is called for the data when the detail is
+    read.
+    """
+    if callable(data):
+        return content.Content(content_type.JSON, lambda: [_dump_json(data())])
+    return content.Content(content_type.JSON, lambda: [_dump_json(data)])
+
+
+def report_path(name: str) -> str:
+    """Return the path of the run-wide report called ``name``.
+
+    Reports are written to the directory named by ``OS_TEST_PROFILE_DIR``,
+    or the current working directory if it is unset. The process id is part
+    of the file name so that parallel workers do not overwrite each other.
+    """
+    directory = os.environ.get('OS_TEST_PROFILE_DIR') or os.getcwd()
+    return os.path.join(directory, f'oslotest-{name}-{os.getpid()}.json')
+
+
+def _write_reports() -> None:
+    for name, totals in _REPORTS.items():
+        with open(report_path(name), 'wb') as f:
+            f.write(_dump_json(totals))
+
+
+def aggregate(name: str, key: str, values: list[float]) -> None:
+    """Add ``values`` to the run-wide report ``name`` under ``key``.
+
+    Values are summed element-wise with anything previously recorded for
+    ``key``. The reports are written once, when the process exits.
+    """
+    if not _REPORTS:
+        atexit.register(_write_reports)
+    totals = _REPORTS.setdefault(name, {})
+    current = totals.get(key)
+    if current is None:
+        totals[key] = list(values)
+    else:
+        for i, value in enumerate(values):
+            current[i] += value
+
+
+class FixtureTimings:
+    """Wall time spent setting up and cleaning up fixtures in one test.
+
+    Timings are keyed by the fixture class name; several fixtures of the
+    same class used by a test are summed together.
+    """
+
+    def __init__(self) -> None:
+        # name -> [count, setUp seconds, cleanUp seconds]
+        self.timings: dict[str, list[float]] = {}
+
+    def _entry(self, name: str) -> list[float]:
+        return self.timings.setdefault(name, [0, 0.0, 0.0])
+
+    def record_setup(self, name: str, elapsed: float) -> None:
+        entry = self._entry(name)
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def record_cleanup(self, name: str, elapsed: float) -> None:
+        self._entry(name)[2] += elapsed
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        return {
+            name: {
+                'count': int(count),
+                'setUp': round(setup, 6),
+                'cleanUp': round(cleanup, 6),
+            }
+            for name, (count, setup, cleanup) in self.timings.items()
+        }
+
+    def aggregate(self) -> None:
+        """Add these timings to the run-wide ``fixture-profile`` report."""
+        for name, values in self.timings.items():
+            aggregate('fixture-profile', name, values)
+
+
+class TimedFixture(fixtures.Fixture):
+    """Proxy a fixture, recording how long its setUp and cleanUp take."""
+
+    def __init__(
+        self, fixture: fixtures.Fixture, timings: FixtureTimings
+    ) -> None:
+        self._fixture = fixture
+        self._timings = timings
+        self._name = type(fixture).__name__
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._fixture, name)
+
+    def setUp(self) -> None:
+        start = time.perf_counter()
+        try:
+            self._fixture.setUp()
+        finally:
+            self._timings.record_setup(self._name, time.perf_counter() - start)
+
+    def cleanUp(self, raise_first: bool = True) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._fixture.cleanUp(raise_first=raise_first)
+        finally:
+            self._timings.record_cleanup(
+                self._name, time.perf_counter() - start
+            )
+
+    def getDetails(self) -> dict[str, content.Content]:
+        return self._fixture.getDetails()
+
+
+def _collapse(frame: FrameType) -> str:
+    names = []
+    f: FrameType | None = frame
+    while f is not None:
+        code = f.f_code
+        names.append(
+            f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+        )
+        f = f.f_back
+    return ';'.join(reversed(names))
+
+
+class _Watch:
+    def __init__(self, thread_id: int, deadline: float) -> None:
+        self.thread_id = thread_id
+        self.deadline = deadline
+        self.stacks: collections.Counter[str] = collections.Counter()
+
+
+class _Sampler:
+    """A thread sampling the stacks of the threads being watched.
+
+    The thread is shared by the whole process and sleeps until the
+    deadline of a watch has passed, so that watched code finishing before
+    its deadline is never sampled.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._watches: list[_Watch] = []
+        self._thread: threading.Thread | None = None
+
+    def watch(self, watch: _Watch) -> None:
+        with self._cond:
+            self._watches.append(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='oslotest-sampler', daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def unwatch(self, watch: _Watch) -> None:
+        with self._cond:
+            self._watches.remove(watch)
+
+    def _run(self) -> None:
+        with self._cond:
+            while True:
+                if not self._watches:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                due = [w for w in self._watches if w.deadline <= now]
+                if not due:
+                    deadline = min(w.deadline for w in self._watches)
+                    self._cond.wait(deadline - now)
+                    continue
+                frames = sys._current_frames()
+                for w in due:
+                    frame = frames.get(w.thread_id)
+                    if frame is not None:
+                        w.stacks[_collapse(frame)] += 1
+                del frames
+                self._cond.wait(self.interval)
+
+    def _after_fork(self) -> None:
+        # Only the thread which forked survives in the child.
+        self._cond = threading.Condition()
+        self._watches = []
+        self._thread = None
+
+
+_sampler = _Sampler(interval=0.005)
+os.register_at_fork(after_in_child=_sampler._after_fork)
+
+
+class SlowTestProfiler(fixtures.Fixture):
+    """Sample the stack of the current thread once it is slow.
+
+    Nothing happens until ``threshold`` seconds after setUp. From then
+    until cleanUp, a background thread samples the stack of the thread
+    which set up the fixture every few milliseconds. Code finishing before
+    the threshold pays for nothing but registering with that thread.
+
+    Being a thread rather than a signal handler, the sampler also sees
+    where time is spent waiting, and does not interfere with the timers
+    used by :mod:`oslotest.timeout`.
+
+    :param threshold: The time, in seconds, after which to start sampling.
+
+    .. py:attribute:: samples
+
+       The number of stacks sampled.
+    """
+
+    def __init__(self, threshold: float) -> None:
+        super().__init__()
+        self.threshold = threshold
+        self._watch: _Watch | None = None
+
+    def _setUp(self) -> None:
+        self._watch = _Watch(
+            threading.get_ident(), time.monotonic() + self.threshold
+        )
+        _sampler.watch(self._watch)
+        self.addCleanup(_sampler.unwatch, self._watch)
+
+    @property
+    def samples(self) -> int:
+        if self._watch is None:
+            return 0
+        return sum(self._watch.stacks.values())
+
+    def collapsed(self) -> str:
+        """Return the samples as collapsed stacks.
+
+        Each line is made of the frames of a stack, outermost first,
+        separated by semicolons, followed by the number of times the stack
+        was sampled. This is the input format of ``flamegraph.pl`` and
+        most other flame graph tools.
+        """
+        if self._watch is None:
+            return ''
+        return ''.join(
+            f'{stack} {count}\n'
+            for stack, count in sorted(self._watch.stacks.items())
+        )
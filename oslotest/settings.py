@@ -0,0 +1,344 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Process-wide settings read from the ``OS_*`` environment variables.
+
+The environment is parsed the first time :func:`get_settings` is called and
+the result is cached for the rest of the process, so that fixtures created
+for every test do not have to parse it again. Code that changes the
+environment variables after that point must call :func:`reset`, or use the
+:class:`ResetSettings` fixture, for the change to be noticed.
+"""
+
+import logging
+import os
+import tempfile
+from typing import Any
+
+import fixtures
+
+_TRUE_VALUES = ('True', 'true', '1', 'yes')
+_FALSE_VALUES = ('False', 'false', '0', 'no')
+_BASE_LOG_LEVELS = ('DEBUG', 'INFO', 'WARN', 'WARNING', 'ERROR', 'CRITICAL')
+_LOG_LEVELS: dict[str, int] = {
+    n: getattr(logging, n) for n in _BASE_LOG_LEVELS
+}
+_LOG_LEVELS.update(
+    {
+        'TRACE': 5,
+    }
+)
+
+#: The history database used when ``OS_TEST_HISTORY`` is a true value.
+DEFAULT_HISTORY_PATH = '.oslotest-history.sqlite'
+
+#: The baseline file used when ``OS_TEST_BASELINE`` is a true value.
+DEFAULT_BASELINE_PATH = '.oslotest-baselines.json'
+
+#: The memory, in bytes, a test may retain when ``OS_TEST_LEAKCHECK`` is a
+#: true value.
+DEFAULT_LEAKCHECK_LIMIT = 1024 * 1024
+
+#: The fraction of the test timeout after which a test is profiled when
+#: ``OS_TEST_PROFILE_SLOW`` is a true value.
+DEFAULT_PROFILE_SLOW_FRACTION = 0.5
+
+_SIZE_SUFFIXES = {'K': 1024, 'M': 1024**2, 'G': 1024**3}
+
+
+def _try_int(value: Any) -> int | None:
+    """Try to make some value into an int."""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _try_float(value: Any) -> float | None:
+    """Try to make some value into a float."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _get_bool(name: str) -> bool:
+    return os.environ.get(name) in _TRUE_VALUES
+
+
+def _get_log_level(name: str) -> int:
+    value = os.environ.get(name)
+    level = _try_int(value)
+    if value in _TRUE_VALUES:
+        return logging.DEBUG
+    elif level is not None:
+        return level
+    elif value in _LOG_LEVELS:
+        return _LOG_LEVELS[value]
+    elif value and value not in _FALSE_VALUES:
+        raise ValueError(f'{name}={value} is invalid.')
+    return 0
+
+
+def _get_path(name: str, default: str) -> str | None:
+    value = os.environ.get(name)
+    if not value or value in _FALSE_VALUES:
+        return None
+    if value in _TRUE_VALUES:
+        value = default
+    return os.path.abspath(value)
+
+
+def _parse_size(name: str, value: str) -> int:
+    multiplier = _SIZE_SUFFIXES.get(value[-1:].upper())
+    number = value[:-1] if multiplier else value
+    size = _try_int(number)
+    if size is None or size < 0:
+        raise ValueError(f'{name}={value} is invalid.')
+    return size * (multiplier or 1)
+
+
+def _get_size(name: str, default: int | None = None) -> int | None:
+    value = os.environ.get(name)
+    if not value:
+        return None
+    if default is None and value.isdigit():
+        # Without a default, "0" and "1" are sizes rather than booleans.
+        return int(value)
+    if value in _FALSE_VALUES:
+        return None
+    if value in _TRUE_VALUES:
+        return default
+    return _parse_size(name, value)
+
+
+def _get_threshold(name: str) -> tuple[float | None, float | None]:
+    value = os.environ.get(name)
+    if not value or value in _FALSE_VALUES:
+        return None, None
+    if value in _TRUE_VALUES:
+        return None, DEFAULT_PROFILE_SLOW_FRACTION
+    if value.endswith('%'):
+        percent = _try_float(value[:-1])
+        if percent is None or percent <= 0:
+            raise ValueError(f'{name}={value} is invalid.')
+        return None, percent / 100
+    seconds = _try_float(value)
+    if seconds is None or seconds < 0:
+        raise ValueError(f'{name}={value} is invalid.')
+    return seconds, None
+
+
+class Settings:
+    """The test settings found in the environment.
+
+    "True" values include ``True``, ``true``, ``1`` and ``yes``.
+
+    .. py:attribute:: test_timeout
+
+       The value of ``OS_TEST_TIMEOUT``, in seconds, or ``None`` if it is
+       unset or invalid.
+
+    .. py:attribute:: cpu_timeout
+
+       The value of ``OS_TEST_CPU_TIMEOUT``, in seconds, or ``None`` if it
+       is unset or invalid.
+
+    .. py:attribute:: calibrate_timeouts
+
+       Whether ``OS_TEST_TIMEOUT_CALIBRATE`` is true.
+
+    .. py:attribute:: memory_limit
+
+       The size in bytes given by ``OS_TEST_MEMORY_LIMIT``, optionally
+       followed by ``K``, ``M`` or ``G``, or ``None`` if it is unset or a
+       true or false value other than a number.
+
+    .. py:attribute:: stdout_capture
+
+       Whether ``OS_STDOUT_CAPTURE`` is true.
+
+    .. py:attribute:: stderr_capture
+
+       Whether ``OS_STDERR_CAPTURE`` is true.
+
+    .. py:attribute:: output_capture_max_bytes
+
+       The size in bytes given by ``OS_OUTPUT_CAPTURE_MAX_BYTES``,
+       optionally followed by ``K``, ``M`` or ``G``, or ``None`` if it is
+       unset or a true or false value other than a number.
+
+    .. py:attribute:: output_capture_keep_bytes
+
+       The size in bytes given by ``OS_OUTPUT_CAPTURE_KEEP_BYTES``,
+       optionally followed by ``K``, ``M`` or ``G``, or ``None`` if it is
+       unset or a true or false value other than a number.
+
+    .. py:attribute:: debug_level
+
+       ``logging.DEBUG`` if ``OS_DEBUG`` is true, otherwise the log level
+       it names, otherwise ``0``.
+
+    .. py:attribute:: log_capture
+
+       Whether ``OS_LOG_CAPTURE`` is true.
+
+    .. py:attribute:: lazy_log_capture
+
+       Whether ``OS_LOG_CAPTURE_LAZY`` is true.
+
+    .. py:attribute:: threaded_log_capture
+
+       Whether ``OS_LOG_CAPTURE_THREADED`` is true.
+
+    .. py:attribute:: log_skip_below_level
+
+       Whether ``OS_LOG_SKIP_BELOW_LEVEL`` is true.
+
+    .. py:attribute:: log_capture_max_bytes
+
+       The size in bytes given by ``OS_LOG_CAPTURE_MAX_BYTES``, optionally
+       followed by ``K``, ``M`` or ``G``, or ``None`` if it is unset or a
+       true or false value other than a number.
+
+    .. py:attribute:: log_spill_dir
+
+       The absolute path of the directory named by
+       ``OS_LOG_CAPTURE_SPILL``, the temporary directory if it is a true
+       value, or ``None`` if it is unset or false.
+
+    .. py:attribute:: profile_fixtures
+
+       Whether ``OS_TEST_PROFILE_FIXTURES`` is true.
+
+    .. py:attribute:: profile_imports
+
+       Whether ``OS_TEST_PROFILE_IMPORTS`` is true.
+
+    .. py:attribute:: profile_slow_after
+
+       The number of seconds given by ``OS_TEST_PROFILE_SLOW``, after which
+       the stack of a test is sampled, or ``None``.
+
+    .. py:attribute:: profile_slow_fraction
+
+       The fraction of the test timeout given by ``OS_TEST_PROFILE_SLOW`` as
+       a percentage, such as ``50%``, after which the stack of a test is
+       sampled, :data:`DEFAULT_PROFILE_SLOW_FRACTION` if it is a true value,
+       or ``None``.
+
+    .. py:attribute:: run_benchmarks
+
+       Whether ``OS_RUN_BENCHMARKS`` is true.
+
+    .. py:attribute:: tempfile_in_memory
+
+       Whether ``OS_TEST_TEMPFILE_IN_MEMORY`` is true.
+
+    .. py:attribute:: history_file
+
+       The absolute path of the test duration history database named by
+       ``OS_TEST_HISTORY``, :data:`DEFAULT_HISTORY_PATH` if it is a true
+       value, or ``None`` if it is unset or false.
+
+    .. py:attribute:: baseline_file
+
+       The absolute path of the performance baseline file named by
+       ``OS_TEST_BASELINE``, :data:`DEFAULT_BASELINE_PATH` if it is a true
+       value, or ``None`` if it is unset or false.
+
+    .. py:attribute:: update_baselines
+
+       Whether ``OS_TEST_BASELINE_UPDATE`` is true.
+
+    .. py:attribute:: leakcheck_limit
+
+       The memory, in bytes, a test may retain according to
+       ``OS_TEST_LEAKCHECK``: :data:`DEFAULT_LEAKCHECK_LIMIT` if it is a
+       true value, or the size it gives, optionally followed by ``K``, ``M``
+       or ``G``. ``None`` if it is unset or false.
+
+    :raises ValueError: If ``OS_DEBUG`` is neither a true or false value
+        nor a valid log level, or if a size or threshold is invalid.
+    """
+
+    def __init__(self) -> None:
+        self.test_timeout = _try_float(os.environ.get('OS_TEST_TIMEOUT'))
+        self.cpu_timeout = _try_float(os.environ.get('OS_TEST_CPU_TIMEOUT'))
+        self.calibrate_timeouts = _get_bool('OS_TEST_TIMEOUT_CALIBRATE')
+        self.memory_limit = _get_size('OS_TEST_MEMORY_LIMIT')
+        self.stdout_capture = _get_bool('OS_STDOUT_CAPTURE')
+        self.stderr_capture = _get_bool('OS_STDERR_CAPTURE')
+        self.output_capture_max_bytes = _get_size(
+            'OS_OUTPUT_CAPTURE_MAX_BYTES'
+        )
+        self.output_capture_keep_bytes = _get_size(
+            'OS_OUTPUT_CAPTURE_KEEP_BYTES'
+        )
+        self.debug_level = _get_log_level('OS_DEBUG')
+        self.log_capture = _get_bool('OS_LOG_CAPTURE')
+        self.lazy_log_capture = _get_bool('OS_LOG_CAPTURE_LAZY')
+        self.threaded_log_capture = _get_bool('OS_LOG_CAPTURE_THREADED')
+        self.log_skip_below_level = _get_bool('OS_LOG_SKIP_BELOW_LEVEL')
+        self.log_capture_max_bytes = _get_size('OS_LOG_CAPTURE_MAX_BYTES')
+        self.log_spill_dir = _get_path(
+            'OS_LOG_CAPTURE_SPILL', tempfile.gettempdir()
+        )
+        self.profile_fixtures = _get_bool('OS_TEST_PROFILE_FIXTURES')
+        self.profile_imports = _get_bool('OS_TEST_PROFILE_IMPORTS')
+        self.profile_slow_after, self.profile_slow_fraction = _get_threshold(
+            'OS_TEST_PROFILE_SLOW'
+        )
+        self.run_benchmarks = _get_bool('OS_RUN_BENCHMARKS')
+        self.tempfile_in_memory = _get_bool('OS_TEST_TEMPFILE_IN_MEMORY')
+        self.history_file = _get_path('OS_TEST_HISTORY', DEFAULT_HISTORY_PATH)
+        self.baseline_file = _get_path(
+            'OS_TEST_BASELINE', DEFAULT_BASELINE_PATH
+        )
+        self.update_baselines = _get_bool('OS_TEST_BASELINE_UPDATE')
+        self.leakcheck_limit = _get_size(
+            'OS_TEST_LEAKCHECK', DEFAULT_LEAKCHECK_LIMIT
+        )
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Return the settings, parsing the environment on first use."""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+
+def reset() -> None:
+    """Forget the cached settings.
+
+    The environment is parsed again by the next call to
+    :func:`get_settings`.
+    """
+    global _settings
+    _settings = None
+
+
+class ResetSettings(fixtures.Fixture):
+    """Forget the cached settings on setUp and again on cleanUp.
+
+    Use this in tests that change the ``OS_*`` environment variables, so
+    that the change is seen while the fixture is active and does not leak
+    into later tests.
+    """
+
+    def _setUp(self) -> None:
+        reset()
+        self.addCleanup(reset)
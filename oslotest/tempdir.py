@@ -0,0 +1,275 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Fixtures for isolating the temporary and home directories of tests."""
+
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+from typing import Any
+
+import fixtures
+
+# Audit events whose first one or two arguments are paths that are about to
+# be used.
+_PATH_EVENTS = frozenset(
+    (
+        'ctypes.dlopen',
+        'open',
+        'os.chdir',
+        'os.chflags',
+        'os.chmod',
+        'os.chown',
+        'os.getxattr',
+        'os.link',
+        'os.listdir',
+        'os.listxattr',
+        'os.mkdir',
+        'os.mkfifo',
+        'os.mknod',
+        'os.remove',
+        'os.removexattr',
+        'os.rename',
+        'os.rmdir',
+        'os.scandir',
+        'os.setxattr',
+        'os.symlink',
+        'os.truncate',
+        'os.utime',
+        'shutil.copyfile',
+        'shutil.copymode',
+        'shutil.copystat',
+        'shutil.copytree',
+        'shutil.make_archive',
+        'shutil.move',
+        'shutil.rmtree',
+        'shutil.unpack_archive',
+        # The address of a Unix socket is a path.
+        'socket.bind',
+        'socket.connect',
+        'socket.sendto',
+        'sqlite3.connect',
+    )
+)
+# Audit events starting another program, which may use any of the lazy
+# directories through the environment.
+_PROCESS_EVENTS = frozenset(
+    (
+        'os.exec',
+        'os.posix_spawn',
+        'os.spawn',
+        'os.system',
+        'subprocess.Popen',
+    )
+)
+
+_lazy_lock = threading.Lock()
+_lazy_paths: set[str] = set()
+# The lazy directories created for their fixture, which may remove them.
+_created_paths: set[str] = set()
+_hook_installed = False
+
+
+def empty_directory(path: str) -> None:
+    """Remove everything inside ``path``, keeping the directory itself."""
+    try:
+        entries = list(os.scandir(path))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+class SharedNestedTempfile(fixtures.Fixture):
+    """Nest temporary files inside an existing, reusable directory.
+
+    This behaves like :class:`fixtures.NestedTempfile`, but rather than
+    creating and removing a directory for every test it points the
+    `tempfile` module at ``path`` and empties that directory on cleanup.
+
+    :param path: The directory to use. It must already exist and is not
+        removed by the fixture.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+
+    def _setUp(self) -> None:
+        self.addCleanup(empty_directory, self.path)
+        self.useFixture(fixtures.MonkeyPatch('tempfile.tempdir', self.path))
+
+
+class SharedTempHomeDir(fixtures.Fixture):
+    """Set ``HOME`` to an existing, reusable directory.
+
+    This behaves like :class:`fixtures.TempHomeDir`, but rather than
+    creating and removing a directory for every test it empties ``path``
+    on cleanup.
+
+    :param path: The directory to use. It must already exist and is not
+        removed by the fixture.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path = path
+
+    def _setUp(self) -> None:
+        self.addCleanup(empty_directory, self.path)
+        self.useFixture(fixtures.EnvironmentVariable('HOME', self.path))
+
+
+def _create_lazy(path: str, create: bool = True) -> None:
+    with _lazy_lock:
+        if path not in _lazy_paths:
+            return
+        _lazy_paths.discard(path)
+        if not create:
+            # Code creating the directory itself does not remove anything
+            # that was already there.
+            if not os.path.lexists(path):
+                _created_paths.add(path)
+            return
+    # Fails rather than silently use a directory someone else created since
+    # the path was chosen. Creating it raises an audit event too, so do not
+    # hold the lock.
+    os.mkdir(path, mode=0o700)
+    with _lazy_lock:
+        _created_paths.add(path)
+
+
+def _audit_hook(event: str, args: tuple[Any, ...]) -> None:
+    if not _lazy_paths:
+        return
+    if event in _PROCESS_EVENTS:
+        for path in sorted(_lazy_paths):
+            _create_lazy(path)
+        return
+    if event not in _PATH_EVENTS:
+        return
+    for arg in args[:2]:
+        if isinstance(arg, bytes):
+            arg = os.fsdecode(arg)
+        elif hasattr(arg, '__fspath__'):
+            arg = os.fsdecode(os.fspath(arg))
+        if not isinstance(arg, str):
+            continue
+        for path in list(_lazy_paths):
+            if arg == path:
+                # Let code that creates the directory itself do so.
+                _create_lazy(path, create=event != 'os.mkdir')
+            elif arg.startswith(path + os.sep):
+                _create_lazy(path)
+
+
+def _install_audit_hook() -> None:
+    global _hook_installed
+    with _lazy_lock:
+        if _hook_installed:
+            return
+        _hook_installed = True
+    sys.addaudithook(_audit_hook)
+
+
+class LazyTempDir(fixtures.Fixture):
+    """Reserve a temporary directory, only creating it when it is used.
+
+    The path is chosen when the fixture is set up but the directory is
+    created on demand, the first time the path or anything below it is
+    opened, listed or otherwise used by something that raises an audit
+    event (see :pep:`578`). Starting a subprocess also creates the
+    directory, since the new program may use it. The directory is removed
+    on cleanup if it was created, by the fixture or by the code using it.
+
+    The path is one that does not exist when the fixture is set up. If
+    something else creates it before it is used, the first use fails with
+    :exc:`FileExistsError` rather than share that directory, and it is left
+    in place on cleanup.
+
+    Functions that do not raise audit events, such as
+    :func:`os.path.exists` or :func:`os.stat`, report the directory as
+    missing until it has been created.
+
+    .. note::
+
+       The audit hook cannot be removed, so it stays installed for the rest
+       of the process once this fixture has been used. It returns
+       immediately when no lazy directory is pending.
+
+    :param rootdir: If supplied force the temporary directory to be a
+        child of rootdir.
+
+    .. py:attribute:: path
+
+       The path of the temporary directory.
+    """
+
+    path: str
+
+    def __init__(self, rootdir: str | None = None) -> None:
+        super().__init__()
+        self.rootdir = rootdir
+
+    def _setUp(self) -> None:
+        _install_audit_hook()
+        rootdir = self.rootdir or tempfile.gettempdir()
+        with _lazy_lock:
+            while True:
+                path = os.path.join(rootdir, 'tmp' + secrets.token_hex(4))
+                if path not in _lazy_paths and not os.path.lexists(path):
+                    break
+            _lazy_paths.add(path)
+        self.path = path
+        self.addCleanup(self._remove)
+
+    def _remove(self) -> None:
+        with _lazy_lock:
+            _lazy_paths.discard(self.path)
+            if self.path not in _created_paths:
+                return
+            _created_paths.discard(self.path)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class LazyNestedTempfile(fixtures.Fixture):
+    """Nest temporary files inside a directory created on first use.
+
+    This behaves like :class:`fixtures.NestedTempfile`, using a
+    :class:`LazyTempDir` so that tests which never create a temporary file
+    do not pay for creating and removing the directory.
+    """
+
+    def _setUp(self) -> None:
+        path = self.useFixture(LazyTempDir()).path
+        self.useFixture(fixtures.MonkeyPatch('tempfile.tempdir', path))
+
+
+class LazyTempHomeDir(LazyTempDir):
+    """Set ``HOME`` to a temporary directory created on first use.
+
+    This behaves like :class:`fixtures.TempHomeDir`, using a
+    :class:`LazyTempDir`.
+    """
+
+    def _setUp(self) -> None:
+        super()._setUp()
+        self.useFixture(fixtures.EnvironmentVariable('HOME', self.path))
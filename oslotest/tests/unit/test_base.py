@@ -12,8 +12,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import importlib
+import json
 import logging
 import os
+import sys
+import tempfile
+import time
 from typing import Any
 import unittest
 from unittest import mock
@@ -22,6 +27,10 @@ import fixtures
 import testtools
 
 from oslotest import base
+from oslotest import complexity
+from oslotest import history
+from oslotest import log
+from oslotest import settings
 
 
 class TestBaseTestCase(testtools.TestCase):
@@ -29,15 +38,21 @@ class TestBaseTestCase(testtools.TestCase):
         def test_fake_test(self):
             pass
 
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
     @mock.patch('os.environ.get')
     @mock.patch('oslotest.timeout.Timeout.useFixture')
-    @mock.patch('fixtures.Timeout')
+    @mock.patch('oslotest.timeout.IntervalTimeout')
     def test_timeout(self, fixture_timeout_mock, fixture_mock, env_get_mock):
-        env_get_mock.return_value = 1
+        env_get_mock.side_effect = lambda value, default=None: {
+            'OS_TEST_TIMEOUT': 1,
+        }.get(value, default)
         tc = self.FakeTestCase("test_fake_test")
         tc._set_timeout()
-        env_get_mock.assert_called_once_with('OS_TEST_TIMEOUT', 0)
-        fixture_timeout_mock.assert_called_once_with(1, gentle=True)
+        env_get_mock.assert_any_call('OS_TEST_TIMEOUT')
+        fixture_timeout_mock.assert_called_once_with(1.0)
         self.assertEqual(1, fixture_mock.call_count)
 
     @mock.patch('os.environ.get')
@@ -80,7 +95,7 @@ class TestBaseTestCase(testtools.TestCase):
         tc.setUp()
         env_get_mock.assert_any_call('OS_LOG_CAPTURE')
         env_get_mock.assert_any_call('OS_DEBUG')
-        self.assertEqual(5, fixture_mock.call_count)
+        self.assertEqual(6, fixture_mock.call_count)
 
     def test_mock_patch_cleanup_on_teardown(self):
         # create an object and save its reference
@@ -113,12 +128,432 @@ class TestBaseTestCase(testtools.TestCase):
 
     @mock.patch('os.environ')
     def test_enabled(self, mock_env):
-        mock_env.get.return_value = 'True'
+        mock_env.get.side_effect = lambda value, default=None: {
+            'OS_STDOUT_CAPTURE': 'True',
+            'OS_STDERR_CAPTURE': 'True',
+        }.get(value, default)
         tc = self.FakeTestCase("test_fake_test")
         tc.setUp()
         self.assertIsNotNone(tc.output_fixture.stdout)
         self.assertIsNotNone(tc.output_fixture.stderr)
 
+    @mock.patch('oslotest.profiling.aggregate')
+    def test_profile_fixtures(self, aggregate_mock):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_PROFILE_FIXTURES', 'True')
+        )
+        tc = self.FakeTestCase("test_fake_test")
+        result = testtools.TestResult()
+        tc.run(result)
+        self.assertTrue(result.wasSuccessful())
+        details = tc.getDetails()
+        self.assertIn('fixture-timings', details)
+        timings = json.loads(b''.join(details['fixture-timings'].iter_bytes()))
+        for name in (
+            'Timeout',
+            'MemoryBudget',
+            'CaptureOutput',
+            'ConfigureLogging',
+            'NestedTempfile',
+            'TempHomeDir',
+        ):
+            self.assertEqual(1, timings[name]['count'])
+            self.assertGreaterEqual(timings[name]['setUp'], 0)
+            self.assertGreaterEqual(timings[name]['cleanUp'], 0)
+        aggregate_mock.assert_any_call('fixture-profile', 'Timeout', mock.ANY)
+
+    @mock.patch('oslotest.profiling.aggregate')
+    def test_profile_imports(self, aggregate_mock):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_PROFILE_IMPORTS', 'True')
+        )
+        top = self.useFixture(fixtures.TempDir()).path
+        with open(os.path.join(top, 'oslotest_profiled.py'), 'w') as f:
+            f.write('')
+        self.useFixture(fixtures.MonkeyPatch('sys.path', [top] + sys.path))
+        self.addCleanup(sys.modules.pop, 'oslotest_profiled', None)
+
+        class ImportingTestCase(base.BaseTestCase):
+            def test_import(self):
+                importlib.import_module('oslotest_profiled')
+
+        tc = ImportingTestCase('test_import')
+        tc.run(testtools.TestResult())
+        ranking = json.loads(b''.join(tc.getDetails()['imports'].iter_bytes()))
+        self.assertEqual(['oslotest_profiled'], [i['module'] for i in ranking])
+        aggregate_mock.assert_called_once_with(
+            'import-profile', tc.id(), [1, mock.ANY]
+        )
+
+    def test_leakcheck(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_LEAKCHECK', '64K')
+        )
+        leaked = []
+
+        class LeakingTestCase(base.BaseTestCase):
+            def test_leak(self):
+                leaked.append(bytearray(1024 * 1024))
+
+            def test_no_leak(self):
+                pass
+
+        result = testtools.TestResult()
+        LeakingTestCase('test_no_leak').run(result)
+        self.assertTrue(result.wasSuccessful())
+        tc = LeakingTestCase('test_leak')
+        tc.run(result)
+        self.assertEqual(1, len(result.failures))
+        report = tc.getDetails()['memory-growth'].as_text()
+        self.assertTrue(report.startswith('Total: +'), report)
+        self.assertIn(__file__, report)
+
+    def test_leakcheck_captured(self):
+        for name, value in (
+            ('OS_TEST_LEAKCHECK', '256K'),
+            ('OS_LOG_CAPTURE', '1'),
+            ('OS_STDOUT_CAPTURE', '1'),
+        ):
+            self.useFixture(fixtures.EnvironmentVariable(name, value))
+
+        class LoggingTestCase(base.BaseTestCase):
+            def test_log(self):
+                for i in range(5000):
+                    logging.getLogger().warning('line %d', i)
+                    print('line', i)
+
+        for lazy in ('0', '1'):
+            self.useFixture(
+                fixtures.EnvironmentVariable('OS_LOG_CAPTURE_LAZY', lazy)
+            )
+            self.useFixture(settings.ResetSettings())
+            result = testtools.TestResult()
+            LoggingTestCase('test_log').run(result)
+            self.assertTrue(result.wasSuccessful(), result.failures)
+
+    def test_sub_second_timeout(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_TIMEOUT', '0.05')
+        )
+
+        class SlowTestCase(base.BaseTestCase):
+            TIMEOUT_SCALING_FACTOR = 0.5
+
+            def test_slow(self):
+                time.sleep(0.5)
+
+        result = testtools.TestResult()
+        SlowTestCase('test_slow').run(result)
+        self.assertEqual(1, len(result.errors))
+        self.assertIn('TimeoutException', result.errors[0][1])
+
+    def test_profile_slow(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_PROFILE_SLOW', '20%')
+        )
+        self.useFixture(fixtures.EnvironmentVariable('OS_TEST_TIMEOUT', '1'))
+
+        class SlowTestCase(base.BaseTestCase):
+            def test_fast(self):
+                pass
+
+            def test_slow(self):
+                time.sleep(0.4)
+
+        fast = SlowTestCase('test_fast')
+        fast.run(testtools.TestResult())
+        self.assertNotIn('slow-test-profile', fast.getDetails())
+        slow = SlowTestCase('test_slow')
+        slow.run(testtools.TestResult())
+        profile = slow.getDetails()['slow-test-profile'].as_text()
+        self.assertIn('test_slow (', profile)
+
+    def test_profile_slow_without_timeout(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_PROFILE_SLOW', '20%')
+        )
+
+        class NoTimeoutTestCase(base.BaseTestCase):
+            def _set_timeout(self):
+                pass
+
+            def test_fast(self):
+                pass
+
+        result = testtools.TestResult()
+        NoTimeoutTestCase('test_fast').run(result)
+        self.assertTrue(result.wasSuccessful())
+
+    def test_memory_budget(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_MEMORY_LIMIT', '1M')
+        )
+
+        class BudgetTestCase(base.BaseTestCase):
+            MEMORY_SCALING_FACTOR = 2
+
+            def test_within_budget(self):
+                bytearray(1024 * 1024)
+
+            def test_over_budget(self):
+                bytearray(3 * 1024 * 1024)
+
+        result = testtools.TestResult()
+        BudgetTestCase('test_within_budget').run(result)
+        self.assertTrue(result.wasSuccessful())
+        BudgetTestCase('test_over_budget').run(result)
+        self.assertEqual(1, len(result.failures))
+
+    def test_history(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'db')
+        self.useFixture(fixtures.EnvironmentVariable('OS_TEST_HISTORY', path))
+        # NOTE: BaseTestCase stops all the mock patches when a test ends,
+        # so use MonkeyPatch. Registering the recorder up front keeps it
+        # from being flushed at exit.
+        recorder = history.Recorder(path, revision='rev')
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'oslotest.history._recorders', {path: recorder}
+            )
+        )
+
+        class HistoryTestCase(base.BaseTestCase):
+            def test_pass(self):
+                pass
+
+            def test_fail(self):
+                self.fail('failed')
+
+            def test_skip(self):
+                self.skipTest('skipped')
+
+        for name in ('test_pass', 'test_fail', 'test_skip'):
+            HistoryTestCase(name).run(testtools.TestResult())
+        recorder.flush()
+        conn = history.connect(path)
+        self.addCleanup(conn.close)
+        rows = conn.execute(
+            'SELECT test_id, outcome, duration, setup FROM durations'
+        ).fetchall()
+        outcomes = {test_id.rsplit('.', 1)[1]: o for test_id, o, _, _ in rows}
+        self.assertEqual(
+            {
+                'test_pass': 'success',
+                'test_fail': 'failure',
+                'test_skip': 'skip',
+            },
+            outcomes,
+        )
+        for _, _, duration, setup in rows:
+            self.assertGreater(duration, setup)
+            self.assertGreater(setup, 0)
+
+    def test_lazy_logs(self):
+        self.useFixture(fixtures.EnvironmentVariable('OS_LOG_CAPTURE', '1'))
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_LOG_CAPTURE_LAZY', '1')
+        )
+        rendered = []
+        render = log._RecordHandler.render
+
+        def render_mock(handler):
+            rendered.append(handler)
+            return render(handler)
+
+        # NOTE: BaseTestCase stops all the mock patches when a test ends,
+        # so use MonkeyPatch.
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'oslotest.log._RecordHandler.render', render_mock
+            )
+        )
+
+        class LazyTestCase(base.BaseTestCase):
+            def test_pass(self):
+                logging.getLogger().warning('passed')
+
+            def test_fail(self):
+                logging.getLogger().warning('failed')
+                self.fail('failed')
+
+        tc = LazyTestCase('test_pass')
+        tc.run(testtools.TestResult())
+        self.assertEqual([], rendered)
+        self.assertNotIn("pythonlogging:''", tc.getDetails())
+        tc = LazyTestCase('test_fail')
+        tc.run(testtools.TestResult())
+        self.assertEqual(
+            ' WARNING [root] failed\n',
+            tc.getDetails()["pythonlogging:''"].as_text(),
+        )
+
+    def test_log_spill(self):
+        spill_dir = self.useFixture(fixtures.TempDir()).path
+        for name, value in (
+            ('OS_LOG_CAPTURE', 'True'),
+            ('OS_LOG_CAPTURE_MAX_BYTES', '12'),
+            ('OS_LOG_CAPTURE_SPILL', spill_dir),
+        ):
+            self.useFixture(fixtures.EnvironmentVariable(name, value))
+
+        class SpillTestCase(base.BaseTestCase):
+            def test_pass(self):
+                for i in range(5):
+                    logging.getLogger().warning('line%d', i)
+
+            def test_fail(self):
+                self.test_pass()
+                self.fail('failed')
+
+        tc = SpillTestCase('test_pass')
+        tc.run(testtools.TestResult())
+        logger = tc.log_fixture.logger
+        assert isinstance(logger, log.BoundedLogger)
+        self.assertIsNotNone(logger.spill_path)
+        self.assertEqual([], os.listdir(spill_dir))
+        tc = SpillTestCase('test_fail')
+        tc.run(testtools.TestResult())
+        logger = tc.log_fixture.logger
+        assert isinstance(logger, log.BoundedLogger)
+        path = str(logger.spill_path)
+        self.assertEqual([os.path.basename(path)], os.listdir(spill_dir))
+
+    def test_profile_fixtures_disabled(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_PROFILE_FIXTURES')
+        )
+        tc = self.FakeTestCase("test_fake_test")
+        tc.run(testtools.TestResult())
+        self.assertNotIn('fixture-timings', tc.getDetails())
+
+
+class TestSharedTempDirs(testtools.TestCase):
+    class SharedTestCase(base.BaseTestCase):
+        SHARE_TEMPDIRS = True
+        seen: list[tuple[str, str, list[str]]] = []
+
+        def _record(self):
+            tmp = tempfile.gettempdir()
+            home = os.environ['HOME']
+            self.seen.append((tmp, home, os.listdir(tmp) + os.listdir(home)))
+            self.create_tempfiles([('leftover', 'data')])
+            with open(os.path.join(home, '.leftover'), 'w') as f:
+                f.write('data')
+
+        def test_first(self):
+            self._record()
+
+        def test_second(self):
+            self._record()
+
+    def test_shared_tempdirs(self):
+        self.SharedTestCase.seen = []
+        suite = unittest.defaultTestLoader.loadTestsFromTestCase(
+            self.SharedTestCase
+        )
+        result = unittest.TestResult()
+        suite.run(result)
+        self.assertTrue(result.wasSuccessful(), result.errors)
+        (tmp1, home1, left1), (tmp2, home2, left2) = self.SharedTestCase.seen
+        self.assertEqual(tmp1, tmp2)
+        self.assertEqual(home1, home2)
+        self.assertEqual([], left1)
+        self.assertEqual([], left2)
+        # the class cleanups remove the directories
+        self.assertFalse(os.path.exists(tmp1))
+        self.assertFalse(os.path.exists(home1))
+        self.assertIsNone(self.SharedTestCase._shared_tempdirs)
+
+    def test_without_setupclass(self):
+        # running a single test directly skips setUpClass, so the test
+        # falls back to private directories
+        tc = self.SharedTestCase('test_first')
+        self.SharedTestCase.seen = []
+        result = testtools.TestResult()
+        tc.run(result)
+        self.assertTrue(result.wasSuccessful())
+        tmp, home, _ = self.SharedTestCase.seen[0]
+        self.assertFalse(os.path.exists(tmp))
+        self.assertFalse(os.path.exists(home))
+
+
+class TestLazyTempDirs(base.BaseTestCase):
+    LAZY_TEMPDIRS = True
+
+    def test_lazy_tempdirs(self):
+        tmp = tempfile.gettempdir()
+        home = os.environ['HOME']
+        self.assertFalse(os.path.exists(tmp))
+        self.assertFalse(os.path.exists(home))
+        self.create_tempfiles([('used', 'data')])
+        self.assertTrue(os.path.isdir(tmp))
+        self.assertFalse(os.path.exists(home))
+
+
+class TestAllocationAssertions(base.BaseTestCase):
+    def test_max_allocations(self):
+        with self.assertMaxAllocations(100):
+            pass
+        with testtools.ExpectedException(
+            AssertionError,
+            '(?s).*memory blocks were allocated.*test_base.py.*',
+        ):
+            with self.assertMaxAllocations(100):
+                kept = [object() for _ in range(1000)]
+        del kept
+
+    def test_max_allocated_bytes(self):
+        with self.assertMaxAllocatedBytes(1024 * 1024) as stats:
+            bytes(1024)
+        self.assertGreaterEqual(stats.peak_bytes, 1024)
+        with testtools.ExpectedException(
+            AssertionError, '(?s)Up to .* bytes were allocated.*'
+        ):
+            with self.assertMaxAllocatedBytes(1024 * 1024):
+                bytes(2 * 1024 * 1024)
+
+
+class TestComplexityAssertions(base.BaseTestCase):
+    @staticmethod
+    def _pairs(items):
+        # Counts the comparisons of a quadratic algorithm.
+        return sum(1 for a in items for b in items if a < b)
+
+    def test_complexity(self):
+        fitted = self.assertScalesLinearly(len, range, use_result=True)
+        self.assertEqual(complexity.LINEAR, fitted)
+        self.assertComplexity(
+            self._pairs, range, complexity.QUADRATIC, sizes=[8, 16, 32, 64]
+        )
+
+    def test_too_complex(self):
+        with testtools.ExpectedException(
+            AssertionError,
+            'The cost grows as O\\(n\\^2\\), faster than O\\(n\\).*',
+        ):
+            self.assertScalesLinearly(
+                self._pairs, range, sizes=[8, 16, 32, 64], use_result=True
+            )
+
+    def test_constant(self):
+        self.assertScalesConstant(
+            lambda items: items[0], range, use_result=True
+        )
+
+    def test_logarithmic_counts(self):
+        # Counts are not noisy, so a logarithmic growth is not ignored.
+        self.assertRaises(
+            self.failureException,
+            self.assertScalesConstant,
+            lambda items: len(items).bit_length(),
+            range,
+            use_result=True,
+        )
+
+    def test_constant_time(self):
+        fitted = self.assertScalesConstant(len, range)
+        self.assertEqual(complexity.CONSTANT, fitted)
+
 
 class TestManualMock(base.BaseTestCase):
     def setUp(self):
@@ -0,0 +1,131 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+from typing import Any
+
+import fixtures
+import testtools
+
+from oslotest import base
+from oslotest import baseline
+from oslotest import benchmark
+from oslotest import settings
+
+
+class BaselineStoreTest(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'baselines.json'
+        )
+
+    def test_save_merges(self):
+        first = baseline.BaselineStore(self.path)
+        second = baseline.BaselineStore(self.path)
+        self.assertIsNone(first.get('a'))
+        first.set('a', [1.0, 2.0])
+        self.assertEqual([1.0, 2.0], first.get('a'))
+        second.set('b', [3.0])
+        first.save()
+        second.save()
+        store = baseline.BaselineStore(self.path)
+        self.assertEqual([1.0, 2.0], store.get('a'))
+        self.assertEqual([3.0], store.get('b'))
+
+    def test_invalid_file(self):
+        with open(self.path, 'w') as f:
+            f.write('invalid')
+        self.assertIsNone(baseline.BaselineStore(self.path).get('a'))
+
+
+class StatisticsTest(testtools.TestCase):
+    def test_samples_of(self):
+        self.assertEqual([1.0], baseline.samples_of(1))
+        self.assertEqual([1.0, 2.0], baseline.samples_of((1, 2)))
+        result = benchmark.BenchmarkResult('b', 1, [3.0, 4.0])
+        self.assertEqual([3.0, 4.0], baseline.samples_of(result))
+        self.assertRaises(ValueError, baseline.samples_of, [])
+
+    def test_mann_whitney(self):
+        slow = [1.5, 1.6, 1.55, 1.7, 1.65, 1.58]
+        fast = [1.0, 1.1, 1.05, 0.98, 1.02, 1.07]
+        self.assertLess(baseline.mann_whitney_p(slow, fast), 0.01)
+        self.assertGreater(baseline.mann_whitney_p(fast, slow), 0.99)
+        noisy = [1.0, 1.6, 1.05, 1.7, 0.98, 1.58]
+        self.assertGreater(baseline.mann_whitney_p(noisy, fast), 0.05)
+
+    def test_mann_whitney_all_equal(self):
+        self.assertEqual(1.0, baseline.mann_whitney_p([1.0] * 3, [1.0] * 3))
+
+
+class AssertNoRegressionTest(testtools.TestCase):
+    class MeasuredTestCase(base.BaseTestCase):
+        measurement: Any = None
+
+        def test_measure(self):
+            self.assertNoRegression('latency', self.measurement)
+
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+        path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'baselines.json'
+        )
+        self.store = baseline.BaselineStore(path)
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'oslotest.baseline._stores', {path: self.store}
+            )
+        )
+        self.useFixture(fixtures.EnvironmentVariable('OS_TEST_BASELINE', path))
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_BASELINE_UPDATE')
+        )
+
+    def _run(self, measurement):
+        test = self.MeasuredTestCase('test_measure')
+        test.measurement = measurement
+        result = testtools.TestResult()
+        test.run(result)
+        return result
+
+    def test_no_baseline(self):
+        self.assertTrue(self._run([1.0, 1.1, 1.2]).wasSuccessful())
+
+    def test_update_and_compare(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_BASELINE_UPDATE', 'True')
+        )
+        fast = [1.0, 1.1, 1.05, 0.98, 1.02, 1.07]
+        self.assertTrue(self._run(fast).wasSuccessful())
+        key = f'{self.MeasuredTestCase("test_measure").id()}:latency'
+        self.assertEqual(fast, self.store.get(key))
+
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_BASELINE_UPDATE')
+        )
+        settings.reset()
+        self.assertTrue(self._run([1.03, 1.08, 1.0]).wasSuccessful())
+        # Noisy samples whose median grew are not a significant regression.
+        self.assertTrue(
+            self._run([1.0, 1.6, 1.05, 1.7, 0.98, 1.58]).wasSuccessful()
+        )
+        result = self._run([1.5, 1.6, 1.55, 1.7, 1.65, 1.58])
+        self.assertEqual(1, len(result.failures))
+        self.assertIn('latency regressed', result.failures[0][1])
+
+    def test_single_samples(self):
+        key = f'{self.MeasuredTestCase("test_measure").id()}:latency'
+        self.store.set(key, [1.0])
+        self.assertTrue(self._run(1.05).wasSuccessful())
+        self.assertFalse(self._run(1.2).wasSuccessful())
@@ -0,0 +1,88 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+
+import fixtures
+import testtools
+
+from oslotest import benchmark
+from oslotest import settings
+
+
+class BenchmarkResultTest(testtools.TestCase):
+    def test_statistics(self):
+        result = benchmark.BenchmarkResult('b', 10, [1.0, 2.0, 3.0, 4.0, 10.0])
+        self.assertEqual(1.0, result.min)
+        self.assertEqual(3.0, result.median)
+        self.assertEqual(4.0, result.mean)
+        self.assertAlmostEqual(8.8, result.p95)
+        self.assertAlmostEqual(3.5355339, result.stdev)
+        self.assertEqual(5, result.as_dict()['repeat'])
+
+    def test_single_time(self):
+        result = benchmark.BenchmarkResult('b', 1, [2.0])
+        self.assertEqual(2.0, result.p95)
+        self.assertEqual(0.0, result.stdev)
+
+
+class BenchmarkTestCaseTest(testtools.TestCase):
+    class Benchmarks(benchmark.BenchmarkTestCase):
+        MIN_TIME = 0.001
+        REPEAT = 3
+
+        def test_sum(self):
+            self.result = self.benchmark(sum, range(100))
+
+        def test_named(self):
+            self.result = self.benchmark(
+                sorted, [3, 1, 2], name='sort', number=7, repeat=2, warmup=0
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
+    def test_skipped_by_default(self):
+        self.useFixture(fixtures.EnvironmentVariable('OS_RUN_BENCHMARKS'))
+        result = testtools.TestResult()
+        self.Benchmarks('test_sum').run(result)
+        self.assertEqual(1, len(result.skip_reasons))
+
+    def test_benchmark(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_RUN_BENCHMARKS', 'True')
+        )
+        result = testtools.TestResult()
+        test = self.Benchmarks('test_sum')
+        test.run(result)
+        self.assertTrue(result.wasSuccessful())
+        self.assertEqual(3, len(test.result.times))
+        self.assertGreater(test.result.number, 1)
+        self.assertGreater(test.result.min, 0)
+        details = test.getDetails()
+        stats = json.loads(b''.join(details['benchmark-sum'].iter_bytes()))
+        self.assertEqual(test.result.number, stats['number'])
+        for key in ('min', 'median', 'p95', 'stdev'):
+            self.assertIn(key, stats)
+
+    def test_options(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_RUN_BENCHMARKS', 'True')
+        )
+        result = testtools.TestResult()
+        test = self.Benchmarks('test_named')
+        test.run(result)
+        self.assertTrue(result.wasSuccessful())
+        self.assertEqual(7, test.result.number)
+        self.assertEqual(2, len(test.result.times))
+        self.assertIn('benchmark-sort', test.getDetails())
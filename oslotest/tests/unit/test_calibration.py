@@ -0,0 +1,68 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+from unittest import mock
+
+import fixtures
+import testtools
+
+from oslotest import calibration
+
+
+class SpeedFactorTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'oslotest.calibration._CACHE_DIR', self.cache_dir
+            )
+        )
+        self.useFixture(
+            fixtures.MonkeyPatch('oslotest.calibration._speed_factor', None)
+        )
+
+    @mock.patch.object(calibration, 'measure')
+    def test_measured_and_cached(self, measure_mock):
+        measure_mock.return_value = calibration.REFERENCE_SECONDS * 3
+        self.assertAlmostEqual(3.0, calibration.get_speed_factor())
+        self.assertAlmostEqual(3.0, calibration.get_speed_factor())
+        self.assertEqual(1, measure_mock.call_count)
+        path = calibration.cache_path()
+        self.assertEqual(self.cache_dir, os.path.dirname(path))
+        with open(path) as f:
+            self.assertAlmostEqual(3.0, json.load(f)['factor'])
+
+        # Another process reads the cached factor.
+        calibration._speed_factor = None
+        self.assertAlmostEqual(3.0, calibration.get_speed_factor())
+        self.assertEqual(1, measure_mock.call_count)
+
+    @mock.patch.object(calibration, 'measure')
+    def test_bounds(self, measure_mock):
+        measure_mock.return_value = calibration.REFERENCE_SECONDS * 1000
+        self.assertEqual(
+            calibration._MAX_FACTOR, calibration.get_speed_factor()
+        )
+
+    @mock.patch.object(calibration, 'measure')
+    def test_invalid_cache(self, measure_mock):
+        measure_mock.return_value = calibration.REFERENCE_SECONDS
+        with open(calibration.cache_path(), 'w') as f:
+            f.write('invalid')
+        self.assertAlmostEqual(1.0, calibration.get_speed_factor())
+        self.assertEqual(1, measure_mock.call_count)
+
+    def test_measure(self):
+        self.assertGreater(calibration.measure(), 0)
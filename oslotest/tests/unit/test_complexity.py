@@ -0,0 +1,98 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import math
+
+import testtools
+
+from oslotest import complexity
+
+
+class FitTestCase(testtools.TestCase):
+    sizes = complexity.DEFAULT_SIZES
+
+    def test_classes(self):
+        for expected, cost in (
+            (complexity.CONSTANT, lambda n: 3.0),
+            (complexity.LOGARITHMIC, lambda n: 2 + math.log(n)),
+            (complexity.LINEAR, lambda n: 100 + 3 * n),
+            (complexity.LINEARITHMIC, lambda n: n * math.log(n)),
+            (complexity.QUADRATIC, lambda n: 10 * n + n * n / 2),
+        ):
+            fitted = complexity.fit(self.sizes, [cost(n) for n in self.sizes])
+            self.assertEqual(expected, fitted, expected.name)
+
+    def test_noisy(self):
+        for expected, cost in (
+            (complexity.CONSTANT, lambda n: 3.0),
+            # Lost in the noise.
+            (complexity.CONSTANT, lambda n: 2 + math.log(n)),
+            (complexity.LINEAR, lambda n: 1000 + n),
+            (complexity.QUADRATIC, lambda n: 2.2e6 + n * n),
+        ):
+            costs = [cost(n) for n in self.sizes]
+            fitted = complexity.fit(self.sizes, costs, noisy=True)
+            self.assertEqual(expected, fitted, expected.name)
+
+    def test_noisy_steps(self):
+        # Such as the run time of len() as the inputs outgrow a cache, with
+        # an outlier at the end.
+        costs = [34.0, 35.0, 37.0, 71.0, 71.0, 70.0, 207.0]
+        self.assertEqual(
+            complexity.CONSTANT,
+            complexity.fit(self.sizes, costs, noisy=True),
+        )
+        # Linear, with an outlier before the end.
+        costs = [float(n) for n in self.sizes]
+        costs[-2] *= 1.7
+        self.assertEqual(
+            complexity.LINEAR, complexity.fit(self.sizes, costs, noisy=True)
+        )
+
+    def test_noise(self):
+        # Alternately 5% too high and too low.
+        noise = [1.05, 0.95] * len(self.sizes)
+        costs = [n * x for n, x in zip(self.sizes, noise)]
+        self.assertEqual(complexity.LINEAR, complexity.fit(self.sizes, costs))
+
+    def test_decreasing(self):
+        costs = [1000 - n / 10 for n in self.sizes]
+        self.assertEqual(
+            complexity.CONSTANT, complexity.fit(self.sizes, costs)
+        )
+
+    def test_too_few_sizes(self):
+        self.assertRaises(ValueError, complexity.fit, [1, 2], [1, 2])
+
+    def test_order(self):
+        self.assertEqual(
+            sorted(complexity.COMPLEXITIES), list(complexity.COMPLEXITIES)
+        )
+        self.assertLess(complexity.LINEAR, complexity.QUADRATIC)
+        self.assertEqual('O(n log n)', str(complexity.LINEARITHMIC))
+
+
+class MeasureTestCase(testtools.TestCase):
+    def test_result(self):
+        costs = complexity.measure(len, range, [1, 2, 4], use_result=True)
+        self.assertEqual([1.0, 2.0, 4.0], costs)
+
+    def test_invalid_result(self):
+        self.assertRaises(
+            TypeError, complexity.measure, str, range, [1], use_result=True
+        )
+
+    def test_time(self):
+        costs = complexity.measure(sorted, range, [1, 10, 100])
+        self.assertEqual(3, len(costs))
+        for cost in costs:
+            self.assertGreater(cost, 0)
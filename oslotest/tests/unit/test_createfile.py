@@ -14,8 +14,12 @@
 
 import os
 
+import fixtures
+import testtools
+
 from oslotest import base
 from oslotest import createfile
+from oslotest import settings
 
 
 class CreateFileWithContentTest(base.BaseTestCase):
@@ -59,3 +63,187 @@ class CreateFileWithContentTest(base.BaseTestCase):
         f.setUp()
         basename = os.path.basename(f.path)
         self.assertTrue(basename.endswith('.ending'))
+
+
+class CreateFilesWithContentTest(base.BaseTestCase):
+    def test_create_files(self):
+        f = createfile.CreateFilesWithContent(
+            [
+                ('no_approve', 'ಠ_ಠ', 'utf-8'),
+                ('binary', b'\x00\x01', 'ascii'),
+            ]
+        )
+        f.setUp()
+        self.assertEqual(2, len(f.paths))
+        self.assertEqual(
+            [f.directory, f.directory], [os.path.dirname(p) for p in f.paths]
+        )
+        self.assertEqual('no_approve.conf', os.path.basename(f.paths[0]))
+        with open(f.paths[0], 'rb') as fh:
+            self.assertEqual('ಠ_ಠ', str(fh.read(), encoding='utf-8'))
+        with open(f.paths[1], 'rb') as fh:
+            self.assertEqual(b'\x00\x01', fh.read())
+        f.cleanUp()
+        self.assertFalse(os.path.exists(os.path.dirname(f.paths[0])))
+
+    def test_duplicate_names(self):
+        f = createfile.CreateFilesWithContent(
+            [('same', 'one', 'utf-8'), ('same', 'two', 'utf-8')], ext='.ini'
+        )
+        f.setUp()
+        self.assertEqual(2, len(set(f.paths)))
+        for path, expected in zip(f.paths, (b'one', b'two')):
+            basename = os.path.basename(path)
+            self.assertTrue(basename.startswith('same'))
+            self.assertTrue(basename.endswith('.ini'))
+            with open(path, 'rb') as fh:
+                self.assertEqual(expected, fh.read())
+
+    def test_many_files(self):
+        files = [(f'file{i}', str(i), 'ascii') for i in range(50)]
+        f = createfile.CreateFilesWithContent(files)
+        f.setUp()
+        self.assertEqual(50, len(f.paths))
+        for i, path in enumerate(f.paths):
+            self.assertEqual(f'file{i}.conf', os.path.basename(path))
+            with open(path) as fh:
+                self.assertEqual(str(i), fh.read())
+
+    def test_absolute_path(self):
+        target = os.path.join(self.useFixture(fixtures.TempDir()).path, 'abs')
+        f = createfile.CreateFilesWithContent([(target, 'data', 'utf-8')])
+        f.setUp()
+        self.assertEqual([target + '.conf'], f.paths)
+        self.assertIsNone(f.directory)
+        f.cleanUp()
+        self.assertTrue(os.path.exists(target + '.conf'))
+
+    def test_create_bad_encoding(self):
+        f = createfile.CreateFilesWithContent([('hrm', 'ಠ~ಠ', 'ascii')])
+        self.assertRaises(UnicodeError, f.setUp)
+
+
+class InMemoryTest(base.BaseTestCase):
+    def test_shm(self):
+        shm = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(
+            fixtures.MonkeyPatch('oslotest.createfile._SHM_DIR', shm)
+        )
+        f = createfile.CreateFileWithContent(
+            'in_memory', 'data', ext='.ini', in_memory=True
+        )
+        f.setUp()
+        self.assertEqual(shm, os.path.dirname(f.path))
+        basename = os.path.basename(f.path)
+        self.assertTrue(basename.startswith('in_memory'))
+        self.assertTrue(basename.endswith('.ini'))
+        with open(f.path) as fh:
+            self.assertEqual('data', fh.read())
+        f.cleanUp()
+        self.assertFalse(os.path.exists(f.path))
+
+    @testtools.skipUnless(hasattr(os, 'memfd_create'), 'requires memfd')
+    def test_memfd(self):
+        self.useFixture(
+            fixtures.MockPatch(
+                'oslotest.createfile._shm_dir', return_value=None
+            )
+        )
+        f = createfile.CreateFileWithContent(
+            'in_memory', 'data', in_memory=True
+        )
+        f.setUp()
+        self.assertTrue(f.path.startswith('/proc/self/fd/'))
+        with open(f.path) as fh:
+            self.assertEqual('data', fh.read())
+        f.cleanUp()
+        self.assertFalse(os.path.exists(f.path))
+
+    def test_fallback(self):
+        self.useFixture(
+            fixtures.MockPatch(
+                'oslotest.createfile._shm_dir', return_value=None
+            )
+        )
+        self.useFixture(
+            fixtures.MockPatch(
+                'oslotest.createfile._has_memfd', return_value=False
+            )
+        )
+        tempdir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(fixtures.MonkeyPatch('tempfile.tempdir', tempdir))
+        f = createfile.CreateFileWithContent(
+            'in_memory', 'data', in_memory=True
+        )
+        f.setUp()
+        self.assertEqual(tempdir, os.path.dirname(f.path))
+        with open(f.path) as fh:
+            self.assertEqual('data', fh.read())
+        # The file may already have been removed by the test.
+        os.unlink(f.path)
+        f.cleanUp()
+
+    def test_bulk_fallback(self):
+        self.useFixture(
+            fixtures.MockPatch(
+                'oslotest.createfile._shm_dir', return_value=None
+            )
+        )
+        self.useFixture(
+            fixtures.MockPatch(
+                'oslotest.createfile._has_memfd', return_value=False
+            )
+        )
+        f = createfile.CreateFilesWithContent(
+            [('one', '1', 'ascii')], in_memory=True
+        )
+        f.setUp()
+        self.assertIsNotNone(f.directory)
+        with open(f.paths[0]) as fh:
+            self.assertEqual('1', fh.read())
+        f.cleanUp()
+        self.assertFalse(os.path.exists(f.paths[0]))
+
+    def test_env(self):
+        self.useFixture(settings.ResetSettings())
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_TEMPFILE_IN_MEMORY', 'True')
+        )
+        shm = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(
+            fixtures.MonkeyPatch('oslotest.createfile._SHM_DIR', shm)
+        )
+        f = self.useFixture(createfile.CreateFileWithContent('env', 'data'))
+        self.assertEqual(shm, os.path.dirname(f.path))
+
+    def test_bulk_shm(self):
+        shm = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(
+            fixtures.MonkeyPatch('oslotest.createfile._SHM_DIR', shm)
+        )
+        f = createfile.CreateFilesWithContent(
+            [('one', '1', 'ascii'), ('two', '2', 'ascii')], in_memory=True
+        )
+        f.setUp()
+        self.assertEqual(shm, os.path.dirname(f.directory or ''))
+        f.cleanUp()
+        self.assertEqual([], os.listdir(shm))
+
+    @testtools.skipUnless(hasattr(os, 'memfd_create'), 'requires memfd')
+    def test_bulk_memfd(self):
+        self.useFixture(
+            fixtures.MockPatch(
+                'oslotest.createfile._shm_dir', return_value=None
+            )
+        )
+        f = createfile.CreateFilesWithContent(
+            [('one', '1', 'ascii'), ('two', '2', 'ascii')], in_memory=True
+        )
+        f.setUp()
+        self.assertIsNone(f.directory)
+        for path, expected in zip(f.paths, ('1', '2')):
+            with open(path) as fh:
+                self.assertEqual(expected, fh.read())
+        f.cleanUp()
+        for path in f.paths:
+            self.assertFalse(os.path.exists(path))
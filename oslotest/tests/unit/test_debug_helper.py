@@ -0,0 +1,220 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import sys
+import textwrap
+from unittest import mock
+
+import fixtures
+import testtools
+
+from oslotest.tools import debug_helper
+
+_TEST_MODULE = '''
+import unittest
+
+
+class {name}(unittest.TestCase):
+    def test_one(self):
+        pass
+
+    def test_two(self):
+        pass
+'''
+
+
+class DebugHelperTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.top = self.useFixture(fixtures.TempDir()).path
+        self.package = 'oslotest_debug_helper_pkg'
+        self.tests_dir = os.path.join(self.package, 'tests')
+        os.makedirs(os.path.join(self.top, self.tests_dir, 'nopackage'))
+        for d in (self.package, self.tests_dir):
+            self._write(os.path.join(d, '__init__.py'), '')
+        self._write(
+            os.path.join(self.tests_dir, 'nopackage', 'test_ignored.py'), ''
+        )
+        self._write_test('test_a.py', 'ATest')
+        self._write_test('test_b.py', 'BTest')
+        self.useFixture(
+            fixtures.MonkeyPatch('sys.path', [self.top] + sys.path)
+        )
+        self.addCleanup(self._unload)
+        self.index_path = os.path.join(self.top, 'cache', 'index.json')
+
+    def _write(self, relpath, contents):
+        with open(os.path.join(self.top, relpath), 'w') as f:
+            f.write(textwrap.dedent(contents))
+
+    def _write_test(self, filename, name):
+        self._write(
+            os.path.join(self.tests_dir, filename),
+            _TEST_MODULE.format(name=name),
+        )
+
+    def _unload(self):
+        for name in list(sys.modules):
+            if name.startswith(self.package):
+                del sys.modules[name]
+
+    def test_find_test_modules(self):
+        modules = list(
+            debug_helper.find_test_modules(self.top, self.tests_dir)
+        )
+        self.assertEqual(
+            [
+                os.path.join(self.top, self.tests_dir, 'test_a.py'),
+                os.path.join(self.top, self.tests_dir, 'test_b.py'),
+            ],
+            modules,
+        )
+
+    def test_default_test_dir(self):
+        self._write('pyproject.toml', '[project]\nname = "myproject"\n')
+        self.assertEqual(
+            os.path.join('myproject', 'tests'),
+            debug_helper.default_test_dir(self.top),
+        )
+
+    def test_index(self):
+        index = debug_helper.TestIndex(self.index_path)
+        self.assertTrue(index.update(self.top, self.tests_dir))
+        index.save()
+        mod_a = f'{self.package}.tests.test_a'
+        mod_b = f'{self.package}.tests.test_b'
+        self.assertEqual(
+            {
+                mod_a: [
+                    f'{mod_a}.ATest.test_one',
+                    f'{mod_a}.ATest.test_two',
+                ],
+                mod_b: [f'{mod_b}.BTest.test_one'],
+            },
+            index.select('test_a|BTest.test_one'),
+        )
+
+        # Unchanged modules are not imported again.
+        self._unload()
+        index = debug_helper.TestIndex(self.index_path)
+        index.load()
+        self.assertFalse(index.update(self.top, self.tests_dir))
+        self.assertNotIn(mod_a, sys.modules)
+
+        # Modified modules are.
+        self._write_test('test_b.py', 'RenamedTest')
+        path_b = os.path.join(self.top, self.tests_dir, 'test_b.py')
+        st = os.stat(path_b)
+        os.utime(path_b, (st.st_atime, st.st_mtime + 10))
+        self.assertTrue(index.update(self.top, self.tests_dir))
+        self.assertNotIn(mod_a, sys.modules)
+        self.assertEqual(
+            {mod_b: [f'{mod_b}.RenamedTest.test_one']},
+            index.select('test_b.*test_one'),
+        )
+
+        # Removed modules are dropped.
+        os.unlink(path_b)
+        self.assertTrue(index.update(self.top, self.tests_dir))
+        self.assertEqual([mod_a], list(index.select(None)))
+
+    def test_index_dependencies(self):
+        self._write(
+            os.path.join(self.tests_dir, 'mixin.py'),
+            'class Mixin:\n    def test_one(self):\n        pass\n',
+        )
+        self._write(
+            os.path.join(self.tests_dir, 'test_c.py'),
+            f"""
+            import unittest
+
+            from {self.package}.tests import mixin
+
+
+            class CTest(mixin.Mixin, unittest.TestCase):
+                pass
+            """,
+        )
+        index = debug_helper.TestIndex(self.index_path)
+        index.update(self.top, self.tests_dir)
+        mod_c = f'{self.package}.tests.test_c'
+        self.assertEqual(
+            {mod_c: [f'{mod_c}.CTest.test_one']}, index.select('CTest')
+        )
+
+        self._unload()
+        path = os.path.join(self.top, self.tests_dir, 'mixin.py')
+        with open(path, 'a') as f:
+            f.write('\n    def test_two(self):\n        pass\n')
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+        self.assertTrue(index.update(self.top, self.tests_dir))
+        self.assertEqual(
+            {mod_c: [f'{mod_c}.CTest.test_one', f'{mod_c}.CTest.test_two']},
+            index.select('CTest'),
+        )
+        # The other modules do not depend on it.
+        self.assertNotIn(f'{self.package}.tests.test_a', sys.modules)
+
+    def test_index_scenarios(self):
+        self._write(
+            os.path.join(self.tests_dir, 'helpers.py'),
+            "SCENARIOS = ['one']\n",
+        )
+        self._write(
+            os.path.join(self.tests_dir, 'test_c.py'),
+            f"""
+            import unittest
+
+            from {self.package}.tests.helpers import SCENARIOS
+
+
+            class CTest(unittest.TestCase):
+                pass
+
+
+            for name in SCENARIOS:
+                setattr(CTest, f'test_{{name}}', lambda self: None)
+            """,
+        )
+        index = debug_helper.TestIndex(self.index_path)
+        index.update(self.top, self.tests_dir)
+        self._unload()
+        path = os.path.join(self.top, self.tests_dir, 'helpers.py')
+        self._write(path, "SCENARIOS = ['one', 'two']\n")
+        st = os.stat(path)
+        os.utime(path, (st.st_atime, st.st_mtime + 10))
+        self.assertTrue(index.update(self.top, self.tests_dir))
+        mod_c = f'{self.package}.tests.test_c'
+        self.assertEqual(
+            {mod_c: [f'{mod_c}.CTest.test_one', f'{mod_c}.CTest.test_two']},
+            index.select('CTest'),
+        )
+
+    def test_index_import_error(self):
+        self._write(os.path.join(self.tests_dir, 'test_c.py'), 'import nope')
+        self.useFixture(fixtures.MonkeyPatch('sys.stderr', mock.Mock()))
+        index = debug_helper.TestIndex(self.index_path)
+        index.update(self.top, self.tests_dir)
+        self.assertNotIn(f'{self.package}.tests.test_c', index.modules)
+
+    def test_load_tests(self):
+        index = debug_helper.TestIndex(self.index_path)
+        index.update(self.top, self.tests_dir)
+        self._unload()
+        suite = debug_helper.load_tests(index.select('ATest.test_two'))
+        self.assertEqual(
+            [f'{self.package}.tests.test_a.ATest.test_two'],
+            [t.id() for t in testtools.iterate_tests(suite)],
+        )
+        self.assertNotIn(f'{self.package}.tests.test_b', sys.modules)
@@ -0,0 +1,193 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import io
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import traceback
+import unittest
+
+import fixtures
+import subunit
+import testtools
+
+import oslotest
+from oslotest.tools import fork_runner
+
+_TEST_MODULE = '''
+import os
+import sys
+import unittest
+
+import oslotest_fork_runner_preloaded
+
+
+class {name}(unittest.TestCase):
+    def test_pass(self):
+        print('noise')
+        self.assertIn(
+            'oslotest_fork_runner_preloaded', sys.modules)
+        self.assertNotEqual(
+            oslotest_fork_runner_preloaded.PID, os.getpid())
+
+    def test_fail(self):
+        self.fail('boom')
+'''
+
+
+class _Test(unittest.TestCase):
+    def test_one(self):
+        pass
+
+    def test_two(self):
+        pass
+
+
+class _OtherTest(unittest.TestCase):
+    def test_one(self):
+        pass
+
+
+class PartitionTestCase(testtools.TestCase):
+    def test_keeps_classes_together(self):
+        tests = [
+            _Test('test_one'),
+            _OtherTest('test_one'),
+            _Test('test_two'),
+        ]
+        partitions = fork_runner.partition(tests, 2)
+        self.assertEqual(
+            [[_Test, _Test], [_OtherTest]],
+            [[type(t) for t in p] for p in partitions],
+        )
+
+    def test_drops_idle_workers(self):
+        partitions = fork_runner.partition([_Test('test_one')], 4)
+        self.assertEqual(1, len(partitions))
+
+
+class RunForkedTestCase(testtools.TestCase):
+    def test_forks_before_threads(self):
+        active = []
+        fork_worker = fork_runner._fork_worker
+
+        def _fork_worker(tests, inherited=()):
+            active.append(threading.active_count())
+            return fork_worker(tests, inherited)
+
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'oslotest.tools.fork_runner._fork_worker', _fork_worker
+            )
+        )
+        tests = [_Test('test_one'), _OtherTest('test_one')]
+        ok = fork_runner.run_forked(tests, 2, testtools.StreamResult())
+        self.assertTrue(ok)
+        self.assertEqual([threading.active_count()] * 2, active)
+
+    def test_worker_error(self):
+        path = os.path.join(self.useFixture(fixtures.TempDir()).path, 'tb')
+
+        def _run_worker(tests, write_fd):
+            raise RuntimeError('boom')
+
+        def print_exc():
+            with open(path, 'w') as f:
+                f.write(traceback.format_exc())
+
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'oslotest.tools.fork_runner._run_worker', _run_worker
+            )
+        )
+        self.useFixture(
+            fixtures.MonkeyPatch(
+                'oslotest.tools.fork_runner.traceback.print_exc', print_exc
+            )
+        )
+        ok = fork_runner.run_forked(
+            [_Test('test_one')], 1, testtools.StreamResult()
+        )
+        self.assertFalse(ok)
+        with open(path) as f:
+            self.assertIn('RuntimeError: boom', f.read())
+
+
+class _StatusCollector(testtools.StreamResult):
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def status(self, **kwargs):  # type: ignore[override]
+        if kwargs.get('test_status'):
+            self.events.append(kwargs)
+
+
+class ForkRunnerTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.top = self.useFixture(fixtures.TempDir()).path
+        tests_dir = os.path.join(self.top, 'tests')
+        os.mkdir(tests_dir)
+        with open(os.path.join(tests_dir, '__init__.py'), 'w'):
+            pass
+        for i in range(3):
+            path = os.path.join(tests_dir, f'test_{i}.py')
+            with open(path, 'w') as f:
+                f.write(textwrap.dedent(_TEST_MODULE.format(name=f'T{i}')))
+        with open(
+            os.path.join(self.top, 'oslotest_fork_runner_preloaded.py'), 'w'
+        ) as f:
+            f.write('import os\nPID = os.getpid()\n')
+
+    def _run(self, *args):
+        env = dict(
+            os.environ, OS_TEST_PRELOAD='oslotest_fork_runner_preloaded'
+        )
+        repo = os.path.dirname(os.path.dirname(oslotest.__file__))
+        env['PYTHONPATH'] = os.pathsep.join(
+            [self.top, repo, env.get('PYTHONPATH', '')]
+        )
+        proc = subprocess.run(  # noqa: S603
+            [sys.executable, '-m', 'oslotest.tools.fork_runner']
+            + list(args)
+            + ['discover', '-t', self.top, os.path.join(self.top, 'tests')],
+            capture_output=True,
+            env=env,
+            cwd=self.top,
+        )
+        result = _StatusCollector()
+        subunit.ByteStreamToStreamResult(io.BytesIO(proc.stdout)).run(result)
+        return proc, result.events
+
+    def test_run(self):
+        proc, events = self._run('-j', '2')
+        self.assertEqual(1, proc.returncode, proc.stderr)
+        statuses = {e['test_id']: e['test_status'] for e in events}
+        self.assertEqual(6, len(statuses))
+        for i in range(3):
+            self.assertEqual(
+                'success', statuses[f'tests.test_{i}.T{i}.test_pass']
+            )
+            self.assertEqual(
+                'fail', statuses[f'tests.test_{i}.T{i}.test_fail']
+            )
+        self.assertEqual({'0', '1'}, {e['route_code'] for e in events})
+
+    def test_list(self):
+        proc, events = self._run('--list')
+        self.assertEqual(0, proc.returncode, proc.stderr)
+        self.assertEqual({'exists'}, {e['test_status'] for e in events})
+        self.assertEqual(6, len(events))
@@ -0,0 +1,92 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import subprocess
+from unittest import mock
+
+import fixtures
+import testtools
+
+from oslotest import history
+
+
+class HistoryTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'history.sqlite'
+        )
+
+    def _record(self, revision, durations, test_id='test', outcome='success'):
+        recorder = history.Recorder(self.path, revision=revision)
+        for duration in durations:
+            recorder.record(test_id, outcome, duration, 0.001)
+        recorder.flush()
+
+    def test_record(self):
+        self._record('abc', [0.5, 0.25])
+        conn = history.connect(self.path)
+        self.addCleanup(conn.close)
+        rows = conn.execute(
+            'SELECT test_id, revision, outcome, duration, setup '
+            'FROM durations ORDER BY duration'
+        ).fetchall()
+        self.assertEqual(
+            [
+                ('test', 'abc', 'success', 0.25, 0.001),
+                ('test', 'abc', 'success', 0.5, 0.001),
+            ],
+            rows,
+        )
+
+    @mock.patch('subprocess.run')
+    def test_get_revision(self, run_mock):
+        run_mock.return_value.stdout = 'abc\n'
+        self.assertEqual('abc', history.get_revision())
+        run_mock.side_effect = subprocess.CalledProcessError(128, 'git')
+        self.assertEqual('unknown', history.get_revision())
+
+    def test_find_regressions(self):
+        self._record('old', [1.0, 1.1, 0.9, 1.0, 1.05, 0.95])
+        self._record('old', [0.1] * 6, test_id='stable')
+        self._record('old', [2.0] * 6, test_id='failing', outcome='failure')
+        self._record('new', [2.0])
+        self._record('new', [0.1], test_id='stable')
+        self._record('new', [9.0], test_id='failing', outcome='failure')
+        conn = history.connect(self.path)
+        self.addCleanup(conn.close)
+        regressions = history.find_regressions(conn)
+        self.assertEqual(['test'], [r.test_id for r in regressions])
+        self.assertEqual('new', regressions[0].revision)
+        self.assertEqual(2.0, regressions[0].duration)
+        self.assertEqual(6, regressions[0].samples)
+        self.assertEqual([], history.find_regressions(conn, threshold=100))
+        self.assertEqual([], history.find_regressions(conn, min_samples=7))
+        self.assertEqual([], history.find_regressions(conn, revision='old'))
+
+    def test_find_regressions_empty(self):
+        conn = history.connect(self.path)
+        self.addCleanup(conn.close)
+        self.assertEqual([], history.find_regressions(conn))
+
+    def test_main(self):
+        self._record('old', [1.0, 1.1, 0.9, 1.0, 1.05, 0.95])
+        self._record('new', [2.0])
+        stdout = self.useFixture(fixtures.StringStream('stdout')).stream
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout', stdout))
+        self.assertEqual(1, history.main(['--db', self.path]))
+        self.assertEqual(
+            0, history.main(['--db', self.path, '--threshold', '50'])
+        )
+        stdout.seek(0)
+        self.assertIn('test: 2.000s, was 1.000s', stdout.read())
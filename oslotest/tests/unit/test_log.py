@@ -13,14 +13,30 @@
 #    under the License.
 
 import logging
+import os
+import threading
 from unittest import mock
 
+import fixtures
 import testtools
 
 from oslotest import log
+from oslotest import settings
+
+LOG = logging.getLogger(__name__)
+
+
+class CaptureLoggerTestCase(testtools.TestCase):
+    def test_abstract(self):
+        self.assertRaises(TypeError, log._CaptureLogger)
+        self.assertRaises(TypeError, log._CaptureHandler)
 
 
 class ConfigureLoggingTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
     @mock.patch('os.environ.get')
     def test_fake_logs_default(self, env_get_mock):
         # without debug and log capture
@@ -97,12 +113,225 @@ class ConfigureLoggingTestCase(testtools.TestCase):
 
     @mock.patch('os.environ.get')
     def test_fake_logs_with_log_capture(self, env_get_mock):
-        env_get_mock.side_effect = lambda value: {
+        env_get_mock.side_effect = lambda value, default=None: {
             'OS_DEBUG': 0,
             'OS_LOG_CAPTURE': 'True',
-        }[value]
+        }.get(value, default)
         f = log.ConfigureLogging()
         f.setUp()
         env_get_mock.assert_any_call('OS_LOG_CAPTURE')
         env_get_mock.assert_any_call('OS_DEBUG')
         self.assertIsNotNone(f.logger)
+
+    @mock.patch('os.environ.get')
+    def test_fake_logs_with_lazy_log_capture(self, env_get_mock):
+        env_get_mock.side_effect = lambda value, default=None: {
+            'OS_DEBUG': 0,
+            'OS_LOG_CAPTURE': 'True',
+            'OS_LOG_CAPTURE_LAZY': 'True',
+        }.get(value, default)
+        f = log.ConfigureLogging()
+        f.setUp()
+        self.addCleanup(f.cleanUp)
+        env_get_mock.assert_any_call('OS_LOG_CAPTURE_LAZY')
+        self.assertIsInstance(f.logger, log.LazyLogger)
+
+    @mock.patch('os.environ.get')
+    @mock.patch('logging.basicConfig')
+    def test_skip_below_level(self, basic_logger_mock, env_get_mock):
+        env_get_mock.side_effect = lambda value, default=None: {
+            'OS_DEBUG': 'INFO',
+            'OS_LOG_SKIP_BELOW_LEVEL': 'True',
+        }.get(value, default)
+        logger = logging.getLogger('oslotest.tests.skip_below_level')
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.DEBUG)
+        previous = logging.root.manager.disable
+        with log.ConfigureLogging():
+            self.assertFalse(logger.isEnabledFor(logging.DEBUG))
+            self.assertTrue(logger.isEnabledFor(logging.INFO))
+            with mock.patch.object(logger, 'makeRecord') as make_record:
+                logger.debug('skipped %s', 'early')
+            make_record.assert_not_called()
+        self.assertEqual(previous, logging.root.manager.disable)
+
+    @mock.patch('os.environ.get')
+    @mock.patch('logging.basicConfig')
+    def test_skip_below_level_unset(self, basic_logger_mock, env_get_mock):
+        env_get_mock.side_effect = lambda value, default=None: {
+            'OS_LOG_SKIP_BELOW_LEVEL': 'True',
+        }.get(value, default)
+        previous = logging.root.manager.disable
+        with log.ConfigureLogging():
+            self.assertEqual(previous, logging.root.manager.disable)
+
+
+class LazyLoggerTestCase(testtools.TestCase):
+    def test_output(self):
+        logger = self.useFixture(
+            log.LazyLogger(format=log.ConfigureLogging.DEFAULT_FORMAT)
+        )
+        with mock.patch.object(
+            logging.Formatter, 'format', autospec=True
+        ) as format_mock:
+            LOG.info('Hello %s', 'world')
+            LOG.debug('Not captured')
+        format_mock.assert_not_called()
+        self.assertEqual(f'    INFO [{__name__}] Hello world\n', logger.output)
+        logger.reset_output()
+        self.assertEqual('', logger.output)
+
+    def test_details(self):
+        fixture = log.LazyLogger()
+        with fixture:
+            LOG.warning('one')
+            LOG.error('two %d', 'invalid')
+            details = fixture.getDetails()
+        text = details["pythonlogging:''"].as_text()
+        self.assertTrue(text.startswith('one\nUnable to format'), text)
+
+    def test_no_attach(self):
+        fixture = log.LazyLogger(attach=False)
+        with fixture:
+            LOG.warning('one')
+            self.assertEqual({}, fixture.getDetails())
+            self.assertEqual("pythonlogging:''", fixture.detail_name)
+            self.assertEqual('one\n', fixture.detail.as_text())
+
+    def test_exception(self):
+        logger = self.useFixture(log.LazyLogger())
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            LOG.exception('failed')
+        record = logger._handler.records[0]  # type: ignore[attr-defined]
+        self.assertIsNone(record.exc_info)
+        self.assertIn('ValueError: boom', logger.output)
+
+
+class BoundedLoggerTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
+    def test_drop(self):
+        logger = self.useFixture(log.BoundedLogger(max_bytes=12))
+        for i in range(5):
+            LOG.info('line%d', i)
+        self.assertEqual(
+            '[18 bytes of older log output dropped]\nline3\nline4\n',
+            logger.output,
+        )
+        self.assertIsNone(logger.spill_path)
+        logger.reset_output()
+        self.assertFalse(logger.output.endswith('line4\n'))
+
+    def test_spill(self):
+        spill_dir = self.useFixture(fixtures.TempDir()).path
+        fixture = log.BoundedLogger(
+            max_bytes=12, spill_dir=spill_dir, keep_spill=True
+        )
+        with fixture:
+            for i in range(5):
+                LOG.info('line%d', i)
+            details = fixture.getDetails()
+        self.assertIsNotNone(fixture.spill_path)
+        path = str(fixture.spill_path)
+        self.assertEqual(spill_dir, os.path.dirname(path))
+        with open(path) as f:
+            self.assertEqual('line0\nline1\nline2\n', f.read())
+        self.assertEqual(
+            f'[18 bytes of older log output spilled to {path}]\n'
+            'line3\nline4\n',
+            details["pythonlogging:''"].as_text(),
+        )
+
+    def test_spill_removed(self):
+        spill_dir = self.useFixture(fixtures.TempDir()).path
+        fixture = log.BoundedLogger(max_bytes=12, spill_dir=spill_dir)
+        with fixture:
+            for i in range(5):
+                LOG.info('line%d', i)
+            self.assertTrue(os.path.exists(str(fixture.spill_path)))
+        self.assertEqual([], os.listdir(spill_dir))
+
+    def test_large_record(self):
+        logger = self.useFixture(log.BoundedLogger(max_bytes=12))
+        LOG.info('line0')
+        LOG.info('%sline1', 'x' * 20)
+        self.assertEqual(
+            '[20 bytes of older log output dropped]\nxxxxxxline1\n',
+            logger.output,
+        )
+
+    @mock.patch('os.environ.get')
+    def test_configure_logging(self, env_get_mock):
+        env_get_mock.side_effect = lambda value, default=None: {
+            'OS_LOG_CAPTURE': 'True',
+            'OS_LOG_CAPTURE_MAX_BYTES': '1K',
+        }.get(value, default)
+        f = log.ConfigureLogging()
+        f.setUp()
+        self.addCleanup(f.cleanUp)
+        self.assertIsInstance(f.logger, log.BoundedLogger)
+        self.assertEqual(1024, f.max_bytes)
+
+
+class ThreadedLoggerTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
+    def test_output(self):
+        logger = self.useFixture(log.ThreadedLogger())
+        threads = [
+            threading.Thread(target=LOG.info, args=('thread %d', i))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            [f'thread {i}' for i in range(4)],
+            sorted(logger.output.splitlines()),
+        )
+        logger.reset_output()
+        self.assertEqual('', logger.output)
+
+    def test_formatted_in_background(self):
+        idents = []
+
+        def format(handler, record):
+            idents.append(threading.get_ident())
+            return record.getMessage()
+
+        with mock.patch.object(log._TextHandler, 'format', new=format):
+            fixture = log.ThreadedLogger(format='%(message)s')
+            with fixture:
+                LOG.info('one')
+                details = fixture.getDetails()
+                self.assertEqual(
+                    'one\n', details["pythonlogging:''"].as_text()
+                )
+        self.assertEqual(1, len(idents))
+        self.assertNotEqual(threading.get_ident(), idents[0])
+
+    def test_drained_on_cleanup(self):
+        fixture = log.ThreadedLogger()
+        with fixture:
+            for i in range(100):
+                LOG.info('line %d', i)
+            handler = fixture._handler
+        self.assertEqual(100, len(handler.render().splitlines()))
+
+    @mock.patch('os.environ.get')
+    def test_configure_logging(self, env_get_mock):
+        env_get_mock.side_effect = lambda value, default=None: {
+            'OS_LOG_CAPTURE': 'True',
+            'OS_LOG_CAPTURE_THREADED': 'True',
+        }.get(value, default)
+        f = log.ConfigureLogging()
+        f.setUp()
+        self.addCleanup(f.cleanUp)
+        self.assertIsInstance(f.logger, log.ThreadedLogger)
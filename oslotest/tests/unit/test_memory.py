@@ -0,0 +1,159 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+import tracemalloc
+
+import fixtures
+import testtools
+
+from oslotest import memory
+from oslotest import settings
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+_leaked: list[bytearray] = []
+
+
+class MemoryLeakFixtureTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(_leaked.clear)
+
+    def test_leak(self):
+        fixture = memory.MemoryLeakFixture(limit=100 * 1024)
+        fixture.setUp()
+        _leaked.append(bytearray(1024 * 1024))
+        details = fixture.getDetails()
+        self.assertRaises(AssertionError, fixture.cleanUp)
+        self.assertGreaterEqual(fixture.growth, 1024 * 1024)
+        report = details['memory-growth'].as_text()
+        self.assertIn('test_memory.py', report.splitlines()[1])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_no_leak(self):
+        fixture = memory.MemoryLeakFixture(limit=100 * 1024)
+        with fixture:
+            garbage = bytearray(1024 * 1024)
+            del garbage
+        self.assertLess(fixture.growth, 100 * 1024)
+
+    def test_no_limit(self):
+        fixture = memory.MemoryLeakFixture()
+        with fixture:
+            _leaked.append(bytearray(1024 * 1024))
+        self.assertGreaterEqual(fixture.growth, 1024 * 1024)
+
+    def test_already_tracing(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        with memory.MemoryLeakFixture():
+            pass
+        self.assertTrue(tracemalloc.is_tracing())
+
+
+class MemoryBudgetTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+        self.useFixture(fixtures.EnvironmentVariable('OS_TEST_MEMORY_LIMIT'))
+
+    def test_within_budget(self):
+        fixture = memory.MemoryBudget(default_limit=2 * 1024 * 1024)
+        with fixture:
+            bytearray(1024 * 1024)
+        self.assertGreaterEqual(fixture.peak, 1024 * 1024)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_over_budget(self):
+        fixture = memory.MemoryBudget(default_limit=1024 * 1024)
+        fixture.setUp()
+        bytearray(2 * 1024 * 1024)
+        self.assertRaises(AssertionError, fixture.cleanUp)
+        self.assertGreaterEqual(fixture.peak, 2 * 1024 * 1024)
+
+    def test_scaling_factor(self):
+        fixture = memory.MemoryBudget(
+            default_limit=1024 * 1024, scaling_factor=3
+        )
+        with fixture:
+            bytearray(2 * 1024 * 1024)
+
+    def test_environment(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_MEMORY_LIMIT', '512K')
+        )
+        fixture = memory.MemoryBudget(default_limit=10 * 1024 * 1024)
+        fixture.setUp()
+        bytearray(1024 * 1024)
+        self.assertRaises(AssertionError, fixture.cleanUp)
+
+    def test_with_trace_allocations(self):
+        # Measuring allocations resets the peak, which must not hide what
+        # was allocated before from the budget.
+        fixture = memory.MemoryBudget(default_limit=2 * 1024 * 1024)
+        fixture.setUp()
+        bytearray(3 * 1024 * 1024)
+        with memory.trace_allocations() as stats:
+            bytearray(1024)
+        self.assertLess(stats.peak_bytes, 1024 * 1024)
+        self.assertRaises(AssertionError, fixture.cleanUp)
+        self.assertGreaterEqual(fixture.peak, 3 * 1024 * 1024)
+
+    def test_no_budget(self):
+        with memory.MemoryBudget():
+            self.assertFalse(tracemalloc.is_tracing())
+
+    @testtools.skipIf(resource is None, 'RLIMIT_AS is not supported')
+    def test_guard(self):
+        limits = resource.getrlimit(resource.RLIMIT_AS)
+        with memory.MemoryBudget(default_limit=1024 * 1024, guard=True):
+            soft, _ = resource.getrlimit(resource.RLIMIT_AS)
+            if memory._address_space() is not None:
+                self.assertNotEqual(limits[0], soft)
+        self.assertEqual(limits, resource.getrlimit(resource.RLIMIT_AS))
+
+    @testtools.skipIf(resource is None, 'RLIMIT_AS is not supported')
+    def test_no_guard_by_default(self):
+        limits = resource.getrlimit(resource.RLIMIT_AS)
+        with memory.MemoryBudget(default_limit=1024 * 1024):
+            self.assertEqual(limits, resource.getrlimit(resource.RLIMIT_AS))
+
+    def test_thread(self):
+        for guard in (False, True):
+            # Thread stacks reserve megabytes of address space but allocate
+            # almost nothing from Python.
+            with memory.MemoryBudget(default_limit=1024 * 1024, guard=guard):
+                threads = [threading.Thread(target=int) for _ in range(4)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+
+class TraceAllocationsTestCase(testtools.TestCase):
+    def test_blocks(self):
+        with memory.trace_allocations() as stats:
+            kept = [object() for _ in range(1000)]
+        self.assertGreaterEqual(stats.blocks, 1000)
+        self.assertIn('test_memory.py', stats.format_top(1))
+        self.assertFalse(tracemalloc.is_tracing())
+        del kept
+
+    def test_peak_bytes(self):
+        with memory.trace_allocations() as stats:
+            bytes(1024 * 1024)
+        self.assertGreaterEqual(stats.peak_bytes, 1024 * 1024)
+        self.assertLess(stats.blocks, 10)
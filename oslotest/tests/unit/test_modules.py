@@ -10,6 +10,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import importlib
+import json
+import os
+import sys
+
+import fixtures
+
 from oslotest import base
 from oslotest import modules
 
@@ -24,3 +31,61 @@ class CreateDisableModuleTest(base.BaseTestCase):
 
         s = __import__('sys')
         self.assertTrue(s)
+
+
+class ImportProfileFixtureTest(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        top = self.useFixture(fixtures.TempDir()).path
+        self.package = 'oslotest_import_profile_pkg'
+        os.mkdir(os.path.join(top, self.package))
+        for name, body in (
+            ('__init__', ''),
+            ('outer', f'import {self.package}.inner\n'),
+            ('inner', 'import time\ntime.sleep(0.01)\n'),
+        ):
+            path = os.path.join(top, self.package, f'{name}.py')
+            with open(path, 'w') as f:
+                f.write(body)
+        self.useFixture(fixtures.MonkeyPatch('sys.path', [top] + sys.path))
+        self.addCleanup(self._unload)
+
+    def _unload(self):
+        for name in list(sys.modules):
+            if name.startswith(self.package):
+                del sys.modules[name]
+
+    def test_profile(self):
+        fixture = modules.ImportProfileFixture()
+        with fixture:
+            importlib.import_module(f'{self.package}.outer')
+            # Already imported, so not recorded again.
+            importlib.import_module(f'{self.package}.inner')
+            details = fixture.getDetails()
+        pkg, inner, outer = (
+            self.package,
+            f'{self.package}.inner',
+            f'{self.package}.outer',
+        )
+        self.assertEqual(
+            [pkg, inner, outer], [name for name, _, _ in fixture.imports]
+        )
+        times = {name: (total, own) for name, total, own in fixture.imports}
+        self.assertGreaterEqual(times[inner][1], 0.01)
+        self.assertGreaterEqual(times[outer][0], times[inner][0])
+        self.assertLess(times[outer][1], times[inner][1])
+
+        ranking = json.loads(b''.join(details['imports'].iter_bytes()))
+        self.assertEqual(inner, ranking[0]['module'])
+
+        # The modules keep their real loader.
+        module = sys.modules[outer]
+        self.assertNotIsInstance(module.__loader__, modules._TimingLoader)
+        loader = module.__spec__.loader  # type: ignore[union-attr]
+        self.assertNotIsInstance(loader, modules._TimingLoader)
+
+    def test_removed_on_cleanup(self):
+        before = list(sys.meta_path)
+        with modules.ImportProfileFixture():
+            self.assertEqual(len(before) + 1, len(sys.meta_path))
+        self.assertEqual(before, sys.meta_path)
@@ -10,15 +10,22 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import io
 import sys
+import tempfile
 from unittest import mock
 
 import testtools
 
 from oslotest import output
+from oslotest import settings
 
 
 class CaptureOutputTest(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
     @mock.patch('os.environ')
     def test_disabled_env(self, mock_env):
         mock_env.get.return_value = ''
@@ -58,3 +65,65 @@ class CaptureOutputTest(testtools.TestCase):
         self.assertIsNotNone(f.stderr)
         self.assertIs(sys.stdout, f.stdout)
         self.assertIs(sys.stderr, f.stderr)
+
+    @mock.patch('os.environ')
+    def test_spooled_env(self, mock_env):
+        mock_env.get.side_effect = lambda value, default=None: {
+            'OS_STDOUT_CAPTURE': 'True',
+            'OS_OUTPUT_CAPTURE_MAX_BYTES': '1K',
+            'OS_OUTPUT_CAPTURE_KEEP_BYTES': '64',
+        }.get(value, default)
+        f = output.CaptureOutput()
+        self.assertEqual(1024, f.max_size)
+        self.assertEqual(64, f.keep)
+        with f:
+            self.assertIs(sys.stdout, f.stdout)
+            self.assertIsNone(f.stderr)
+            print('spooled')
+            self.assertIsInstance(
+                getattr(f.stdout, 'buffer', None),
+                tempfile.SpooledTemporaryFile,
+            )
+            self.assertEqual('spooled\n', f.getDetails()['stdout'].as_text())
+
+
+class SpooledStreamTest(testtools.TestCase):
+    def test_spooled(self):
+        fixture = self.useFixture(output.SpooledStream('out', 16))
+        fixture.stream.write('small')
+        self.assertIsInstance(fixture._file._file, io.BytesIO)
+        self.assertEqual('small', fixture.getDetails()['out'].as_text())
+        fixture.stream.write(' and then much larger')
+        self.assertNotIsInstance(fixture._file._file, io.BytesIO)
+        # The detail is cut to half of the size in memory at each end.
+        self.assertEqual(
+            'small an\n[... 10 bytes left out ...]\nh larger',
+            fixture.getDetails()['out'].as_text(),
+        )
+        # Reading the detail does not move the stream.
+        fixture.stream.write('!')
+        self.assertEqual(
+            'small an\n[... 11 bytes left out ...]\n larger!',
+            fixture.getDetails()['out'].as_text(),
+        )
+
+    def test_close(self):
+        fixture = output.SpooledStream('out', 16)
+        with fixture:
+            fixture.stream.write('x' * 100)
+            spool = fixture._file
+        self.assertTrue(fixture.stream.closed)
+        self.assertTrue(spool.closed)
+
+    def test_keep(self):
+        fixture = self.useFixture(output.SpooledStream('out', 16, keep=4))
+        fixture.stream.write('head' + 'x' * 100 + 'tail')
+        self.assertEqual(
+            'head\n[... 100 bytes left out ...]\ntail',
+            fixture.getDetails()['out'].as_text(),
+        )
+
+    def test_keep_short(self):
+        fixture = self.useFixture(output.SpooledStream('out', 16, keep=4))
+        fixture.stream.write('headtail')
+        self.assertEqual('headtail', fixture.getDetails()['out'].as_text())
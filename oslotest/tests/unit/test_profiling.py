@@ -0,0 +1,111 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import time
+
+import fixtures
+import testtools
+
+from oslotest import profiling
+
+
+class FixtureTimingsTest(testtools.TestCase):
+    def test_timed_fixture(self):
+        timings = profiling.FixtureTimings()
+        fixture = fixtures.EnvironmentVariable('OSLOTEST_PROFILING', 'x')
+        timed = profiling.TimedFixture(fixture, timings)
+        timed.setUp()
+        self.assertEqual('x', os.environ['OSLOTEST_PROFILING'])
+        timed.cleanUp()
+        self.assertNotIn('OSLOTEST_PROFILING', os.environ)
+        result = timings.as_dict()
+        self.assertEqual(['EnvironmentVariable'], list(result))
+        self.assertEqual(1, result['EnvironmentVariable']['count'])
+
+    def test_timed_fixture_setup_failure(self):
+        class BrokenFixture(fixtures.Fixture):
+            def setUp(self):
+                raise ValueError()
+
+        timings = profiling.FixtureTimings()
+        timed = profiling.TimedFixture(BrokenFixture(), timings)
+        self.assertRaises(ValueError, timed.setUp)
+        self.assertEqual(1, timings.as_dict()['BrokenFixture']['count'])
+
+    def test_compact_json_content(self):
+        detail = profiling.compact_json_content({'b': 1, 'a': [1, 2]})
+        self.assertEqual(
+            '{"a":[1,2],"b":1}', b''.join(detail.iter_bytes()).decode()
+        )
+
+    def test_compact_json_content_callable(self):
+        data: list[int] = []
+        detail = profiling.compact_json_content(lambda: data)
+        data.append(1)
+        self.assertEqual('[1]', b''.join(detail.iter_bytes()).decode())
+
+
+class AggregateTest(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(
+            fixtures.MonkeyPatch('oslotest.profiling._REPORTS', {})
+        )
+        self.register = self.useFixture(
+            fixtures.MockPatch('atexit.register')
+        ).mock
+
+    def test_aggregate(self):
+        profiling.aggregate('report', 'key', [1, 0.5])
+        profiling.aggregate('report', 'key', [1, 0.25])
+        profiling.aggregate('report', 'other', [2])
+        self.assertEqual(
+            {'report': {'key': [2, 0.75], 'other': [2]}}, profiling._REPORTS
+        )
+        self.register.assert_called_once_with(profiling._write_reports)
+
+    def test_write_reports(self):
+        tempdir = self.useFixture(fixtures.TempDir()).path
+        self.useFixture(
+            fixtures.EnvironmentVariable('OS_TEST_PROFILE_DIR', tempdir)
+        )
+        profiling.aggregate('report', 'key', [1, 0.5])
+        profiling._write_reports()
+        path = os.path.join(tempdir, f'oslotest-report-{os.getpid()}.json')
+        with open(path) as f:
+            self.assertEqual({'key': [1, 0.5]}, json.load(f))
+
+
+def _slow_function():
+    time.sleep(0.2)
+
+
+class SlowTestProfilerTest(testtools.TestCase):
+    def test_slow(self):
+        profiler = profiling.SlowTestProfiler(0.05)
+        with profiler:
+            _slow_function()
+        self.assertGreater(profiler.samples, 0)
+        lines = profiler.collapsed().splitlines()
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        self.assertIn(';_slow_function (', stack)
+        self.assertIn('test_slow (', stack.split(';')[-2])
+
+    def test_fast(self):
+        profiler = profiling.SlowTestProfiler(10)
+        with profiler:
+            pass
+        self.assertEqual(0, profiler.samples)
+        self.assertEqual('', profiler.collapsed())
@@ -0,0 +1,206 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+import tempfile
+
+import fixtures
+import testtools
+
+from oslotest import settings
+
+
+class SettingsTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
+    def _set_env(self, name, value):
+        self.useFixture(fixtures.EnvironmentVariable(name, value))
+
+    def test_defaults(self):
+        for name in (
+            'OS_TEST_TIMEOUT',
+            'OS_STDOUT_CAPTURE',
+            'OS_STDERR_CAPTURE',
+            'OS_OUTPUT_CAPTURE_MAX_BYTES',
+            'OS_OUTPUT_CAPTURE_KEEP_BYTES',
+            'OS_DEBUG',
+            'OS_LOG_CAPTURE',
+            'OS_LOG_CAPTURE_LAZY',
+            'OS_LOG_CAPTURE_THREADED',
+            'OS_LOG_SKIP_BELOW_LEVEL',
+            'OS_LOG_CAPTURE_MAX_BYTES',
+            'OS_LOG_CAPTURE_SPILL',
+            'OS_TEST_PROFILE_FIXTURES',
+            'OS_TEST_PROFILE_IMPORTS',
+            'OS_TEST_LEAKCHECK',
+            'OS_TEST_MEMORY_LIMIT',
+            'OS_TEST_CPU_TIMEOUT',
+            'OS_TEST_PROFILE_SLOW',
+            'OS_TEST_TIMEOUT_CALIBRATE',
+            'OS_RUN_BENCHMARKS',
+            'OS_TEST_BASELINE',
+            'OS_TEST_BASELINE_UPDATE',
+        ):
+            self._set_env(name, None)
+        s = settings.Settings()
+        self.assertIsNone(s.test_timeout)
+        self.assertFalse(s.stdout_capture)
+        self.assertFalse(s.stderr_capture)
+        self.assertIsNone(s.output_capture_max_bytes)
+        self.assertIsNone(s.output_capture_keep_bytes)
+        self.assertEqual(0, s.debug_level)
+        self.assertFalse(s.log_capture)
+        self.assertFalse(s.lazy_log_capture)
+        self.assertFalse(s.threaded_log_capture)
+        self.assertFalse(s.log_skip_below_level)
+        self.assertIsNone(s.log_capture_max_bytes)
+        self.assertIsNone(s.log_spill_dir)
+        self.assertFalse(s.profile_fixtures)
+        self.assertFalse(s.profile_imports)
+        self.assertIsNone(s.leakcheck_limit)
+        self.assertIsNone(s.memory_limit)
+        self.assertIsNone(s.cpu_timeout)
+        self.assertFalse(s.calibrate_timeouts)
+        self.assertFalse(s.run_benchmarks)
+        self.assertIsNone(s.baseline_file)
+        self.assertFalse(s.update_baselines)
+        self.assertIsNone(s.profile_slow_after)
+        self.assertIsNone(s.profile_slow_fraction)
+
+    def test_values(self):
+        self._set_env('OS_TEST_TIMEOUT', '30')
+        self._set_env('OS_STDOUT_CAPTURE', 'yes')
+        self._set_env('OS_STDERR_CAPTURE', 'no')
+        self._set_env('OS_DEBUG', 'TRACE')
+        self._set_env('OS_LOG_CAPTURE', '1')
+        self._set_env('OS_TEST_CPU_TIMEOUT', '2.5')
+        s = settings.Settings()
+        self.assertEqual(30, s.test_timeout)
+        self.assertEqual(2.5, s.cpu_timeout)
+        self.assertTrue(s.stdout_capture)
+        self.assertFalse(s.stderr_capture)
+        self.assertEqual(5, s.debug_level)
+        self.assertTrue(s.log_capture)
+
+    def test_invalid_timeout(self):
+        self._set_env('OS_TEST_TIMEOUT', 'invalid')
+        self.assertIsNone(settings.Settings().test_timeout)
+
+    def test_memory_limit(self):
+        for value, limit in (
+            ('1048576', 1024 * 1024),
+            ('1G', 1024**3),
+            ('1', 1),
+            ('0', 0),
+            ('no', None),
+            ('True', None),
+        ):
+            self._set_env('OS_TEST_MEMORY_LIMIT', value)
+            self.assertEqual(limit, settings.Settings().memory_limit)
+
+    def test_output_capture_limits(self):
+        self._set_env('OS_OUTPUT_CAPTURE_MAX_BYTES', '64K')
+        self._set_env('OS_OUTPUT_CAPTURE_KEEP_BYTES', '1')
+        s = settings.Settings()
+        self.assertEqual(64 * 1024, s.output_capture_max_bytes)
+        self.assertEqual(1, s.output_capture_keep_bytes)
+
+    def test_invalid_output_capture_limits(self):
+        for name in (
+            'OS_OUTPUT_CAPTURE_MAX_BYTES',
+            'OS_OUTPUT_CAPTURE_KEEP_BYTES',
+        ):
+            with fixtures.EnvironmentVariable(name, '10X'):
+                self.assertRaises(ValueError, settings.Settings)
+
+    def test_log_capture_limits(self):
+        self._set_env('OS_LOG_CAPTURE_MAX_BYTES', '64K')
+        self._set_env('OS_LOG_CAPTURE_SPILL', 'yes')
+        s = settings.Settings()
+        self.assertEqual(64 * 1024, s.log_capture_max_bytes)
+        self.assertEqual(tempfile.gettempdir(), s.log_spill_dir)
+
+    def test_invalid_log_capture_limit(self):
+        self._set_env('OS_LOG_CAPTURE_MAX_BYTES', '10X')
+        self.assertRaises(ValueError, settings.Settings)
+
+    def test_invalid_memory_limit(self):
+        for value in ('invalid', '10X', '-1'):
+            self._set_env('OS_TEST_MEMORY_LIMIT', value)
+            self.assertRaises(ValueError, settings.Settings)
+
+    def test_profile_slow(self):
+        for value, after, fraction in (
+            ('2.5', 2.5, None),
+            ('25%', None, 0.25),
+            ('yes', None, settings.DEFAULT_PROFILE_SLOW_FRACTION),
+            ('no', None, None),
+        ):
+            self._set_env('OS_TEST_PROFILE_SLOW', value)
+            s = settings.Settings()
+            self.assertEqual(after, s.profile_slow_after)
+            self.assertEqual(fraction, s.profile_slow_fraction)
+
+    def test_invalid_profile_slow(self):
+        for value in ('invalid', '-1', '0%', 'x%'):
+            self._set_env('OS_TEST_PROFILE_SLOW', value)
+            self.assertRaises(ValueError, settings.Settings)
+
+    def test_debug_levels(self):
+        for value, level in (
+            ('True', logging.DEBUG),
+            ('false', 0),
+            ('20', logging.INFO),
+            ('WARNING', logging.WARNING),
+        ):
+            self._set_env('OS_DEBUG', value)
+            self.assertEqual(level, settings.Settings().debug_level)
+
+    def test_invalid_debug(self):
+        self._set_env('OS_DEBUG', 'invalid')
+        self.assertRaises(ValueError, settings.Settings)
+
+    def test_leakcheck_limits(self):
+        for value, limit in (
+            ('yes', settings.DEFAULT_LEAKCHECK_LIMIT),
+            ('no', None),
+            ('4096', 4096),
+            ('512k', 512 * 1024),
+            ('2M', 2 * 1024 * 1024),
+        ):
+            self._set_env('OS_TEST_LEAKCHECK', value)
+            self.assertEqual(limit, settings.Settings().leakcheck_limit)
+
+    def test_invalid_leakcheck(self):
+        for value in ('invalid', '10X', '-1'):
+            self._set_env('OS_TEST_LEAKCHECK', value)
+            self.assertRaises(ValueError, settings.Settings)
+
+    def test_cached(self):
+        self._set_env('OS_LOG_CAPTURE', 'True')
+        first = settings.get_settings()
+        self.assertTrue(first.log_capture)
+        self._set_env('OS_LOG_CAPTURE', 'False')
+        self.assertIs(first, settings.get_settings())
+        settings.reset()
+        second = settings.get_settings()
+        self.assertIsNot(first, second)
+        self.assertFalse(second.log_capture)
+
+    def test_reset_fixture(self):
+        first = settings.get_settings()
+        with settings.ResetSettings():
+            second = settings.get_settings()
+            self.assertIsNot(first, second)
+        self.assertIsNot(second, settings.get_settings())
@@ -0,0 +1,158 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import socket
+import sqlite3
+import stat
+import subprocess
+import sys
+import tempfile
+
+import fixtures
+import testtools
+
+from oslotest import tempdir
+
+
+class SharedTempDirTest(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = self.useFixture(fixtures.TempDir()).path
+
+    def test_empty_directory(self):
+        os.makedirs(os.path.join(self.path, 'a', 'b'))
+        with open(os.path.join(self.path, 'a', 'b', 'c'), 'w'):
+            pass
+        with open(os.path.join(self.path, 'd'), 'w'):
+            pass
+        os.symlink(self.path, os.path.join(self.path, 'link'))
+        tempdir.empty_directory(self.path)
+        self.assertEqual([], os.listdir(self.path))
+
+    def test_empty_missing_directory(self):
+        tempdir.empty_directory(os.path.join(self.path, 'missing'))
+
+    def test_shared_nested_tempfile(self):
+        original = tempfile.gettempdir()
+        with tempdir.SharedNestedTempfile(self.path):
+            self.assertEqual(self.path, tempfile.gettempdir())
+            tempfile.mkstemp()
+            self.assertEqual(1, len(os.listdir(self.path)))
+        self.assertEqual(original, tempfile.gettempdir())
+        self.assertTrue(os.path.isdir(self.path))
+        self.assertEqual([], os.listdir(self.path))
+
+    def test_shared_temp_home_dir(self):
+        original = os.environ.get('HOME')
+        with tempdir.SharedTempHomeDir(self.path):
+            self.assertEqual(self.path, os.environ['HOME'])
+            os.mkdir(os.path.expanduser('~/.config'))
+        self.assertEqual(original, os.environ.get('HOME'))
+        self.assertTrue(os.path.isdir(self.path))
+        self.assertEqual([], os.listdir(self.path))
+
+
+class LazyTempDirTest(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.useFixture(fixtures.TempDir()).path
+
+    def test_unused(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            self.assertEqual(self.root, os.path.dirname(lazy.path))
+            self.assertFalse(os.path.exists(lazy.path))
+        self.assertFalse(os.path.exists(lazy.path))
+
+    def test_created_on_open(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            with open(os.path.join(lazy.path, 'file'), 'w') as f:
+                f.write('data')
+            self.assertTrue(os.path.isdir(lazy.path))
+        self.assertFalse(os.path.exists(lazy.path))
+
+    def test_created_on_listdir(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            self.assertEqual([], os.listdir(lazy.path))
+
+    def test_mkdir_by_caller(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            os.mkdir(lazy.path)
+            os.makedirs(os.path.join(lazy.path, 'a', 'b'))
+        self.assertFalse(os.path.exists(lazy.path))
+
+    def test_created_on_sqlite_connect(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            db = sqlite3.connect(os.path.join(lazy.path, 'db'))
+            db.close()
+            self.assertTrue(os.path.isdir(lazy.path))
+        self.assertFalse(os.path.exists(lazy.path))
+
+    def test_created_on_socket_bind(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            with socket.socket(socket.AF_UNIX) as sock:
+                sock.bind(os.path.join(lazy.path, 'sock'))
+            self.assertTrue(os.path.isdir(lazy.path))
+
+    def test_created_private(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            os.listdir(lazy.path)
+            self.assertEqual(0o700, stat.S_IMODE(os.stat(lazy.path).st_mode))
+
+    def _create_behind(self, path):
+        # Create the directory without the fixture noticing, as another
+        # process would.
+        with tempdir._lazy_lock:
+            tempdir._lazy_paths.discard(path)
+        os.mkdir(path)
+        with tempdir._lazy_lock:
+            tempdir._lazy_paths.add(path)
+
+    def test_taken_by_someone_else(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            self._create_behind(lazy.path)
+            self.assertRaises(FileExistsError, os.listdir, lazy.path)
+        self.assertTrue(os.path.isdir(lazy.path))
+
+    def test_mkdir_by_caller_taken(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            self._create_behind(lazy.path)
+            self.assertRaises(FileExistsError, os.mkdir, lazy.path)
+        self.assertTrue(os.path.isdir(lazy.path))
+
+    def test_created_on_subprocess(self):
+        with tempdir.LazyTempDir(rootdir=self.root) as lazy:
+            subprocess.check_call([sys.executable, '-c', 'pass'])
+            self.assertTrue(os.path.isdir(lazy.path))
+        self.assertFalse(os.path.exists(lazy.path))
+
+    def test_lazy_nested_tempfile(self):
+        self.useFixture(fixtures.MonkeyPatch('tempfile.tempdir', self.root))
+        with tempdir.LazyNestedTempfile():
+            path = tempfile.gettempdir()
+            self.assertNotEqual(self.root, path)
+            self.assertFalse(os.path.exists(path))
+            fd, name = tempfile.mkstemp()
+            os.close(fd)
+            self.assertEqual(path, os.path.dirname(name))
+        self.assertEqual(self.root, tempfile.gettempdir())
+        self.assertFalse(os.path.exists(path))
+
+    def test_lazy_temp_home_dir(self):
+        original = os.environ.get('HOME')
+        with tempdir.LazyTempHomeDir(rootdir=self.root) as lazy:
+            self.assertEqual(lazy.path, os.environ['HOME'])
+            self.assertFalse(os.path.exists(lazy.path))
+            os.makedirs(os.path.expanduser('~/.config/app'))
+            self.assertTrue(os.path.isdir(lazy.path))
+        self.assertEqual(original, os.environ.get('HOME'))
+        self.assertFalse(os.path.exists(lazy.path))
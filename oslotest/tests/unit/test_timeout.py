@@ -10,87 +10,201 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import signal
+import time
 from unittest import mock
 
+import fixtures
 import testtools
 
+from oslotest import settings
 from oslotest import timeout
 
 
+def _env(values):
+    return lambda name, default=None: values.get(name, default)
+
+
 class TimeoutTestCase(testtools.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(settings.ResetSettings())
+
     @mock.patch('os.environ.get')
     @mock.patch.object(timeout.Timeout, 'useFixture')
-    @mock.patch('fixtures.Timeout')
+    @mock.patch.object(timeout, 'IntervalTimeout')
     def test_timeout(self, fixture_timeout_mock, fixture_mock, env_get_mock):
-        env_get_mock.return_value = 1
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': 1})
         tc = timeout.Timeout()
         tc.setUp()
-        env_get_mock.assert_called_once_with('OS_TEST_TIMEOUT', 0)
-        fixture_timeout_mock.assert_called_once_with(1, gentle=True)
+        env_get_mock.assert_any_call('OS_TEST_TIMEOUT')
+        fixture_timeout_mock.assert_called_once_with(1.0)
         self.assertEqual(1, fixture_mock.call_count)
 
     @mock.patch('os.environ.get')
     @mock.patch.object(timeout.Timeout, 'useFixture')
-    @mock.patch('fixtures.Timeout')
+    @mock.patch.object(timeout, 'IntervalTimeout')
     def test_no_timeout(
         self, fixture_timeout_mock, fixture_mock, env_get_mock
     ):
         # Returning 0 means we don't install the timeout
-        env_get_mock.return_value = 0
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': 0})
         tc = timeout.Timeout()
         tc.setUp()
-        env_get_mock.assert_called_once_with('OS_TEST_TIMEOUT', 0)
+        env_get_mock.assert_any_call('OS_TEST_TIMEOUT')
         self.assertEqual(0, fixture_timeout_mock.call_count)
         self.assertEqual(0, fixture_mock.call_count)
 
     @mock.patch('os.environ.get')
     @mock.patch.object(timeout.Timeout, 'useFixture')
-    @mock.patch('fixtures.Timeout')
+    @mock.patch.object(timeout, 'IntervalTimeout')
     def test_timeout_default(
         self, fixture_timeout_mock, fixture_mock, env_get_mock
     ):
-        env_get_mock.return_value = 5
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': 5})
         tc = timeout.Timeout(default_timeout=5)
         tc.setUp()
-        env_get_mock.assert_called_once_with('OS_TEST_TIMEOUT', 5)
-        fixture_timeout_mock.assert_called_once_with(5, gentle=True)
+        env_get_mock.assert_any_call('OS_TEST_TIMEOUT')
+        fixture_timeout_mock.assert_called_once_with(5.0)
         self.assertEqual(1, fixture_mock.call_count)
 
     @mock.patch('os.environ.get')
     @mock.patch.object(timeout.Timeout, 'useFixture')
-    @mock.patch('fixtures.Timeout')
+    @mock.patch.object(timeout, 'IntervalTimeout')
     def test_timeout_bad_default(
         self, fixture_timeout_mock, fixture_mock, env_get_mock
     ):
-        env_get_mock.return_value = 'invalid'
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': 'invalid'})
         tc = timeout.Timeout(default_timeout='invalid')  # type: ignore
         tc.setUp()
-        env_get_mock.assert_called_once_with('OS_TEST_TIMEOUT', 0)
+        env_get_mock.assert_any_call('OS_TEST_TIMEOUT')
         self.assertEqual(0, fixture_timeout_mock.call_count)
         self.assertEqual(0, fixture_mock.call_count)
 
     @mock.patch('os.environ.get')
     @mock.patch.object(timeout.Timeout, 'useFixture')
-    @mock.patch('fixtures.Timeout')
+    @mock.patch.object(timeout, 'IntervalTimeout')
     def test_timeout_scaling(
         self, fixture_timeout_mock, fixture_mock, env_get_mock
     ):
-        env_get_mock.return_value = 2
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': 2})
         tc = timeout.Timeout(scaling_factor=1.5)
         tc.setUp()
-        env_get_mock.assert_called_once_with('OS_TEST_TIMEOUT', 0)
-        fixture_timeout_mock.assert_called_once_with(3, gentle=True)
+        env_get_mock.assert_any_call('OS_TEST_TIMEOUT')
+        fixture_timeout_mock.assert_called_once_with(3.0)
         self.assertEqual(1, fixture_mock.call_count)
 
     @mock.patch('os.environ.get')
     @mock.patch.object(timeout.Timeout, 'useFixture')
-    @mock.patch('fixtures.Timeout')
+    @mock.patch.object(timeout, 'IntervalTimeout')
     def test_timeout_bad_scaling(
         self, fixture_timeout_mock, fixture_mock, env_get_mock
     ):
-        env_get_mock.return_value = 2
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': 2})
         tc = timeout.Timeout(scaling_factor='invalid')  # type: ignore
         tc.setUp()
-        env_get_mock.assert_called_once_with('OS_TEST_TIMEOUT', 0)
-        fixture_timeout_mock.assert_called_once_with(2, gentle=True)
+        env_get_mock.assert_any_call('OS_TEST_TIMEOUT')
+        fixture_timeout_mock.assert_called_once_with(2.0)
         self.assertEqual(1, fixture_mock.call_count)
+
+    @mock.patch('os.environ.get')
+    @mock.patch.object(timeout.Timeout, 'useFixture')
+    @mock.patch.object(timeout, 'IntervalTimeout')
+    def test_timeout_fractional(
+        self, fixture_timeout_mock, fixture_mock, env_get_mock
+    ):
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': '0.4'})
+        tc = timeout.Timeout(scaling_factor=0.5)
+        tc.setUp()
+        fixture_timeout_mock.assert_called_once_with(0.2)
+
+    @mock.patch('oslotest.calibration.get_speed_factor', return_value=2.0)
+    @mock.patch('os.environ.get')
+    @mock.patch.object(timeout.Timeout, 'useFixture')
+    @mock.patch.object(timeout, 'IntervalTimeout')
+    def test_timeout_calibrated(
+        self, fixture_timeout_mock, fixture_mock, env_get_mock, speed_mock
+    ):
+        env_get_mock.side_effect = _env(
+            {'OS_TEST_TIMEOUT': '3', 'OS_TEST_TIMEOUT_CALIBRATE': 'True'}
+        )
+        tc = timeout.Timeout(scaling_factor=0.5)
+        tc.setUp()
+        fixture_timeout_mock.assert_called_once_with(3.0)
+        self.assertEqual(3.0, tc.timeout)
+
+    @mock.patch('oslotest.calibration.get_speed_factor')
+    @mock.patch('os.environ.get')
+    @mock.patch.object(timeout.Timeout, 'useFixture')
+    @mock.patch.object(timeout, 'IntervalTimeout')
+    def test_timeout_not_calibrated(
+        self, fixture_timeout_mock, fixture_mock, env_get_mock, speed_mock
+    ):
+        env_get_mock.side_effect = _env({'OS_TEST_TIMEOUT': '3'})
+        tc = timeout.Timeout()
+        tc.setUp()
+        fixture_timeout_mock.assert_called_once_with(3.0)
+        self.assertEqual(0, speed_mock.call_count)
+
+    @mock.patch('os.environ.get')
+    @mock.patch.object(timeout.Timeout, 'useFixture')
+    @mock.patch.object(timeout, 'CPUTimeout')
+    def test_cpu_timeout(self, cpu_timeout_mock, fixture_mock, env_get_mock):
+        env_get_mock.side_effect = _env({'OS_TEST_CPU_TIMEOUT': '0.5'})
+        tc = timeout.Timeout(scaling_factor=3)
+        tc.setUp()
+        env_get_mock.assert_any_call('OS_TEST_CPU_TIMEOUT')
+        cpu_timeout_mock.assert_called_once_with(1.5)
+        self.assertEqual(1, fixture_mock.call_count)
+
+    @mock.patch('os.environ.get')
+    @mock.patch.object(timeout.Timeout, 'useFixture')
+    @mock.patch.object(timeout, 'CPUTimeout')
+    def test_cpu_timeout_default(
+        self, cpu_timeout_mock, fixture_mock, env_get_mock
+    ):
+        env_get_mock.side_effect = _env({})
+        tc = timeout.Timeout(default_cpu_timeout=2)
+        tc.setUp()
+        cpu_timeout_mock.assert_called_once_with(2.0)
+
+
+@testtools.skipUnless(hasattr(signal, 'setitimer'), 'requires setitimer')
+class CPUTimeoutTestCase(testtools.TestCase):
+    def test_busy_loop(self):
+        with timeout.CPUTimeout(0.05):
+            try:
+                while True:
+                    pass
+            except timeout.CPUTimeoutException as exc:
+                self.assertIn('user', str(exc))
+                self.assertIn('system', str(exc))
+            else:
+                self.fail('CPUTimeoutException not raised')
+
+    def test_sleep(self):
+        with timeout.CPUTimeout(0.05):
+            time.sleep(0.1)
+
+    def test_cleanup(self):
+        handler = signal.getsignal(signal.SIGPROF)
+        with timeout.CPUTimeout(10):
+            pass
+        self.assertEqual((0.0, 0.0), signal.getitimer(signal.ITIMER_PROF))
+        self.assertEqual(handler, signal.getsignal(signal.SIGPROF))
+
+
+@testtools.skipUnless(hasattr(signal, 'setitimer'), 'requires setitimer')
+class IntervalTimeoutTestCase(testtools.TestCase):
+    def test_sub_second(self):
+        start = time.monotonic()
+        with timeout.IntervalTimeout(0.05):
+            self.assertRaises(fixtures.TimeoutException, time.sleep, 1)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_cleanup(self):
+        handler = signal.getsignal(signal.SIGALRM)
+        with timeout.IntervalTimeout(10):
+            pass
+        self.assertEqual((0.0, 0.0), signal.getitimer(signal.ITIMER_REAL))
+        self.assertEqual(handler, signal.getsignal(signal.SIGALRM))
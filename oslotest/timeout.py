@@ -10,15 +10,105 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import os
+import signal
+from types import FrameType
+
 import fixtures
 
-import os
+from oslotest import calibration
+from oslotest import settings
+
+
+class IntervalTimeout(fixtures.Fixture):
+    """Raise :exc:`fixtures.TimeoutException` after ``timeout`` seconds.
+
+    This behaves like a gentle :class:`fixtures.Timeout`, but uses an
+    ``ITIMER_REAL`` interval timer rather than :func:`signal.alarm`, so the
+    timeout may be a fraction of a second.
+
+    The timer is not available on Windows, where this fixture does nothing.
+
+    :param timeout: The wall-clock time, in seconds.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__()
+        self.timeout = timeout
+
+    def signal_handler(self, signum: int, frame: FrameType | None) -> None:
+        raise fixtures.TimeoutException(
+            f'The test took longer than {self.timeout:g}s.'
+        )
+
+    def _setUp(self) -> None:
+        if not hasattr(signal, 'setitimer'):
+            return
+        old_handler = signal.signal(signal.SIGALRM, self.signal_handler)
+        self.addCleanup(signal.signal, signal.SIGALRM, old_handler)
+        signal.setitimer(signal.ITIMER_REAL, self.timeout)
+        self.addCleanup(signal.setitimer, signal.ITIMER_REAL, 0)
+
+
+class CPUTimeoutException(fixtures.TimeoutException):
+    """The test used more CPU time than allowed."""
+
+
+class CPUTimeout(fixtures.Fixture):
+    """Set the maximum CPU time the test may use.
+
+    The CPU time used by the whole process, in all threads, is counted by
+    an ``ITIMER_PROF`` interval timer. When it expires,
+    :exc:`CPUTimeoutException` is raised in the main thread, reporting the
+    user and system time used. Unlike a wall-clock timeout, time spent
+    waiting, or waiting for a CPU on a busy machine, does not count.
+
+    The timer is not available on Windows, where this fixture does nothing.
+
+    :param timeout: The CPU time, in seconds.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__()
+        self.timeout = timeout
+
+    def _setUp(self) -> None:
+        if not hasattr(signal, 'setitimer'):
+            return
+        start = os.times()
+
+        def signal_handler(signum: int, frame: FrameType | None) -> None:
+            end = os.times()
+            raise CPUTimeoutException(
+                f'The test used more than {self.timeout:g}s of CPU time: '
+                f'{end.user - start.user:.3f}s user, '
+                f'{end.system - start.system:.3f}s system.'
+            )
+
+        old_handler = signal.signal(signal.SIGPROF, signal_handler)
+        self.addCleanup(signal.signal, signal.SIGPROF, old_handler)
+        signal.setitimer(signal.ITIMER_PROF, self.timeout)
+        self.addCleanup(signal.setitimer, signal.ITIMER_PROF, 0)
 
 
 class Timeout(fixtures.Fixture):
     """Set the maximum length of time for the test to run.
 
-    Uses OS_TEST_TIMEOUT to get the timeout.
+    Uses OS_TEST_TIMEOUT to get the timeout, in seconds. Both the timeout
+    and the scaling factor may be fractional, see :class:`IntervalTimeout`.
+
+    Uses OS_TEST_CPU_TIMEOUT to get the maximum CPU time, see
+    :class:`CPUTimeout`. It is scaled by the same factor.
+
+    If OS_TEST_TIMEOUT_CALIBRATE is set to a true value, or ``calibrate``
+    is true, both timeouts are also multiplied by the speed factor of the
+    host, see :func:`oslotest.calibration.get_speed_factor`, so that they
+    allow for the same amount of work on fast and slow machines.
+
+    .. py:attribute:: timeout
+
+       The scaled wall-clock timeout, in seconds, set on setUp. ``0`` means
+       no timeout.
 
     """
 
@@ -26,27 +116,49 @@ class Timeout(fixtures.Fixture):
         self,
         default_timeout: int | float = 0,
         scaling_factor: int | float = 1,
+        default_cpu_timeout: int | float = 0,
+        calibrate: bool | None = None,
     ) -> None:
         super().__init__()
         try:
-            self._default_timeout = int(default_timeout)
-        except ValueError:
+            self._default_timeout = float(default_timeout)
+        except (TypeError, ValueError):
             # If timeout value is invalid do not set a timeout.
             self._default_timeout = 0
         self._scaling_factor = scaling_factor
+        self._default_cpu_timeout = default_cpu_timeout
+        self._calibrate = calibrate
+        self.timeout: float = 0
 
     def setUp(self) -> None:
         super().setUp()
-        test_timeout = os.environ.get('OS_TEST_TIMEOUT', self._default_timeout)
-        try:
-            test_timeout = int(test_timeout)
-        except ValueError:
-            # If timeout value is invalid use the default timeout.
+        test_timeout = settings.get_settings().test_timeout
+        if test_timeout is None:
+            # If timeout value is unset or invalid use the default timeout.
             test_timeout = self._default_timeout
         try:
-            scaled_timeout = int(test_timeout * self._scaling_factor)
-        except ValueError:
+            scaled_timeout = float(test_timeout * self._scaling_factor)
+        except (TypeError, ValueError):
             # If scaling factor is invalid, use the basic test timeout.
             scaled_timeout = test_timeout
         if scaled_timeout > 0:
-            self.useFixture(fixtures.Timeout(scaled_timeout, gentle=True))
+            scaled_timeout *= self._speed_factor()
+            self.timeout = scaled_timeout
+            self.useFixture(IntervalTimeout(scaled_timeout))
+
+        cpu_timeout = settings.get_settings().cpu_timeout
+        if cpu_timeout is None:
+            cpu_timeout = self._default_cpu_timeout
+        try:
+            scaled_cpu_timeout = float(cpu_timeout * self._scaling_factor)
+        except (TypeError, ValueError):
+            scaled_cpu_timeout = cpu_timeout
+        if scaled_cpu_timeout > 0:
+            scaled_cpu_timeout *= self._speed_factor()
+            self.useFixture(CPUTimeout(scaled_cpu_timeout))
+
+    def _speed_factor(self) -> float:
+        calibrate = self._calibrate
+        if calibrate is None:
+            calibrate = settings.get_settings().calibrate_timeouts
+        return calibration.get_speed_factor() if calibrate else 1.0
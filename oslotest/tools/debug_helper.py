@@ -0,0 +1,303 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Run a selection of tests in a single process, so they can be debugged.
+
+This is the implementation of the ``oslo_debug_helper`` script. Rather than
+discovering the whole test tree to find the tests to run, it keeps an index
+of the test ids found in each test module. Only the modules that changed
+since the index was written, or whose tests come from a module under the
+project directory that changed, such as a base class or a list of
+scenarios, are imported to update it. Only the modules containing the
+selected tests are imported to run them.
+"""
+
+import argparse
+import ast
+from collections.abc import Iterator, Sequence
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import re
+import subprocess
+import sys
+import tomllib
+from typing import Any
+import unittest
+
+from testtools import run as testtools_run
+from testtools import testsuite
+
+_INDEX_VERSION = 2
+_TEST_PATTERN = re.compile(r'^test.*\.py$')
+
+
+def default_test_dir(top_dir: str) -> str:
+    """Return ``<package name>/tests``, relative to ``top_dir``."""
+    name = None
+    try:
+        with open(os.path.join(top_dir, 'pyproject.toml'), 'rb') as f:
+            name = tomllib.load(f).get('project', {}).get('name')
+    except (OSError, tomllib.TOMLDecodeError):
+        pass
+    if not name:
+        name = subprocess.run(
+            [sys.executable, 'setup.py', '--name'],
+            cwd=top_dir,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    return os.path.join(name, 'tests')
+
+
+def default_index_path(top_dir: str, test_dir: str) -> str:
+    """Return the cache file holding the index for ``test_dir``."""
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(
+        os.path.join('~', '.cache')
+    )
+    key = os.path.abspath(os.path.join(top_dir, test_dir))
+    digest = hashlib.sha1(key.encode(), usedforsecurity=False).hexdigest()
+    return os.path.join(cache_dir, 'oslotest', f'debug-index-{digest}.json')
+
+
+def find_test_modules(top_dir: str, test_dir: str) -> Iterator[str]:
+    """Yield the paths of the test modules under ``test_dir``.
+
+    Like unittest discovery, this looks for ``test*.py`` files and only
+    descends into packages.
+    """
+    start = os.path.join(top_dir, test_dir)
+    for dirpath, dirnames, filenames in os.walk(start):
+        dirnames[:] = sorted(
+            d
+            for d in dirnames
+            if os.path.isfile(os.path.join(dirpath, d, '__init__.py'))
+        )
+        for filename in sorted(filenames):
+            if _TEST_PATTERN.match(filename):
+                yield os.path.join(dirpath, filename)
+
+
+def _module_name(top_dir: str, path: str) -> str:
+    relpath = os.path.relpath(path, top_dir)
+    return os.path.splitext(relpath)[0].replace(os.sep, '.')
+
+
+def _imported_names(module: Any) -> set[str]:
+    """Return the names of the modules ``module`` imports from.
+
+    Objects without a ``__module__``, such as lists of scenarios, only tell
+    where they come from through the import statements.
+    """
+    try:
+        tree = ast.parse(inspect.getsource(module))
+    except (OSError, TypeError, SyntaxError):
+        return set()
+    names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = '.' * node.level + (node.module or '')
+            try:
+                base = importlib.util.resolve_name(base, module.__package__)
+            except (ImportError, ValueError):
+                continue
+            names.add(base)
+            names.update(f'{base}.{alias.name}' for alias in node.names)
+    return names
+
+
+def _list_tests(module_name: str, top_dir: str) -> tuple[list[str], set[str]]:
+    """Return the ids of the tests of a module, and the files they use.
+
+    The files are those of the modules under ``top_dir``, other than the
+    test module itself, defining the base classes of the tests or imported
+    by the test module, such as mixins or scenarios.
+    """
+    loader = unittest.TestLoader()
+    suite = loader.loadTestsFromName(module_name)
+    if loader.errors:
+        raise ImportError('\n'.join(str(e) for e in loader.errors))
+    tests = list(testsuite.iterate_tests(suite))
+    names: set[str] = set()
+    for test in tests:
+        names.update(cls.__module__ for cls in type(test).__mro__)
+    module = sys.modules[module_name]
+    for value in vars(module).values():
+        if inspect.ismodule(value):
+            names.add(value.__name__)
+        elif isinstance(getattr(value, '__module__', None), str):
+            names.add(value.__module__)
+    names.update(_imported_names(module))
+    names.discard(module_name)
+    top = os.path.join(os.path.abspath(top_dir), '')
+    files: set[str] = set()
+    for name in names:
+        path = getattr(sys.modules.get(name), '__file__', None)
+        if path and os.path.abspath(path).startswith(top):
+            files.add(os.path.abspath(path))
+    return [test.id() for test in tests], files
+
+
+def _is_fresh(entry: dict[str, Any], mtime: float) -> bool:
+    if entry['mtime'] != mtime:
+        return False
+    for path, dep_mtime in entry['dependencies'].items():
+        try:
+            if os.stat(path).st_mtime != dep_mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+class TestIndex:
+    """The test ids found in each test module, by module mtime.
+
+    The mtimes of the other project modules the tests come from are
+    recorded too, so that the test module is indexed again when they change.
+
+    :param path: The file the index is persisted to.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.modules: dict[str, dict[str, Any]] = {}
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == _INDEX_VERSION:
+            self.modules = data['modules']
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}'
+        with open(tmp, 'w') as f:
+            json.dump({'version': _INDEX_VERSION, 'modules': self.modules}, f)
+        os.replace(tmp, self.path)
+
+    def update(self, top_dir: str, test_dir: str) -> bool:
+        """Bring the index up to date with the test modules on disk.
+
+        Modules that are new or were modified since they were indexed, or
+        whose dependencies were, are imported to list their tests. Modules
+        that failed to import are not indexed, so that they are retried next
+        time.
+
+        :return: Whether the index changed.
+        """
+        changed = False
+        seen = set()
+        for path in find_test_modules(top_dir, test_dir):
+            name = _module_name(top_dir, path)
+            seen.add(name)
+            mtime = os.stat(path).st_mtime
+            entry = self.modules.get(name)
+            if entry is not None and _is_fresh(entry, mtime):
+                continue
+            changed = True
+            try:
+                tests, files = _list_tests(name, top_dir)
+            except Exception as exc:
+                print(f'Unable to index {name}: {exc}', file=sys.stderr)
+                self.modules.pop(name, None)
+                continue
+            self.modules[name] = {
+                'mtime': mtime,
+                'tests': tests,
+                'dependencies': {f: os.stat(f).st_mtime for f in files},
+            }
+        for name in set(self.modules) - seen:
+            del self.modules[name]
+            changed = True
+        return changed
+
+    def select(self, pattern: str | None) -> dict[str, list[str]]:
+        """Return the indexed test ids matching the ``pattern`` regex.
+
+        :return: A dict from module name to the selected test ids in that
+            module, for the modules with at least one selected test.
+        """
+        regex = re.compile(pattern) if pattern else None
+        selected = {}
+        for name in sorted(self.modules):
+            tests = self.modules[name]['tests']
+            matching = [t for t in tests if regex is None or regex.search(t)]
+            if matching:
+                selected[name] = matching
+        return selected
+
+
+def load_tests(selected: dict[str, list[str]]) -> unittest.TestSuite:
+    """Load the selected tests, only importing the modules containing them.
+
+    Whole modules are loaded and then filtered, so that tests with ids
+    which are not importable names, such as scenarios, are supported.
+    """
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+    for name, test_ids in selected.items():
+        module_suite = loader.loadTestsFromName(name)
+        suite.addTest(testsuite.filter_by_ids(module_suite, test_ids))
+    return suite
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='oslo_debug_helper',
+        description='Run tests in a single process, to debug them.',
+    )
+    parser.add_argument(
+        '-t',
+        dest='test_dir',
+        help='The directory containing the tests, relative to the project '
+        'directory. Defaults to <package name>/tests.',
+    )
+    parser.add_argument(
+        '--rebuild',
+        action='store_true',
+        help='Rebuild the test index from scratch.',
+    )
+    parser.add_argument(
+        'pattern',
+        nargs='?',
+        help='A regular expression selecting the tests to run. All tests '
+        'are run if it is not given.',
+    )
+    args = parser.parse_args(argv)
+
+    top_dir = os.getcwd()
+    if top_dir not in sys.path:
+        sys.path.insert(0, top_dir)
+    test_dir = args.test_dir or default_test_dir(top_dir)
+
+    index = TestIndex(default_index_path(top_dir, test_dir))
+    if not args.rebuild:
+        index.load()
+    if index.update(top_dir, test_dir):
+        index.save()
+
+    suite = load_tests(index.select(args.pattern))
+    result = testtools_run.TestToolsTestRunner(stdout=sys.stdout).run(suite)
+    return 0 if result is not None and result.wasSuccessful() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
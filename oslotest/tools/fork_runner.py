@@ -0,0 +1,261 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Run tests in parallel in workers forked from a warm parent process.
+
+The parent process imports a list of modules and discovers the tests once,
+then forks the workers, which inherit everything already imported instead
+of each paying for it. Every worker runs its share of the tests and streams
+the results back to the parent as subunit v2, which forwards them to
+stdout with a route code per worker, ready for ``stestr load``::
+
+    python -m oslotest.tools.fork_runner -j 32 --preload myproject.db \\
+        discover -t ./ ./myproject/tests | stestr load
+
+The modules to preload can also be given, comma separated, in the
+``OS_TEST_PRELOAD`` environment variable. Preloaded modules must not start
+threads, since those do not survive the fork.
+
+Tests are shared among the workers by test class, so that class level
+fixtures are only set up once.
+"""
+
+import argparse
+import atexit
+from collections.abc import Iterable, Sequence
+import importlib
+import os
+import sys
+import threading
+import traceback
+from typing import Any
+import unittest
+
+import subunit
+from subunit import run as subunit_run
+import testtools
+from testtools import testsuite
+
+DEFAULT_PRELOAD = (
+    'unittest.mock',
+    'fixtures',
+    'testtools',
+    'oslotest.base',
+)
+
+
+def preload(modules: Iterable[str]) -> None:
+    """Import ``modules``, so that forked workers inherit them."""
+    for name in modules:
+        importlib.import_module(name)
+
+
+def partition(
+    tests: Iterable[unittest.TestCase], workers: int
+) -> list[list[unittest.TestCase]]:
+    """Share ``tests`` among ``workers``, keeping test classes together.
+
+    Classes are assigned, largest first, to the worker with the fewest
+    tests so far.
+    """
+    groups: dict[type, list[unittest.TestCase]] = {}
+    for test in tests:
+        groups.setdefault(type(test), []).append(test)
+    partitions: list[list[unittest.TestCase]] = [[] for _ in range(workers)]
+    for group in sorted(groups.values(), key=len, reverse=True):
+        min(partitions, key=len).extend(group)
+    return [p for p in partitions if p]
+
+
+class _WorkerRouter(testtools.StreamResult):
+    """Forward the results of a worker, tagged with its route code."""
+
+    def __init__(
+        self,
+        target: testtools.StreamResult,
+        route_code: str,
+        lock: threading.Lock,
+    ) -> None:
+        super().__init__()
+        self.target = target
+        self.route_code = route_code
+        self.lock = lock
+        self.failed = False
+
+    def status(self, **kwargs: Any) -> None:  # type: ignore[override]
+        route_code = kwargs.get('route_code')
+        if route_code:
+            kwargs['route_code'] = f'{self.route_code}/{route_code}'
+        else:
+            kwargs['route_code'] = self.route_code
+        if kwargs.get('test_status') in ('fail', 'uxsuccess'):
+            self.failed = True
+        with self.lock:
+            self.target.status(**kwargs)
+
+
+def _run_worker(tests: list[unittest.TestCase], write_fd: int) -> bool:
+    # Anything the tests print would corrupt the subunit stream on the
+    # inherited stdout, so send it to stderr instead.
+    sys.stdout.flush()
+    os.dup2(2, 1)
+    suite = unittest.TestSuite(tests)
+    with os.fdopen(write_fd, 'wb') as stream:
+        runner = subunit_run.SubunitTestRunner(stream=stream)
+        result = runner.run(suite)
+    return bool(result.wasSuccessful())
+
+
+def _fork_worker(
+    tests: list[unittest.TestCase], inherited: Iterable[int] = ()
+) -> tuple[int, int]:
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            os.close(read_fd)
+            for fd in inherited:
+                os.close(fd)
+            code = 0 if _run_worker(tests, write_fd) else 1
+            # NOTE: os._exit skips the exit handlers, but they are needed to
+            # write the reports of the tests run by this worker.
+            atexit._run_exitfuncs()
+        except BaseException:
+            traceback.print_exc()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+    os.close(write_fd)
+    return pid, read_fd
+
+
+def run_forked(
+    tests: list[unittest.TestCase],
+    workers: int,
+    output: testtools.StreamResult,
+) -> bool:
+    """Run ``tests`` in ``workers`` forked processes.
+
+    :param output: The result the workers' results are forwarded to.
+    :return: Whether all the workers and all the tests succeeded.
+    """
+    # Fork all the workers before starting any thread, since the children
+    # would inherit the state of its locks.
+    forked: list[tuple[int, int]] = []
+    for share in partition(tests, workers):
+        forked.append(_fork_worker(share, [fd for _, fd in forked]))
+    lock = threading.Lock()
+    children = []
+    for i, (pid, read_fd) in enumerate(forked):
+        router = _WorkerRouter(output, str(i), lock)
+        source = os.fdopen(read_fd, 'rb')
+        reader = threading.Thread(
+            target=subunit.ByteStreamToStreamResult(
+                source, non_subunit_name='stdout'
+            ).run,
+            args=(router,),
+            daemon=True,
+        )
+        reader.start()
+        children.append((pid, source, reader, router))
+
+    ok = True
+    for pid, source, reader, router in children:
+        reader.join()
+        source.close()
+        _, status = os.waitpid(pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0 or router.failed:
+            ok = False
+    return ok
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m oslotest.tools.fork_runner',
+        description='Run tests in workers forked from a warm process.',
+    )
+    parser.add_argument(
+        '-j',
+        '--concurrency',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of workers. Defaults to the number of CPUs.',
+    )
+    parser.add_argument(
+        '--preload',
+        action='append',
+        default=[],
+        metavar='MODULE',
+        help='Import MODULE before forking the workers. May be repeated.',
+    )
+    parser.add_argument(
+        '--list',
+        action='store_true',
+        help='List the tests as a subunit stream instead of running them.',
+    )
+    parser.add_argument(
+        '--load-list',
+        metavar='FILE',
+        help='Only run the tests whose ids are listed in FILE.',
+    )
+    parser.add_argument('discover', choices=['discover'])
+    parser.add_argument(
+        '-t',
+        '--top-level-directory',
+        default='.',
+        help='Top level directory of the project. Defaults to %(default)s.',
+    )
+    parser.add_argument(
+        '-p',
+        '--pattern',
+        default='test*.py',
+        help='Pattern of the test modules. Defaults to %(default)s.',
+    )
+    parser.add_argument('start', nargs='?', default='.')
+    args = parser.parse_intermixed_args(argv)
+
+    modules = list(DEFAULT_PRELOAD) + args.preload
+    modules += os.environ.get('OS_TEST_PRELOAD', '').split(',')
+    preload(m.strip() for m in modules if m.strip())
+
+    top_dir = os.path.abspath(args.top_level_directory)
+    if top_dir not in sys.path:
+        sys.path.insert(0, top_dir)
+    loader = unittest.TestLoader()
+    suite = loader.discover(args.start, args.pattern, top_dir)
+    if args.load_list:
+        with open(args.load_list) as f:
+            ids = {line.strip() for line in f if line.strip()}
+        suite = testsuite.filter_by_ids(suite, ids)
+
+    with os.fdopen(os.dup(sys.stdout.fileno()), 'wb') as stdout:
+        output = subunit.StreamResultToBytes(stdout)
+        if loader.errors:
+            output.status(
+                file_name='import errors',
+                file_bytes='\n'.join(str(e) for e in loader.errors).encode(),
+                mime_type='text/plain;charset=utf8',
+                runnable=False,
+            )
+            return 2
+        tests = list(testsuite.iterate_tests(suite))
+        if args.list:
+            for test in tests:
+                output.status(test_id=test.id(), test_status='exists')
+            return 0
+        ok = run_forked(tests, max(1, args.concurrency), output)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())